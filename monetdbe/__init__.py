@@ -4,7 +4,9 @@ from monetdbe.monetize import PrepareProtocol
 from monetdbe.row import Row
 from monetdbe.version import version_tuple, __version__
 from monetdbe.cursors import Cursor  # type: ignore[attr-defined]
-from monetdbe.connection import Connection
+from monetdbe.connection import Connection, close_cached_databases
+from monetdbe.statements import Statement
+from monetdbe.pool import ConnectionPool
 
 from monetdbe.dbapi2 import (
     connect,
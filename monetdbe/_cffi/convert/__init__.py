@@ -120,6 +120,19 @@ def get_null_value(rcol: monetdbe_column):
     return col.null_value
 
 
+def get_numpy_null_value(numpy_type: np.dtype):
+    """
+    Returns the value MonetDB uses to represent NULL in a column stored as numpy_type.
+    """
+    if numpy_type.kind == 'f':
+        return np.nan
+    if numpy_type.kind == 'u':
+        # unsigned values are appended as signed values of the same width
+        signed = np.dtype(f'i{numpy_type.itemsize}')
+        return np.array(np.iinfo(signed).min, dtype=signed).astype(numpy_type)
+    return np.iinfo(numpy_type).min
+
+
 def extract(rcol: monetdbe_column, r: int, text_factory: Optional[Callable[[str], Any]] = None):
     """
     Extracts values from a monetdbe_column.
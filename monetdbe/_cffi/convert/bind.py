@@ -47,20 +47,14 @@ def bind_memoryview(data: memoryview) -> ffi.CData:
     return struct
 
 
-def bind_datetime(data: datetime.datetime) -> ffi.CData:
-    struct = ffi.new("monetdbe_data_timestamp *")
-    struct.date.day = data.day
-    struct.date.month = data.month
-    struct.date.year = data.year
-    struct.time.ms = int(data.microsecond / 1000)
-    struct.time.seconds = data.second
-    struct.time.minutes = data.minute
-    struct.time.hours = data.hour
+def set_date(struct: ffi.CData, data: datetime.date) -> ffi.CData:
+    struct.day = data.day
+    struct.month = data.month
+    struct.year = data.year
     return struct
 
 
-def bind_time(data: datetime.time) -> ffi.CData:
-    struct = ffi.new("monetdbe_data_time *")
+def set_time(struct: ffi.CData, data: datetime.time) -> ffi.CData:
     struct.ms = int(data.microsecond / 1000)
     struct.seconds = data.second
     struct.minutes = data.minute
@@ -68,14 +62,24 @@ def bind_time(data: datetime.time) -> ffi.CData:
     return struct
 
 
-def bind_date(data: datetime.date) -> ffi.CData:
-    struct = ffi.new("monetdbe_data_date *")
-    struct.day = data.day
-    struct.month = data.month
-    struct.year = data.year
+def set_datetime(struct: ffi.CData, data: datetime.datetime) -> ffi.CData:
+    set_date(struct.date, data)
+    set_time(struct.time, data)
     return struct
 
 
+def bind_datetime(data: datetime.datetime) -> ffi.CData:
+    return set_datetime(ffi.new("monetdbe_data_timestamp *"), data)
+
+
+def bind_time(data: datetime.time) -> ffi.CData:
+    return set_time(ffi.new("monetdbe_data_time *"), data)
+
+
+def bind_date(data: datetime.date) -> ffi.CData:
+    return set_date(ffi.new("monetdbe_data_date *"), data)
+
+
 def bind_timedelta(data: datetime.timedelta) -> ffi.CData:
     struct = ffi.new("monetdbe_data_time *")
     struct.ms = int(data.microseconds / 1000)
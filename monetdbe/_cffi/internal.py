@@ -1,24 +1,49 @@
+import atexit
+import datetime
 import logging
+from functools import wraps
+from math import isfinite
+from numbers import Number
+from operator import index
 from _warnings import warn
 from pathlib import Path
-from typing import Optional, Tuple, Any, Mapping, Iterator, Dict, TYPE_CHECKING
+from typing import Optional, Tuple, Any, Mapping, Iterator, Dict, List, Sequence, Callable, TypeVar, TYPE_CHECKING
 from decimal import Decimal
-from collections import namedtuple
+from collections import namedtuple, defaultdict
+from threading import Lock
 
 import numpy as np
 from monetdbe._lowlevel import ffi, lib
 from monetdbe import exceptions
-from monetdbe._cffi.convert import make_string, monet_c_type_map, extract, numpy_monetdb_map, precision_warning, timestamp_to_date, get_null_value
-from monetdbe._cffi.convert.bind import monetdbe_decimal_to_bte, monetdbe_decimal_to_sht, monetdbe_decimal_to_int, monetdbe_decimal_to_lng, prepare_bind
+from monetdbe._cffi.convert import make_string, monet_c_type_map, extract, numpy_monetdb_map, precision_warning, timestamp_to_date, get_null_value, \
+    get_numpy_null_value
+from monetdbe._cffi.convert.bind import monetdbe_decimal_to_bte, monetdbe_decimal_to_sht, monetdbe_decimal_to_int, monetdbe_decimal_to_lng, prepare_bind, \
+    set_date, set_time, set_datetime
 from monetdbe._cffi.errors import check_error
 from monetdbe._cffi.types_ import monetdbe_result, monetdbe_database, monetdbe_column, monetdbe_statement
 from monetdbe._cffi.monet_info import INFO
+from monetdbe.inference import is_null
+from monetdbe.monetize import monet_escape, monet_identifier_escape
 
 if TYPE_CHECKING:
     from monetdbe.connection import Connection
 
 _logger = logging.getLogger(__name__)
 
+F = TypeVar('F', bound=Callable[..., Any])
+
+
+def locked(method: F) -> F:
+    """
+    Run a method of Internal while holding the lock of its connection, a monetdbe database handle can only be used by
+    one thread at a time.
+    """
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper  # type: ignore[return-value]
+
 
 def result_fetch(result: monetdbe_result, column: int) -> monetdbe_column:
     p_rcol = ffi.new("monetdbe_column **")
@@ -26,6 +51,21 @@ def result_fetch(result: monetdbe_result, column: int) -> monetdbe_column:
     return p_rcol[0]
 
 
+def result_fetch_column(result: monetdbe_result, column: int) -> List[Any]:
+    """
+    Fetch all values of a result column as python objects, fetching the column only once.
+    """
+    rcol = result_fetch(result, column)
+    type_info = monet_c_type_map[rcol.type]
+    decimal = rcol.sql_type.name != ffi.NULL and ffi.string(rcol.sql_type.name) == b'decimal'
+    if type_info.numpy_type.kind == 'i' and not decimal:
+        # integers are unpacked in one go, without extracting every value separately
+        col = ffi.cast(f"monetdbe_column_{type_info.c_string_type} *", rcol)
+        null_value = col.null_value
+        return [None if value == null_value else value for value in ffi.unpack(col.data, result.nrows)]
+    return [extract(rcol, r) for r in range(result.nrows)]
+
+
 def result_fetch_numpy(result: monetdbe_result) -> Mapping[str, np.ndarray]:
     result_dict: Dict[str, np.ndarray] = {}
     for c in range(result.ncols):
@@ -72,7 +112,7 @@ def bind(statement: monetdbe_statement, data: Any, parameter_nr: int, type_info=
     try:
         _type_info = type_info[parameter_nr]
         if _type_info.sql_type == 'decimal':
-            d = int(Decimal(data) * (Decimal(10) ** _type_info.scale))
+            d = _scale_decimal(data, _type_info)
             if _type_info.impl_type == 'bte':
                 prepared = monetdbe_decimal_to_bte(d)
             elif _type_info.impl_type == 'sht':
@@ -91,7 +131,137 @@ def bind(statement: monetdbe_statement, data: Any, parameter_nr: int, type_info=
     check_error(lib.monetdbe_bind(statement, prepared, parameter_nr))
 
 
+def _scale_decimal(data: Any, type_info: TypeInfo) -> int:
+    return int(Decimal(data) * (Decimal(10) ** type_info.scale))
+
+
+def _set_bool(buffer: ffi.CData, data: Any) -> None:
+    buffer[0] = bool(data)
+
+
+def _set_int(buffer: ffi.CData, data: Any) -> None:
+    try:
+        value = index(data)
+    except TypeError:
+        # floats and decimals are accepted when they are whole numbers, others would be truncated
+        if not isinstance(data, Number) or isinstance(data, complex) or not isfinite(data) or int(data) != data:
+            raise exceptions.ProgrammingError(f"Can't bind {data!r} to an integer parameter without losing precision")
+        value = int(data)
+    buffer[0] = value
+
+
+def _set_float(buffer: ffi.CData, data: Any) -> None:
+    buffer[0] = float(data)
+
+
+class Binder:
+    """
+    Binds parameters to a prepared statement.
+
+    Numeric and temporal parameters are written into a buffer that is allocated once per parameter, based on the
+    parameter types of the statement, so executing a statement many times doesn't allocate new buffers for every
+    execution.
+    """
+
+    # monetdbe type -> (buffer type, function that fills the buffer)
+    buffer_types = {
+        lib.monetdbe_bool: ("int8_t *", _set_bool),
+        lib.monetdbe_int8_t: ("int8_t *", _set_int),
+        lib.monetdbe_int16_t: ("int16_t *", _set_int),
+        lib.monetdbe_int32_t: ("int32_t *", _set_int),
+        lib.monetdbe_int64_t: ("int64_t *", _set_int),
+        lib.monetdbe_float: ("float *", _set_float),
+        lib.monetdbe_double: ("double *", _set_float),
+        lib.monetdbe_date: ("monetdbe_data_date *", set_date),
+        lib.monetdbe_time: ("monetdbe_data_time *", set_time),
+        lib.monetdbe_timestamp: ("monetdbe_data_timestamp *", set_datetime),
+    }
+
+    temporal_types = {
+        lib.monetdbe_date: datetime.date,
+        lib.monetdbe_time: datetime.time,
+        lib.monetdbe_timestamp: datetime.datetime,
+    }
+
+    def __init__(self, database: monetdbe_database, statement: monetdbe_statement, type_info: List[TypeInfo]):
+        self.statement = statement
+        self.types = [statement.type[i] for i in range(statement.nparam)]
+        self.decimals = {i: info for i, info in enumerate(type_info) if info.sql_type == 'decimal'}
+        self.buffers = []
+        self.setters = []
+        self.nulls = []
+        for type_ in self.types:
+            buffer_type, setter = self.buffer_types.get(type_, (None, None))
+            self.buffers.append(ffi.new(buffer_type) if buffer_type else None)
+            self.setters.append(setter)
+            if type_ in self.temporal_types or type_ == lib.monetdbe_blob:
+                # monetdbe converts these from the monetdbe structs, a NULL pointer binds a NULL value
+                self.nulls.append(ffi.NULL)
+            else:
+                self.nulls.append(lib.monetdbe_null(database, type_))
+        # keep the variable sized values alive until the statement is executed
+        self._bound: List[Any] = [None] * len(self.types)
+
+    def _prepare(self, data: Any, parameter_nr: int) -> Any:
+        if is_null(data):
+            return self.nulls[parameter_nr]
+
+        type_ = self.types[parameter_nr]
+        buffer = self.buffers[parameter_nr]
+        if buffer is None or (type_ in self.temporal_types and not isinstance(data, self.temporal_types[type_])):
+            return prepare_bind(data)
+
+        try:
+            if parameter_nr in self.decimals:
+                data = _scale_decimal(data, self.decimals[parameter_nr])
+            self.setters[parameter_nr](buffer, data)
+        except (TypeError, ValueError, OverflowError) as e:
+            raise exceptions.InterfaceError(f"Error binding parameter {parameter_nr}: {e}") from e
+        return buffer
+
+    def fits(self, parameters: Sequence[Any]) -> bool:
+        """
+        Returns True if every value has a python type that can be bound to its parameter as is. Other values, like
+        numbers for string parameters or strings for temporal parameters, are left to MonetDB to convert when they are
+        formatted as SQL literals.
+        """
+        for type_, data in zip(self.types, parameters):
+            if is_null(data):
+                continue
+            if type_ == lib.monetdbe_str:
+                if not isinstance(data, str):
+                    return False
+            elif type_ == lib.monetdbe_blob:
+                if not isinstance(data, (bytes, bytearray, memoryview)):
+                    return False
+            elif type_ in self.temporal_types:
+                if not isinstance(data, self.temporal_types[type_]):
+                    return False
+            elif type_ in self.buffer_types:
+                if not isinstance(data, (Number, np.number, np.bool_)):
+                    return False
+        return True
+
+    def bind(self, parameters: Sequence[Any]) -> None:
+        """
+        Bind a value to every parameter of the statement.
+
+        Raises:
+            ProgrammingError: if the number of values doesn't match the number of parameters
+        """
+        if len(parameters) != len(self.types):
+            raise exceptions.ProgrammingError(f"Incorrect number of bindings supplied. The current statement uses "
+                                              f"{len(self.types)}, and there are {len(parameters)} supplied.")
+        for parameter_nr, data in enumerate(parameters):
+            prepared = self._prepare(data, parameter_nr)
+            self._bound[parameter_nr] = prepared
+            check_error(lib.monetdbe_bind(self.statement, prepared, parameter_nr))
+
+
 def execute(statement: monetdbe_statement, make_result: bool = False) -> Tuple[monetdbe_result, int]:
+    """
+    Execute a prepared statement, the caller should hold the lock of the connection.
+    """
     if make_result:
         p_result = ffi.new("monetdbe_result **")
     else:
@@ -112,9 +282,63 @@ def version() -> str:
     return ffi.string(lib.monetdbe_version()).decode()
 
 
+class DatabaseCache:
+    """
+    Keeps the monetdbe_database sessions of closed connections open, so they can be reused by new connections with
+    the same database and options, instead of paying for monetdbe_open every time.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._idle: Dict[Tuple[Any, ...], List[monetdbe_database]] = defaultdict(list)
+        self._shut_down = False
+
+    def __len__(self) -> int:
+        return sum(len(databases) for databases in self._idle.values())
+
+    def acquire(self, key: Tuple[Any, ...]) -> Optional[monetdbe_database]:
+        with self._lock:
+            idle = self._idle.get(key)
+            return idle.pop() if idle else None
+
+    def release(self, key: Tuple[Any, ...], database: monetdbe_database) -> bool:
+        """
+        Keep a session open for reuse. Returns False if the cache has been shut down, the session should be closed.
+        """
+        with self._lock:
+            if self._shut_down:
+                return False
+            self._idle[key].append(database)
+            return True
+
+    def clear(self) -> None:
+        """
+        Close all cached sessions.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, defaultdict(list)
+        for databases in idle.values():
+            for database in databases:
+                lib.monetdbe_close(database)
+
+    def shutdown(self) -> None:
+        """
+        Close all cached sessions and stop caching, at interpreter exit.
+        """
+        with self._lock:
+            self._shut_down = True
+        self.clear()
+
+
+database_cache = DatabaseCache()
+atexit.register(database_cache.shutdown)
+
+
 class Internal:
-    _active_context: Optional['Internal'] = None
-    _active_connection: Optional['Connection'] = None
+    """
+    A session on the embedded database. Several sessions can be opened on the same database (directory), every
+    session has its own transaction.
+    """
     _monetdbe_database: Optional[monetdbe_database] = None
 
     def __init__(
@@ -129,8 +353,10 @@ class Internal:
             mapi_server_host: Optional[str] = None,
             mapi_server_usock: Optional[Path] = None,
             mapi_server_port: Optional[int] = None,
+            keep_open: bool = False,
     ):
         self._connection = connection
+        self.lock = connection.lock
         self.dbdir = dbdir
         self.memorylimit = memorylimit
         self.querytimeout = querytimeout
@@ -140,29 +366,22 @@ class Internal:
         self.mapi_server_host = mapi_server_host
         self.mapi_server_usock = mapi_server_usock
         self.mapi_server_port = mapi_server_port
-        self._switch()
-        self._monetdbe_database = self.open()
+        self.keep_open = keep_open
+        cached = database_cache.acquire(self._cache_key()) if keep_open else None
+        self._monetdbe_database = cached or self.open()
 
-    @classmethod
-    def set_active_context(cls, active_context: Optional['Internal']):
-        cls._active_context = active_context
+    def _cache_key(self) -> Tuple[Any, ...]:
+        return (self.dbdir, self.memorylimit, self.querytimeout, self.sessiontimeout, self.nr_threads,
+                self.mapi_server_host, self.mapi_server_usock, self.mapi_server_port)
 
     def set_monetdbe_database(self, connection: Optional[monetdbe_database]):
         self._monetdbe_database = connection
 
     def __del__(self):
-        if self._active_context == self:
-            # only close if we are deleting the active context
-            self.close()
-
-    def _switch(self):
-        if self._active_context == self:
-            return
-
-        self.set_active_context(self)
+        self.close()
 
+    @locked
     def cleanup_result(self, result: monetdbe_result):
-        self._switch()
         _logger.info("cleanup_result called")
         if result and self._monetdbe_database:
             check_error(lib.monetdbe_cleanup_result(self._monetdbe_database, result))
@@ -236,16 +455,41 @@ class Internal:
 
         return connection
 
+    @locked
     def close(self) -> None:
-        self._switch()
         if self._monetdbe_database:
-            if lib.monetdbe_close(self._monetdbe_database):
-                raise exceptions.OperationalError("Failed to close database")
+            if self.keep_open and self._reset_session() and \
+                    database_cache.release(self._cache_key(), self._monetdbe_database):
+                self.set_monetdbe_database(None)
+                return
+            database = self._monetdbe_database
             self.set_monetdbe_database(None)
+            if lib.monetdbe_close(database):
+                raise exceptions.OperationalError("Failed to close database")
 
-        if self._active_context:
-            self.set_active_context(None)
-
+    def _reset_session(self) -> bool:
+        """
+        Bring the session back in the state of a new session, so it can be reused by another connection. Returns
+        False if that failed, and the session should be closed.
+        """
+        try:
+            if self.in_transaction():
+                self.query("ROLLBACK")
+            self.set_autocommit(True)
+            self.query("SET SCHEMA sys")
+            result, _ = self.query("select t.name from sys.tables t join sys.schemas s on t.schema_id = s.id "
+                                   "where s.name = 'tmp' and t.type = 30", make_result=True)
+            try:
+                temporary_tables = result_fetch_column(result, 0)
+            finally:
+                self.cleanup_result(result)
+            for table in temporary_tables:
+                self.query(f"DROP TABLE tmp.{monet_identifier_escape(table)}")
+        except exceptions.Error:
+            return False
+        return True
+
+    @locked
     def query(self, query: str, make_result: bool = False) -> Tuple[Optional[Any], int]:
         """
         Execute a query.
@@ -259,7 +503,6 @@ class Internal:
             result, affected_rows
 
         """
-        self._switch()
         if make_result:
             p_result = ffi.new("monetdbe_result **")
         else:
@@ -275,19 +518,39 @@ class Internal:
 
         return result, affected_rows[0]
 
+    @locked
     def set_autocommit(self, value: bool) -> None:
-        self._switch()
         check_error(lib.monetdbe_set_autocommit(self._monetdbe_database, int(value)))
 
+    @locked
+    def get_autocommit(self) -> bool:
+        value = ffi.new("int *")
+        check_error(lib.monetdbe_get_autocommit(self._monetdbe_database, value))
+        return bool(value[0])
+
+    @locked
     def in_transaction(self) -> bool:
-        self._switch()
         return bool(lib.monetdbe_in_transaction(self._monetdbe_database))
 
+    @locked
+    def get_session_id(self) -> Optional[int]:
+        """
+        Returns the id of the session, as used by sys.sessions and sys.queue(), or None if it isn't available.
+        """
+        try:
+            result, _ = self.query("select sys.current_sessionid()", make_result=True)
+        except exceptions.Error:
+            return None
+        try:
+            return extract(result_fetch(result, 0), 0)
+        finally:
+            self.cleanup_result(result)
+
+    @locked
     def append(self, table: str, data: Mapping[str, np.ndarray], schema: str = 'sys') -> None:
         """
         Directly append an array structure
         """
-        self._switch()
         n_columns = len(data)
         existing_columns = list(self.get_columns(schema=schema, table=table))
         existing_names, existing_types = zip(*existing_columns)
@@ -328,6 +591,8 @@ class Internal:
             work_column.count = column_values.shape[0]
             work_column.name = ffi.new('char[]', column_name.encode())
             if type_info.numpy_type.kind == 'M':
+                if np.ma.isMaskedArray(column_values):
+                    column_values = column_values.filled(np.datetime64('NaT'))
                 t = ffi.new('monetdbe_data_timestamp[]', work_column.count)
                 cffi_objects.append(t)
                 unit = np.datetime_data(column_values.dtype)[0].encode()
@@ -350,6 +615,11 @@ class Internal:
                 lib.initialize_string_array_from_numpy(t, work_column.count, p, stride_length, ffi.cast("bool*", m))
                 work_column.data = t
             else:
+                if np.ma.isMaskedArray(column_values):
+                    # masked values are appended as the NULL value of the column type
+                    if type_info.numpy_type.kind == 'b':
+                        column_values = column_values.astype(np.int8)
+                    column_values = column_values.filled(get_numpy_null_value(column_values.dtype))
                 if not column_values.flags.c_contiguous:  # Checks if the array is C-contiguous
                     column_values = np.ascontiguousarray(column_values)  # Converts the array to C-contiguous
                 p = ffi.from_buffer(f"{type_info.c_string_type}*", column_values)
@@ -360,52 +630,114 @@ class Internal:
         check_error(lib.monetdbe_append(self._monetdbe_database, schema.encode(),
                                         table.encode(), work_columns, n_columns))
 
-    def prepare(self, query: str) -> monetdbe_statement:
-        self._switch()
+    @locked
+    def prepare(self, query: str) -> Tuple[monetdbe_statement, List[TypeInfo], List[Tuple[str, str, int, int]]]:
+        """
+        Prepare a query.
+
+        returns:
+            the statement, the types of its parameters and the name, SQL type, digits and scale of its result columns
+        """
 
         stmt = ffi.new("monetdbe_statement **")
         p_result = ffi.new("monetdbe_result **")
         check_error(lib.monetdbe_prepare(self._monetdbe_database, str(query).encode(), stmt, p_result))
 
+        try:
+            # the columns of the prepare result: type, digits, scale, schema, table, column and implementation type
+            sql_types, digits, scales, schemas, _, names, impl_types = (
+                result_fetch_column(p_result[0], c) for c in range(7))
+        finally:
+            self.cleanup_result(p_result[0])
+
         input_parameter_info = list()
+        output_columns = list()
 
-        for r in range(p_result[0].nrows):
-            if (extract(result_fetch(p_result[0], 3), r)) is None:
-                row = TypeInfo(impl_type=extract(result_fetch(p_result[0], 6), r), sql_type=extract(result_fetch(p_result[0], 0), r), scale=extract(result_fetch(p_result[0], 2), r))
-                input_parameter_info.append(row)
-        self.cleanup_result(p_result[0])
+        # parameters have no schema
+        for sql_type, digit, scale, schema, name, impl_type in zip(sql_types, digits, scales, schemas, names, impl_types):
+            if schema is None:
+                input_parameter_info.append(TypeInfo(impl_type=impl_type, sql_type=sql_type, scale=scale))
+            else:
+                output_columns.append((name, sql_type, digit, scale))
+
+        return stmt[0], input_parameter_info, output_columns
 
-        return stmt[0], input_parameter_info
+    @locked
+    def binder(self, statement: monetdbe_statement, type_info: List[TypeInfo]) -> Binder:
+        return Binder(self._monetdbe_database, statement, type_info)
 
+    @locked
     def cleanup_statement(self, statement: monetdbe_statement) -> None:
-        self._switch()
         lib.monetdbe_cleanup_statement(self._monetdbe_database, statement)
 
+    @locked
     def load_extension(self, name: str):
         if INFO.get('have_load_extension'):
             lib.monetdbe_load_extension(self._monetdbe_database, str(name).encode())
         return None
 
+    @locked
     def dump_database(self, backupfile: Path):
         # todo (gijs): use :)
         lib.monetdbe_dump_database(self._monetdbe_database, str(backupfile).encode())
 
+    @locked
     def dump_table(self, schema_name: str, table_name: str, backupfile: Path):
         # todo (gijs): use :)
         lib.monetdbe_dump_table(self._monetdbe_database, schema_name.encode(), table_name.encode(),
                                 str(backupfile).encode())
 
+    @locked
     def get_columns(self, table: str, schema: str = 'sys') -> Iterator[Tuple[str, int]]:
-        self._switch()
         count_p = ffi.new('size_t*')
         columns_p = ffi.new('monetdbe_column**')
 
         lib.monetdbe_get_columns(self._monetdbe_database, schema.encode(), table.encode(), count_p, columns_p)
 
+        # collected while holding the lock, a generator would run after the lock is released
+        columns = []
         for i in range(count_p[0]):
             name = ffi.string(columns_p[0][i].name).decode()
             type_ = columns_p[0][i].type
-            yield name, type_
+            columns.append((name, type_))
+        return iter(columns)
+
+    @locked
+    def get_append_columns(self, table: str, schema: Optional[str] = None) -> List[Tuple[str, str, str, int, bool]]:
+        """
+        Returns the schema, name, SQL type, digits and nullability of every column of a table that can be filled with
+        append(). This is empty if the table doesn't exist, isn't a regular table, or has keys or triggers that append()
+        would bypass.
+        """
+        schema_sql = monet_escape(schema) if schema else 'current_schema'
+        query = "select s.name, c.name, c.type, c.type_digits, c.\"null\" from sys.columns c " \
+            "join sys.tables t on c.table_id = t.id join sys.schemas s on t.schema_id = s.id " \
+            f"where s.name = {schema_sql} and t.name = {monet_escape(table)} and t.type = 0 " \
+            "and not exists (select * from sys.keys k where k.table_id = t.id) " \
+            "and not exists (select * from sys.triggers r where r.table_id = t.id) " \
+            "order by c.number"
+        result, _ = self.query(query, make_result=True)
+        try:
+            columns = [result_fetch(result, i) for i in range(result.ncols)]
+            return [tuple(extract(column, r) for column in columns) for r in range(result.nrows)]  # type: ignore
+        finally:
+            self.cleanup_result(result)
+
+    @locked
+    def get_column_types(self, table: str, schema: str = 'sys') -> Dict[str, Tuple[str, int, int]]:
+        """
+        Returns the declared SQL type, digits and scale of every column of a table, by column name.
+        """
+        query = "select c.name, c.type, c.type_digits, c.type_scale from sys.columns c " \
+            "join sys.tables t on c.table_id = t.id join sys.schemas s on t.schema_id = s.id " \
+            f"where s.name = {monet_escape(schema)} and t.name = {monet_escape(table)}"
+        result, _ = self.query(query, make_result=True)
+        try:
+            columns = [result_fetch(result, i) for i in range(result.ncols)]
+            rows = [tuple(extract(column, r) for column in columns) for r in range(result.nrows)]
+            return {name: (type_, digits, scale) for name, type_, digits, scale in rows}  # type: ignore
+        finally:
+            self.cleanup_result(result)
 
     def get_port(self) -> Optional[int]:
         if self.mapi_server_host == "none":
@@ -0,0 +1,189 @@
+"""
+This module contains an asyncio interface to monetdbe.
+
+Every connection runs its queries and result conversions on its own executor thread, so a long query doesn't block
+the event loop. The GIL is released while MonetDB/e executes a query.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Any, Callable, AsyncIterator, List, Sequence, Mapping, Iterable, Union, TypeVar, \
+    TYPE_CHECKING
+
+import numpy as np
+
+from monetdbe.connection import Connection, Description
+from monetdbe.cursors import Cursor  # type: ignore[attr-defined]
+from monetdbe.exceptions import ProgrammingError, Error
+from monetdbe.formatting import parameters_type
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+T = TypeVar('T')
+
+
+class AsyncCursor:
+    """
+    An asyncio wrapper of a Cursor, all operations run on the executor thread of the connection.
+    """
+
+    def __init__(self, connection: 'AsyncConnection', cursor: Cursor):
+        self.connection = connection
+        self._cursor = cursor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    @property
+    def description(self) -> Optional[List[Description]]:
+        return self._cursor.description
+
+    @property
+    def rowcount(self) -> int:
+        return self._cursor.rowcount
+
+    async def execute(self, operation: str, parameters: parameters_type = None, paramstyle: str = "qmark",
+                      timeout: Optional[float] = None) -> 'AsyncCursor':
+        await self.connection._run(self._cursor.execute, operation, parameters, paramstyle, timeout)
+        return self
+
+    async def executemany(self, operation: str, seq_of_parameters: Iterable[parameters_type]) -> 'AsyncCursor':
+        await self.connection._run(self._cursor.executemany, operation, seq_of_parameters)
+        return self
+
+    async def fetchone(self) -> Optional[Sequence[Any]]:
+        return await self.connection._run(self._cursor.fetchone)
+
+    async def fetchmany(self, size: Optional[int] = None) -> List[Sequence[Any]]:
+        return await self.connection._run(self._cursor.fetchmany, size)
+
+    async def fetchall(self) -> List[Sequence[Any]]:
+        return await self.connection._run(self._cursor.fetchall)
+
+    async def fetchnumpy(self) -> Mapping[str, np.ndarray]:
+        return await self.connection._run(self._cursor.fetchnumpy)
+
+    async def fetchdf(self) -> 'pd.DataFrame':
+        return await self.connection._run(self._cursor.fetchdf)
+
+    async def fetch_batches(self, size: int = 10_000) -> AsyncIterator[List[Sequence[Any]]]:
+        """
+        Fetch the rows of the result in batches.
+
+        A batch is only converted when the previous one has been consumed, so a slow consumer doesn't make the
+        converted rows pile up in memory.
+
+        Args:
+            size: the maximum number of rows in a batch
+        """
+        if size < 1:
+            raise ValueError("The batch size should be at least 1")
+        while True:
+            batch = await self.fetchmany(size)
+            if not batch:
+                return
+            yield batch
+
+    async def close(self) -> None:
+        await self.connection._run(self._cursor.close)
+
+
+class AsyncConnection:
+    """
+    An asyncio wrapper of a Connection, create it with connect().
+
+    Operations are executed one after the other on the executor thread of the connection. If a task awaiting an
+    operation is cancelled, the operation is skipped if it didn't start yet, and a running query is interrupted.
+    """
+
+    def __init__(self, connection: Connection, executor: ThreadPoolExecutor):
+        self._connection = connection
+        self._executor: Optional[ThreadPoolExecutor] = executor
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        if self._executor is None:
+            raise ProgrammingError("The connection has been closed")
+        future = self._executor.submit(func, *args)
+        try:
+            return await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.running():
+                # don't wait for the interrupt, the cancelled task should finish right away
+                asyncio.get_running_loop().run_in_executor(None, self._interrupt)
+            raise
+
+    def _interrupt(self) -> None:
+        try:
+            self._connection.interrupt()
+        except Error:
+            # the connection is closed, or MonetDB can't interrupt queries
+            pass
+
+    @property
+    def connection(self) -> Connection:
+        """
+        The underlying connection, which shouldn't be used from the event loop thread while queries are running.
+        """
+        return self._connection
+
+    async def cursor(self) -> AsyncCursor:
+        return AsyncCursor(self, await self._run(self._connection.cursor))
+
+    async def execute(self, query: str, args: parameters_type = None, paramstyle: str = "qmark",
+                      timeout: Optional[float] = None) -> AsyncCursor:
+        cursor = await self.cursor()
+        return await cursor.execute(query, args, paramstyle, timeout)
+
+    async def executemany(self, query: str, args_seq: Iterable[parameters_type]) -> AsyncCursor:
+        cursor = await self.cursor()
+        return await cursor.executemany(query, args_seq)
+
+    async def commit(self) -> None:
+        await self._run(self._connection.commit)
+
+    async def rollback(self) -> None:
+        await self._run(self._connection.rollback)
+
+    async def close(self) -> None:
+        if self._executor is None:
+            return
+        executor = self._executor
+        try:
+            await self._run(self._connection.close)
+        finally:
+            self._executor = None
+            executor.shutdown(wait=False)
+
+
+async def connect(database: Optional[Union[str, Any]] = None, **kwargs: Any) -> AsyncConnection:
+    """
+    Open a connection, which executes its operations on a dedicated thread.
+
+    Args:
+        database: The path to the database, see Connection.
+        kwargs: Other arguments for the Connection.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='monetdbe')
+    future = executor.submit(Connection, database, **kwargs)
+    try:
+        connection = await asyncio.wrap_future(future)
+    except BaseException:
+        # if the task is cancelled while the connection is opened, close it again when it is open
+        future.add_done_callback(_close_opened)
+        executor.shutdown(wait=False)
+        raise
+    return AsyncConnection(connection, executor)
+
+
+def _close_opened(future: 'Future[Connection]') -> None:
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
@@ -0,0 +1,269 @@
+"""
+Writers for the MonetDB binary column format, as read by COPY BINARY INTO.
+
+Every column is stored in its own file. Fixed width types are stored as little endian arrays of their storage type,
+strings as nul terminated UTF-8 and blobs as a 64 bit length followed by the data. For more info:
+https://www.monetdb.org/documentation/user-guide/sql-manual/data-loading/binary-loading/
+"""
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+import numpy as np
+
+from monetdbe.exceptions import ProgrammingError
+
+# a NULL string is encoded as a single 0x80 byte, which is never valid UTF-8 on its own
+STRING_NULL = b'\x80'
+
+# a NULL blob is encoded with the maximum length
+BLOB_NULL = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+fixed_width_types: Dict[str, np.dtype] = {
+    'tinyint': np.dtype('<i1'),
+    'smallint': np.dtype('<i2'),
+    'int': np.dtype('<i4'),
+    'bigint': np.dtype('<i8'),
+    'oid': np.dtype('<i8'),
+    'real': np.dtype('<f4'),
+    'float': np.dtype('<f8'),
+}
+
+date_dtype = np.dtype([('day', 'u1'), ('month', 'u1'), ('year', '<i2')])
+time_dtype = np.dtype([('us', '<u4'), ('seconds', 'u1'), ('minutes', 'u1'), ('hours', 'u1'), ('padding', 'u1')])
+timestamp_dtype = np.dtype([('time', time_dtype), ('date', date_dtype)])
+
+
+def _mask(values: np.ndarray) -> np.ndarray:
+    """
+    Returns a boolean array marking the NULL values of a (masked) column.
+    """
+    mask = np.ma.getmaskarray(values)
+    if values.dtype.kind == 'M':
+        mask = mask | np.isnat(np.ma.getdata(values))
+    elif values.dtype.kind == 'O':
+        mask = mask | np.array([v is None for v in np.ma.getdata(values)], dtype=bool)
+    return mask
+
+
+def _integer(value: Any, scale: int) -> int:
+    """
+    Convert a python value to the integer stored for it, rounding decimals to their scale.
+    """
+    try:
+        scaled = value * 10 ** scale if scale else value
+        integer = round(scaled) if scale else int(scaled)
+    except (TypeError, ValueError, OverflowError):
+        raise ProgrammingError(f"can't write {value!r} to an integer or decimal column")
+    if integer != scaled and not scale:
+        raise ProgrammingError(f"can't write {value!r} to an integer column without losing precision")
+    return integer
+
+
+def _encode_integer(values: np.ndarray, dtype: np.dtype, scale: int = 0, digits: Optional[int] = None) -> bytes:
+    """
+    Encode an integer or decimal column. Decimals are stored as integers, scaled by 10 to the power of their scale.
+    Values that would be truncated or don't fit the column are refused.
+    """
+    mask = _mask(values)
+    data = np.ma.getdata(values)
+    info = np.iinfo(dtype)
+    # the minimum is the NULL value
+    low, high = int(info.min) + 1, int(info.max)
+    if digits:
+        low, high = max(low, 1 - 10 ** digits), min(high, 10 ** digits - 1)
+    factor = 10 ** scale
+
+    if data.dtype.kind in 'biu':
+        valid = data[~mask].astype(np.int64) if data.dtype.kind == 'b' else data[~mask]
+        # checked before scaling, which could overflow otherwise
+        if len(valid) and (int(valid.min()) < -(-low // factor) or int(valid.max()) > high // factor):
+            raise ProgrammingError(f"values don't fit in a column of type {dtype.name}{_precision(digits, scale)}")
+        out = np.zeros(len(data), dtype=dtype)
+        out[~mask] = valid.astype(dtype) * dtype.type(factor)
+    elif data.dtype.kind == 'f':
+        valid = data[~mask].astype(np.float64)
+        scaled = np.round(valid * factor)
+        if not np.isfinite(valid).all():
+            raise ProgrammingError("can't write infinite or NaN values to an integer or decimal column")
+        if not scale and (scaled != valid).any():
+            raise ProgrammingError("can't write floating point values to an integer column without losing precision")
+        bits = 8 * dtype.itemsize - 1
+        if ((scaled < low) | (scaled > high) | (np.abs(scaled) >= 2.0 ** bits)).any():
+            raise ProgrammingError(f"values don't fit in a column of type {dtype.name}{_precision(digits, scale)}")
+        out = np.zeros(len(data), dtype=dtype)
+        out[~mask] = scaled.astype(dtype)
+    else:
+        integers = [0 if null else _integer(value, scale) for value, null in zip(data.tolist(), mask.tolist())]
+        if any(not low <= i <= high for i, null in zip(integers, mask.tolist()) if not null):
+            raise ProgrammingError(f"values don't fit in a column of type {dtype.name}{_precision(digits, scale)}")
+        out = np.array(integers, dtype=dtype)
+
+    out[mask] = info.min
+    return out.tobytes()
+
+
+def _precision(digits: Optional[int], scale: int) -> str:
+    return f" decimal({digits}, {scale})" if digits else ""
+
+
+def _encode_float(values: np.ndarray, dtype: np.dtype) -> bytes:
+    mask = _mask(values)
+    data = np.ma.getdata(values)
+    if data.dtype.kind == 'O':
+        data = np.where(mask, 0, data)
+    data = data.astype(dtype)
+    if mask.any():
+        data[mask] = np.nan
+    return data.tobytes()
+
+
+def _encode_boolean(values: np.ndarray) -> bytes:
+    mask = _mask(values)
+    data = np.ma.getdata(values)
+    if data.dtype.kind == 'O':
+        data = np.where(mask, False, data)
+    data = data.astype(bool).astype(np.uint8)
+    data[mask] = 0x80
+    return data.tobytes()
+
+
+def _encode_string(values: np.ndarray) -> bytes:
+    """
+    Encode a string column. Other values and strings containing NUL, which would end the value early and shift the
+    following rows, are refused.
+    """
+    mask = _mask(values)
+    data = np.ma.getdata(values)
+    encoded = []
+    for value, null in zip(data.tolist(), mask.tolist()):
+        if null:
+            encoded.append(STRING_NULL)
+            continue
+        if not isinstance(value, str):
+            raise ProgrammingError(f"can't write {value!r} to a string column, only str values are accepted")
+        if '\0' in value:
+            raise ProgrammingError(f"can't write {value!r} to a string column, it contains a NUL character")
+        encoded.append(value.encode())
+    if not encoded:
+        return b''
+    return b'\0'.join(encoded) + b'\0'
+
+
+def _encode_blob(values: np.ndarray) -> bytes:
+    mask = _mask(values)
+    parts = []
+    for value, null in zip(np.ma.getdata(values).tolist(), mask.tolist()):
+        if null:
+            parts.append(BLOB_NULL.astype('<u8').tobytes())
+        else:
+            value = bytes(value)
+            parts.append(np.uint64(len(value)).astype('<u8').tobytes())
+            parts.append(value)
+    return b''.join(parts)
+
+
+def _date_fields(days: np.ndarray, out: np.ndarray) -> None:
+    years = days.astype('datetime64[Y]')
+    months = days.astype('datetime64[M]')
+    out['year'] = years.astype(np.int64) + 1970
+    out['month'] = (months - years).astype(np.int64) + 1
+    out['day'] = (days - months).astype(np.int64) + 1
+
+
+def _as_datetime64(values: np.ndarray, mask: np.ndarray, unit: str) -> np.ndarray:
+    data = np.ma.getdata(values)
+    if data.dtype.kind == 'O':
+        data = np.array([None if null else value for value, null in zip(data.tolist(), mask.tolist())],
+                        dtype=f'datetime64[{unit}]')
+    elif data.dtype.kind != 'M':
+        raise ProgrammingError(f"can't write column with dtype {data.dtype} as a temporal type")
+    return data.astype(f'datetime64[{unit}]')
+
+
+def _encode_date(values: np.ndarray) -> bytes:
+    mask = _mask(values)
+    days = _as_datetime64(values, mask, 'D')[~mask]
+
+    valid = np.zeros(len(days), dtype=date_dtype)
+    _date_fields(days, valid)
+
+    out = np.zeros(len(mask), dtype=date_dtype)
+    out[~mask] = valid
+    out.view(np.uint8).reshape(len(out), -1)[mask] = 0xFF
+    return out.tobytes()
+
+
+def _encode_timestamp(values: np.ndarray) -> bytes:
+    mask = _mask(values)
+    stamps = _as_datetime64(values, mask, 'us')[~mask]
+    days = stamps.astype('datetime64[D]')
+    micros = (stamps - days).astype(np.int64)
+
+    valid = np.zeros(len(stamps), dtype=timestamp_dtype)
+    _date_fields(days, valid['date'])
+    valid['time']['hours'] = micros // 3_600_000_000
+    valid['time']['minutes'] = micros // 60_000_000 % 60
+    valid['time']['seconds'] = micros // 1_000_000 % 60
+    valid['time']['us'] = micros % 1_000_000
+
+    out = np.zeros(len(mask), dtype=timestamp_dtype)
+    out[~mask] = valid
+    out.view(np.uint8).reshape(len(out), -1)[mask] = 0xFF
+    return out.tobytes()
+
+
+def encode_column(values: Any, sql_type: str, scale: int = 0, digits: Optional[int] = None) -> bytes:
+    """
+    Encode a column in the MonetDB binary column format.
+
+    Args:
+        values: a (masked) numpy array or sequence with the values of the column. Masked values, None and NaT are
+                stored as NULL.
+        sql_type: the (storage) type of the target column, as found in monetdbe._cffi.convert.monet_c_type_map
+        scale: the scale of a decimal column, its values are stored as integers multiplied by 10 ** scale
+        digits: the precision of a decimal column, larger values are refused
+
+    Returns:
+        the content of the column file
+
+    Raises:
+        ProgrammingError: if the values can't be stored in the column without losing precision
+    """
+    if not isinstance(values, np.ndarray):
+        values = np.array(values, dtype=object)
+    if sql_type in fixed_width_types:
+        dtype = fixed_width_types[sql_type]
+        if dtype.kind == 'f':
+            return _encode_float(values, dtype)
+        return _encode_integer(values, dtype, scale, digits)
+    if sql_type == 'boolean':
+        return _encode_boolean(values)
+    if sql_type == 'string':
+        return _encode_string(values)
+    if sql_type == 'blob':
+        return _encode_blob(values)
+    if sql_type == 'date':
+        return _encode_date(values)
+    if sql_type == 'timestamp':
+        return _encode_timestamp(values)
+    raise ProgrammingError(f"binary loading of {sql_type} columns is not supported")
+
+
+def write_column(path: Union[str, Path], values: Any, sql_type: str, scale: int = 0,
+                 digits: Optional[int] = None) -> Path:
+    """
+    Write a column file suitable for COPY BINARY INTO.
+
+    Args:
+        path: where to write the column file
+        values: the values of the column
+        sql_type: the (storage) type of the target column
+        scale: the scale of a decimal column
+        digits: the precision of a decimal column
+
+    Returns:
+        the absolute location of the written file
+    """
+    path = Path(path).resolve()
+    path.write_bytes(encode_column(values, sql_type, scale, digits))
+    return path
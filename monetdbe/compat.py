@@ -3,12 +3,12 @@ compatibility with MonetDBLite
 """
 from typing import TYPE_CHECKING
 from warnings import warn
-from pandas import DataFrame
 
 from monetdbe.dbapi2 import connect
 from monetdbe.connection import Connection
 
 if TYPE_CHECKING:
+    from pandas import DataFrame
     from monetdbe.cursors import Cursor  # type: ignore[attr-defined]
 
 
@@ -28,7 +28,7 @@ def init(_: str):
     warn("init() is deprecated and will be removed from future versions")
 
 
-def sql(query: str, client=None) -> DataFrame:
+def sql(query: str, client=None) -> 'DataFrame':
     warn("sql() is deprecated and will be removed from future versions")
     if client:
         if not isinstance(client, Connection):
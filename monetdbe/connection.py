@@ -1,19 +1,33 @@
 """
 This module contains the monetdbe connection class.
 """
+import logging
 from collections import namedtuple
+from contextlib import contextmanager, nullcontext
+from os import PathLike
 from pathlib import Path
-from typing import Optional, Type, Iterable, Union, TYPE_CHECKING, Callable, Any, Iterator, Tuple, Mapping
+from tempfile import TemporaryDirectory
+from threading import RLock, Lock, Thread
+from time import perf_counter
+from typing import Optional, Type, Iterable, Union, TYPE_CHECKING, Callable, Any, Iterator, Tuple, Mapping, List, Dict
 from itertools import repeat
 import numpy as np
 
 from monetdbe import exceptions
-from monetdbe.formatting import parameters_type
+from monetdbe.formatting import parameters_type, changes_schema, strip_split_and_clean, written_tables
+from monetdbe.metrics import Metrics, count_allocations, stop_counting_allocations
+from monetdbe.results import ResultCache
+from monetdbe.statements import StatementCache, Statement
 
 if TYPE_CHECKING:
     from monetdbe.row import Row
     from monetdbe.cursors import Cursor  # type: ignore[attr-defined]
 
+_logger = logging.getLogger(__name__)
+
+# the context of a phase of a statement when metrics are disabled
+_not_measured = nullcontext()
+
 Description = namedtuple('Description', (
     'name',
     'type_code',
@@ -25,6 +39,15 @@ Description = namedtuple('Description', (
 ))
 
 
+def close_cached_databases() -> None:
+    """
+    Close the database sessions that are kept open by closed connections with keep_open.
+    """
+    from monetdbe._cffi.internal import database_cache
+
+    database_cache.clear()
+
+
 class Connection:
     def __init__(self,
                  database: Optional[Union[str, Path]] = None,
@@ -42,7 +65,11 @@ class Connection:
                  password: Optional[str] = None,
                  host: Optional[str] = None,
                  port: Optional[int] = None,
-                 usock: Optional[Path] = None
+                 usock: Optional[Path] = None,
+                 cached_statements: int = 128,
+                 keep_open: bool = False,
+                 cached_results: int = 0,
+                 metrics: bool = False
                  ):
         """
         Args:
@@ -51,10 +78,9 @@ class Connection:
             timeout: The session / connection timeout in seconds, 0 = no limit (default)
             detect_types:  defaults to 0 (i. e. off, no type detection), you can set it to any combination of
                            PARSE_DECLTYPES and PARSE_COLNAMES to turn type detection on.
-            check_same_thread: By default, check_same_thread is True and only the creating thread may use the
-                               connection. If set False, the returned connection may be shared across multiple threads.
-                               When using multiple threads with the same connection writing operations should be
-                               serialized by the user to avoid data corruption.
+            check_same_thread: Only for SQLite compatibility, a connection can always be shared across threads. The
+                               calls into monetdbe are serialized with a lock per connection, so threads that should
+                               run queries in parallel need a connection each.
             autocommit: Enable autocommit mode
             nr_threads: to control the level of parallelism, 0 = all cores (default)
             memorylimit: to control the memory footprint allowed in :memory: mode in MB, 0 = no limit (default)
@@ -63,21 +89,26 @@ class Connection:
             username: used to connect to a remote server (not used yet)
             password: credentials to reach the remote server (not used yet)
             port: TCP/IP port to listen for connections (not used yet)
+            cached_statements: the number of prepared statements to keep for reuse, 0 disables the cache
+            keep_open: keep the database session open when the connection is closed, and reuse it for the next
+                       connection with keep_open and the same database and options. The session is reset, but an
+                       in-memory database keeps its data. Cached sessions are closed at interpreter exit or by
+                       close_cached_databases().
+            cached_results: the maximum estimated size in bytes of the cached results of SELECT queries, 0 disables
+                            the result cache (default). A cached result is removed when a statement of this
+                            connection changes a table it reads, changes made by other connections are not seen.
+            metrics: record the timings of the statements and the converted values, see stats()
 
         """
         # import these here so we can import this file without having access to _cffi (yet)
         from monetdbe._cffi import check_if_we_can_import_lowlevel
         from monetdbe._cffi.internal import Internal
-        from monetdbe._cffi.types_ import monetdbe_result
 
         check_if_we_can_import_lowlevel()
 
         if uri or username or password or logging:
             raise NotImplementedError()
 
-        if not check_same_thread:
-            raise NotImplementedError()
-
         if detect_types != 0:
             raise NotImplementedError()
 
@@ -97,12 +128,36 @@ class Connection:
         elif isinstance(usock, str):
             usock = Path(usock).resolve()
 
-        self.result: Optional[monetdbe_result] = None
+        # serializes the use of the database handle by threads sharing the connection
+        self.lock = RLock()
         self.row_factory: Optional[Type['Row']] = None
         self.text_factory: Optional[Callable[[str], Any]] = None
         self.total_changes = 0
         self.isolation_level = None
         self.consistent = True
+        self.statement_cache = StatementCache(self.prepare, Statement.close, cached_statements)
+        self.result_cache = ResultCache(cached_results)
+        self.metrics: Optional[Metrics] = None
+        self._trace_callback: Optional[Callable[..., Any]] = None
+        self._trace_details = False
+        self._progress_handler: Optional[Callable[..., Any]] = None
+        self._progress_interval = 0.0
+        self._progress_details = False
+        if metrics:
+            self.metrics = Metrics()
+        # the temporary tables for lists of values bound to IN parameters, by parameter index and SQL type, with the
+        # statement cache generation in which the table was last created
+        self._in_list_tables: Dict[Tuple[int, str], Tuple[str, int]] = {}
+        # a second session on the database, which stops the queries of this session on interrupt()
+        self._database = database
+        self._control: Optional[Connection] = None
+        self._control_lock = Lock()
+        # the control session is opened with the same options, but doesn't start another MAPI server
+        self._control_options = dict(timeout=timeout, nr_threads=nr_threads, memorylimit=memorylimit,
+                                     querytimeout=querytimeout, logging=logging)
+        # the id of the session in sys.queue(), looked up when it is first needed
+        self._session_id: Optional[int] = None
+        self._session_known = False
 
         self._internal: Optional[Internal] = Internal(
             connection=self,
@@ -113,9 +168,13 @@ class Connection:
             sessiontimeout=timeout,
             mapi_server_host=host,
             mapi_server_port=port,
-            mapi_server_usock=usock
+            mapi_server_usock=usock,
+            keep_open=keep_open
         )
 
+        if self.metrics is not None:
+            # stopped again when the connection is closed
+            count_allocations()
         self.set_autocommit(autocommit)
 
     def __enter__(self):
@@ -134,16 +193,17 @@ class Connection:
         if not hasattr(self, '_internal') or not self._internal:
             raise exceptions.ProgrammingError("The connection has been closed")
 
-    def get_description(self):
+    def get_description(self, result) -> Optional[List[Description]]:
         # we import this late, otherwise the whole monetdbe project is unimportable
         # if we don't have access to monetdbe shared library
         from monetdbe._cffi.convert import make_string, monet_c_type_map
         from monetdbe._cffi.internal import result_fetch
 
-        if not self.result:
-            return
+        if not result:
+            return None
 
-        columns = list(map(lambda x: result_fetch(self.result, x), range(self.result.ncols)))
+        with self.lock:
+            columns = [result_fetch(result, x) for x in range(result.ncols)]
         name = (make_string(rcol.name) for rcol in columns)
         type_code = (monet_c_type_map[rcol.type].sql_type for rcol in columns)
         display_size = repeat(None)
@@ -158,7 +218,8 @@ class Connection:
             self, query: str,
             args: parameters_type = None,
             cursor: Optional[Type['Cursor']] = None,
-            paramstyle: str = "qmark"
+            paramstyle: str = "qmark",
+            timeout: Optional[float] = None
     ) -> 'Cursor':
         """
         Execute a SQL query
@@ -171,11 +232,12 @@ class Connection:
             args:  The optional SQL query arguments
             cursor: An optional Cursor object
             paramstyle: The style of the args, can be qmark, numeric, format or pyformat
+            timeout: The maximum duration of the query in seconds, see Cursor.execute()
 
         Returns:
             A new cursor.
         """
-        cur = self.cursor(factory=cursor).execute(query, args, paramstyle)
+        cur = self.cursor(factory=cursor).execute(query, args, paramstyle, timeout)
         self.consistent = True
         return cur
 
@@ -190,7 +252,7 @@ class Connection:
         sequence seq_of_parameters.
 
         This is a nonstandard and SQLite compatible shortcut that creates a cursor object by calling the cursor()
-        method, calls the cursor’s execute() method with the parameters given, and returns the cursor.
+        method, calls the cursor’s executemany() method with the parameters given, and returns the cursor.
 
         Args:
             query: The SQL query to execute
@@ -200,10 +262,7 @@ class Connection:
         Returns:
             A new cursor instance of the supplied cursor class
         """
-        cur = self.cursor(factory=cursor)
-        for args in args_seq:
-            cur.execute(query, args)
-        return cur
+        return self.cursor(factory=cursor).executemany(query, args_seq)
 
     def commit(self, *args, **kwargs) -> 'Cursor':
         self._check()
@@ -212,12 +271,131 @@ class Connection:
     def close(self, *args, **kwargs) -> None:
         if not hasattr(self, '_internal'):
             return
-        if self.result:
-            self.cleanup_result()
 
-        if self._internal:
-            self._internal.close()
-        self._internal = None
+        with self._control_lock:
+            if self._control:
+                self._control.close()
+                self._control = None
+
+        with self.lock:
+            if self._internal:
+                self.statement_cache.clear()
+                self.result_cache.clear()
+                self._internal.close()
+                if self.metrics is not None:
+                    stop_counting_allocations()
+            self._internal = None
+
+    def interrupt(self) -> None:
+        """
+        Abort the query that is running on this connection, which then raises an error. This can be called from any
+        thread, it doesn't wait for the running query.
+
+        The queries are stopped from another session on the database, which is opened the first time.
+
+        Raises:
+            NotSupportedError: if MonetDB doesn't report the session of the connection
+        """
+        self._check()
+        session_id = self._get_session_id()
+        if session_id is None:
+            raise exceptions.NotSupportedError("Interrupting queries isn't supported by this version of MonetDB")
+        with self._control_lock:
+            control = self._control_connection()
+            running = control.execute("select tag from sys.queue() "
+                                      f"where sessionid = {int(session_id)} and status = 'running'")
+            for tag, in running.fetchall():
+                try:
+                    control.execute(f"call sys.stop({int(tag)})")
+                except exceptions.Error:
+                    # the query finished in the meantime
+                    pass
+
+    def _control_connection(self) -> 'Connection':
+        """
+        Returns the session that controls the queries of this connection, the caller should hold the control lock.
+        """
+        if not self._control:
+            control = Connection(self._database, autocommit=True, cached_statements=0, **self._control_options)
+            # the control session is never interrupted itself
+            control._session_known = True
+            self._control = control
+        return self._control
+
+    def _get_session_id(self) -> Optional[int]:
+        """
+        Returns the id of the session of this connection in sys.queue(), or None if MonetDB doesn't report it. It is
+        looked up until it is found, which waits for a query that is running on this connection.
+        """
+        if not self._session_known:
+            self._check()
+            self._session_id = self._internal.get_session_id()  # type: ignore[union-attr]
+            # a failed lookup is tried again on the next call, instead of disabling interrupt() for good
+            self._session_known = self._session_id is not None
+        return self._session_id
+
+    def _query_progress(self) -> Optional[Dict[str, Any]]:
+        """
+        Returns the row of sys.queue() of the query running on this connection, or None if it isn't found.
+        """
+        session_id = self._get_session_id()
+        if session_id is None:
+            return None
+        with self._control_lock:
+            cursor = self._control_connection().execute(
+                f"select * from sys.queue() where sessionid = {int(session_id)} and status = 'running'")
+            rows = cursor.fetchall()
+            if not rows:
+                return None
+            return {column.name: value for column, value in zip(cursor.description, rows[0])}
+
+    def _with_progress(self, execute: Callable[..., Any], *args: Any) -> Any:
+        """
+        Execute on a worker thread, and call the progress handler on this thread while it runs. The execution is
+        interrupted if the handler returns a true value, or raises an exception like KeyboardInterrupt.
+        """
+        handler, interval, details = self._progress_handler, self._progress_interval, self._progress_details
+        outcome: Dict[str, Any] = {}
+
+        def run():
+            try:
+                outcome['value'] = execute(*args)
+            except BaseException as e:
+                outcome['error'] = e
+
+        start = perf_counter()
+        worker = Thread(target=run, name='monetdbe-progress', daemon=True)
+        worker.start()
+        cancelled = False
+        try:
+            while True:
+                worker.join(interval)
+                if not worker.is_alive():
+                    break
+                if cancelled:
+                    continue
+                if details:
+                    stop = handler(perf_counter() - start, self._query_progress())  # type: ignore[misc]
+                else:
+                    stop = handler()  # type: ignore[misc]
+                if stop:
+                    cancelled = True
+                    self.interrupt()
+        except BaseException:
+            # the worker can't be abandoned while it uses the connection
+            if worker.is_alive():
+                try:
+                    self.interrupt()
+                except exceptions.Error:
+                    pass
+                worker.join()
+            raise
+
+        if 'error' in outcome:
+            if cancelled:
+                raise exceptions.OperationalError("Query interrupted by the progress handler") from outcome['error']
+            raise outcome['error']
+        return outcome['value']
 
     def cursor(self, factory: Optional[Type['Cursor']] = None) -> 'Cursor':
         """
@@ -244,10 +422,8 @@ class Connection:
 
     def executescript(self, sql_script: str):
         self._check()
-        for query in sql_script.split(';'):
-            query = query.strip()
-            if query:
-                self.execute(query)
+        for query in strip_split_and_clean(sql_script):
+            self.execute(query)
 
     def set_authorizer(self, *args, **kwargs):
         self._check()
@@ -277,13 +453,69 @@ class Connection:
         self._check()
         raise NotImplemented
 
-    def set_progress_handler(self, *args, **kwargs):
+    def set_progress_handler(self, progress_handler: Optional[Callable[..., Any]], n: int,
+                             details: bool = False) -> None:
+        """
+        Register a function that is called every n milliseconds while a query of Cursor.execute() runs, like sqlite3
+        where n counts virtual machine instructions. If the function returns a true value the query is interrupted,
+        and raises an OperationalError.
+
+        A query with a progress handler runs on a worker thread, while the handler is called on the thread that
+        executes the query. See interrupt() for the versions of MonetDB that support interrupting queries.
+
+        Args:
+            progress_handler: the function, or None to remove it
+            n: the interval in milliseconds, the handler is removed if it is less than 1
+            details: pass the elapsed time in seconds, and the row of the query in sys.queue() as a dict (None if it
+                     isn't found), to the handler
+        """
         self._check()
-        raise NotImplemented
+        if n < 1:
+            progress_handler = None
+        self._progress_handler = progress_handler
+        self._progress_interval = n / 1000
+        self._progress_details = details
+
+    def set_trace_callback(self, trace_callback: Optional[Callable[..., Any]], details: bool = False) -> None:
+        """
+        Register a function that is called with the SQL text of every statement executed on the connection, like
+        sqlite3. Prepared statements are traced with their placeholders, appends as "append schema.table".
 
-    def set_trace_callback(self, *args, **kwargs):
+        The callback runs while the connection is locked, so it shouldn't use the connection. Exceptions raised by
+        the callback are logged and otherwise ignored. Without a callback, statements are not timed.
+
+        Args:
+            trace_callback: the function, or None to stop tracing
+            details: also pass the duration in seconds, the number of rows of the result and the number of affected
+                     rows (-1 if the statement failed) to the callback
+        """
         self._check()
-        raise NotImplemented
+        self._trace_callback = trace_callback
+        self._trace_details = details
+
+    def _trace(self, operation: str, seconds: float, rows: int, affected_rows: int) -> None:
+        callback = self._trace_callback
+        if callback is None:
+            return
+        try:
+            if self._trace_details:
+                callback(operation, seconds, rows, affected_rows)
+            else:
+                callback(operation)
+        except Exception:
+            _logger.exception("The trace callback failed")
+
+    def _traced(self, execute: Callable[..., Tuple[Any, int]], operation: str, *args: Any) -> Tuple[Any, int]:
+        """
+        Execute a statement and pass it to the trace callback.
+        """
+        result, affected_rows = None, -1
+        start = perf_counter()
+        try:
+            result, affected_rows = execute(*args)
+            return result, affected_rows
+        finally:
+            self._trace(operation, perf_counter() - start, result.nrows if result else 0, affected_rows)
 
     def create_function(self, *args, **kwargs):
         self._check()
@@ -302,6 +534,11 @@ class Connection:
         self._check()
         return self._internal.in_transaction()
 
+    @property
+    def autocommit(self) -> bool:
+        self._check()
+        return self._internal.get_autocommit()  # type: ignore[union-attr]
+
     def set_autocommit(self, value: bool) -> None:
         """
         Set the connection to auto-commit mode.
@@ -318,10 +555,39 @@ class Connection:
     def write_csv(self, table, *args, **kwargs):
         return self.cursor().write_csv(table, *args, **kwargs)
 
-    def cleanup_result(self):
-        if self.result and self._internal:
-            self._internal.cleanup_result(self.result)
-            self.result = None
+    def upsert(self, table, *args, **kwargs):
+        return self.cursor().upsert(table, *args, **kwargs)
+
+    def execute_batch(self, query, *args, **kwargs):
+        return self.cursor().execute_batch(query, *args, **kwargs)
+
+    def cleanup_result(self, result) -> None:
+        # results are cleaned up with the database when the connection is closed
+        if result and self._internal:
+            with self.measure('cleanup'):
+                self._internal.cleanup_result(result)
+
+    def measure(self, phase: str, operation: Optional[str] = None):
+        """
+        Returns a context manager that times a phase of a statement if metrics are enabled.
+        """
+        if self.metrics is None:
+            return _not_measured
+        return self.metrics.measure(phase, operation)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns the metrics recorded since the connection was opened or the metrics were reset: for every phase of
+        the statements (prepare, execute, append, fetch and cleanup) a histogram of the wall time in seconds, a
+        histogram of the number of cffi allocations per phase, and the number of rows and bytes converted per SQL
+        type. Export every measurement with metrics.add_hook().
+
+        Raises:
+            ProgrammingError: if the connection was opened without metrics
+        """
+        if self.metrics is None:
+            raise exceptions.ProgrammingError("Metrics are not enabled, open the connection with metrics=True")
+        return self.metrics.as_dict()
 
     def query(self, query: str, make_result: bool = False) -> Tuple[Optional[Any], int]:
         """
@@ -330,11 +596,85 @@ class Connection:
         You probably don't want to use this. usually you use a cursor to execute queries.
         """
         self._check()
-        return self._internal.query(query, make_result)  # type: ignore[union-attr]
+        try:
+            with self.measure('execute', query):
+                if self._trace_callback is None:
+                    result, affected_rows = self._internal.query(query, make_result)  # type: ignore[union-attr]
+                else:
+                    result, affected_rows = self._traced(self._internal.query, query, query, make_result)
+        finally:
+            if changes_schema(query):
+                with self.lock:
+                    self.statement_cache.clear()
+        self.invalidate_results(query, affected_rows)
+        return result, affected_rows
+
+    def prepare(self, operation: str) -> Statement:
+        """
+        Prepare an operation, which can then be executed many times.
+
+        Args:
+            operation: The SQL query, with qmark style placeholders for the parameters
+
+        Returns:
+            The prepared statement, which should be closed when it is not used anymore
+        """
+        self._check()
+        return Statement(self, operation)
 
-    def prepare(self, operation: str):
+    def _prepare(self, operation: str):
         self._check()
-        return self._internal.prepare(operation)  # type: ignore[union-attr]
+        with self.measure('prepare', operation):
+            return self._internal.prepare(operation)  # type: ignore[union-attr]
+
+    @contextmanager
+    def prepared(self, operation: str) -> Iterator[Statement]:
+        """
+        Prepare an operation, or reuse it from the statement cache, and return it to the cache afterwards.
+
+        Operations that change the schema or roll back a transaction are not cached, and clear the cache.
+        """
+        self._check()
+        if changes_schema(operation):
+            with self.prepare(operation) as statement:
+                try:
+                    yield statement
+                finally:
+                    with self.lock:
+                        self.statement_cache.clear()
+            return
+
+        with self.lock:
+            cached = self.statement_cache.acquire(operation)
+        try:
+            yield cached.statement
+        finally:
+            with self.lock:
+                self.statement_cache.release(operation, cached)
+
+    def invalidate_results(self, operation: str, affected_rows: int = -1) -> None:
+        """
+        Remove the cached results that may be changed by an executed statement.
+
+        Args:
+            operation: the SQL statement
+            affected_rows: the number of rows the statement changed, nothing is removed if it is 0
+        """
+        if not self.result_cache.max_bytes:
+            return
+        tables = written_tables(operation)
+        with self.lock:
+            if tables is None:
+                self.result_cache.clear()
+            elif tables and affected_rows:
+                self.result_cache.invalidate(tables)
+
+    def binder(self, statement, type_info):
+        """
+        Create a Binder, which binds parameters to a prepared statement using reusable buffers.
+        """
+        self._check()
+        return self._internal.binder(statement, type_info)  # type: ignore[union-attr]
 
     def cleanup_statement(self, statement: str) -> None:
         self._check()
@@ -342,7 +682,83 @@ class Connection:
 
     def append(self, table: str, data: Mapping[str, np.ndarray], schema: str = 'sys') -> None:
         self._check()
-        self._internal.append(table, data, schema)  # type: ignore[union-attr]
+        with self.measure('append', table):
+            if self._trace_callback is None:
+                self._internal.append(table, data, schema)  # type: ignore[union-attr]
+            else:
+                def append() -> Tuple[None, int]:
+                    self._internal.append(table, data, schema)  # type: ignore[union-attr]
+                    return None, len(next(iter(data.values()))) if data else 0
+
+                self._traced(append, f"append {schema}.{table}")
+        if self.result_cache.max_bytes:
+            with self.lock:
+                self.result_cache.invalidate((table,))
+
+    def get_append_columns(self, table: str, schema: Optional[str] = None) -> List[Tuple[str, str, str, int, bool]]:
+        self._check()
+        return self._internal.get_append_columns(table, schema)  # type: ignore[union-attr]
+
+    def load_binary(
+            self,
+            table: str,
+            columns: Mapping[str, Union[np.ndarray, str, Path]],
+            schema: str = 'sys',
+            directory: Optional[Union[str, Path]] = None
+    ) -> int:
+        """
+        Bulk load columns into an existing table using COPY BINARY INTO.
+
+        Arrays are first written to column files in the MonetDB binary format, which MonetDB then reads directly.
+        This is faster than append() for large tables.
+
+        Args:
+            table: The table to load into
+            columns: a mapping of column names to either a (masked) numpy array or the location of an existing
+                     column file.
+            schema: The SQL schema of the table.
+            directory: Where to write the temporary column files. Defaults to a new temporary directory, which is
+                       removed afterwards.
+
+        Returns:
+            The number of loaded rows
+
+        Raises:
+            ProgrammingError: if a column doesn't exist, or its values can't be stored without losing precision
+        """
+        from monetdbe._cffi.convert import monet_c_type_map
+        from monetdbe.bincopy import write_column
+        from monetdbe.monetize import monet_escape, monet_identifier_escape
+
+        self._check()
+        existing = dict(self._internal.get_columns(table=table, schema=schema))  # type: ignore[union-attr]
+        unknown = [name for name in columns if name not in existing]
+        if unknown:
+            raise exceptions.ProgrammingError(f"Columns {', '.join(unknown)} don't exist in table {schema}.{table}")
+        declared_types = self._internal.get_column_types(table, schema)  # type: ignore[union-attr]
+
+        with TemporaryDirectory(dir=directory) as tmp:
+            files = []
+            for name, values in columns.items():
+                if isinstance(values, (str, PathLike)):
+                    files.append(Path(values).resolve())
+                else:
+                    # decimals are stored as scaled integers, the storage type only tells their width
+                    sql_type = monet_c_type_map[existing[name]].sql_type
+                    declared, digits, scale = declared_types[name]
+                    if declared == 'decimal':
+                        path = write_column(Path(tmp) / f"{len(files)}.bin", values, sql_type, scale, digits)
+                    else:
+                        path = write_column(Path(tmp) / f"{len(files)}.bin", values, sql_type)
+                    files.append(path)
+
+            query = "COPY LITTLE ENDIAN BINARY INTO {}.{} ({}) FROM {} ON SERVER".format(
+                monet_identifier_escape(schema),
+                monet_identifier_escape(table),
+                ", ".join(monet_identifier_escape(name) for name in columns),
+                ", ".join(monet_escape(f) for f in files)
+            )
+            return self.execute(query).rowcount
 
     def get_port(self) -> Optional[int]:
         self._check()
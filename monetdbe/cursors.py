@@ -1,22 +1,136 @@
 # mypy: disable-error-code="union-attr, arg-type, assignment"
-from typing import Optional, Iterable, Union, cast, Iterator, Dict, Sequence, TYPE_CHECKING, Any, List, Mapping
+import sys
+from contextlib import contextmanager
+from itertools import chain, count, islice
+from threading import Event, Timer
+from typing import Optional, Iterable, Union, cast, Iterator, Dict, Sequence, TYPE_CHECKING, Any, List, Mapping, Tuple, \
+    FrozenSet
 from warnings import warn
 import numpy as np
-import pandas as pd
 from monetdbe.connection import Connection, Description
-from monetdbe.exceptions import ProgrammingError, InterfaceError
-from monetdbe.formatting import format_query, strip_split_and_clean, parameters_type
-from monetdbe.monetize import monet_identifier_escape
+from monetdbe.exceptions import ProgrammingError, InterfaceError, OperationalError, Error
+from monetdbe.formatting import format_query, strip_split_and_clean, parameters_type, remove_quoted_substrings, \
+    parse_simple_insert, rewrite_in_parameters, list_parameter_types, split_values_insert, normalize_query, \
+    referenced_tables
+from monetdbe.inference import infer_column, append_column
+from monetdbe.monetize import monet_identifier_escape, convert_column, monet_escape
+from monetdbe.results import CachedResult
 from monetdbe.types import supported_numpy_types
 
 if TYPE_CHECKING:
+    import pandas as pd
     from monetdbe.row import Row
+    from monetdbe.statements import Statement
 
 paramstyles = {"qmark", "numeric", "named", "format", "pyformat"}
 
-
-def _pandas_to_numpy_dict(df: pd.DataFrame) -> Dict[str, np.ndarray]:
-    return {label: np.array(column) for label, column in df.items()}  # type: ignore
+# used to give every upsert its own staging table
+_upsert_counter = count()
+
+# used to give every list of values bound to an IN parameter its own temporary table
+_in_list_counter = count()
+
+# the number of rows executemany() collects before appending them as columns
+executemany_append_chunk_size = 10_000
+
+# the maximum number of rows and size in bytes of a generated multi-row INSERT statement
+insert_batch_rows = 1000
+insert_batch_bytes = 1 << 20
+
+# the name, SQL type, digits and nullability of a column
+_append_column_type = Tuple[str, str, int, bool]
+
+# the schema (None if not specified) and name of a table read by a query
+_table_reference = Tuple[Optional[str], str]
+
+
+def _uses_qmark(operation: str, parameters: Any) -> bool:
+    """
+    Returns True if the operation can be prepared by MonetDB and executed with these parameters, which requires a
+    parameter sequence and qmark style placeholders.
+    """
+    if not isinstance(parameters, Sequence) or isinstance(parameters, str):
+        return False
+    cleaned = remove_quoted_substrings(operation)
+    return '?' in cleaned or not (':' in cleaned or '%' in cleaned)
+
+
+def _is_dataframe(values: Any) -> bool:
+    # pandas is only imported when it is used, if it isn't imported yet the values can't be a DataFrame
+    pandas = sys.modules.get('pandas')
+    return pandas is not None and isinstance(values, pandas.DataFrame)
+
+
+def _pandas_to_numpy(column: 'pd.Series') -> np.ndarray:
+    """
+    Converts a pandas column to a numpy array. Missing values of extension types (nullable integers, booleans and
+    floats, strings) become masked values, timezone aware timestamps are converted to UTC.
+    """
+    import pandas as pd
+
+    dtype = column.dtype
+    if isinstance(dtype, np.dtype):
+        return np.array(column)
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return column.dt.tz_convert('UTC').dt.tz_localize(None).to_numpy()
+    mask = column.isna().to_numpy()
+    numpy_dtype = getattr(dtype, 'numpy_dtype', None)
+    if numpy_dtype is not None and numpy_dtype.kind in 'biuf':
+        return np.ma.masked_array(column.to_numpy(dtype=numpy_dtype, na_value=numpy_dtype.type(0)), mask=mask)
+    return np.ma.masked_array(column.to_numpy(dtype=object, na_value=None), mask=mask)
+
+
+def _pandas_to_numpy_dict(df: 'pd.DataFrame') -> Dict[str, np.ndarray]:
+    return {label: _pandas_to_numpy(column) for label, column in df.items()}  # type: ignore
+
+
+def _freeze_parameters(parameters: parameters_type) -> Optional[Tuple[Any, ...]]:
+    """
+    Returns the parameters with their types as a hashable tuple, or None if they can't be part of a cache key.
+    """
+    if parameters is None:
+        return ()
+    items = sorted(parameters.items()) if isinstance(parameters, Mapping) else enumerate(parameters)
+    frozen = tuple((key, type(value), value) for key, value in items)
+    try:
+        hash(frozen)
+    except TypeError:
+        return None
+    return frozen
+
+
+def _read_only_copy(array: np.ndarray) -> np.ndarray:
+    """
+    Copy a (masked) array of a result, so the copy can be shared by the cursors using a cached result.
+    """
+    copy = np.ma.array(array, copy=True)
+    copy.flags.writeable = False
+    mask = np.ma.getmask(copy)
+    if mask is not np.ma.nomask:
+        mask.flags.writeable = False
+    return copy
+
+
+def _estimate_size(columns: List[List[Any]], arrays: Mapping[str, np.ndarray]) -> int:
+    python = sum(sys.getsizeof(column) + sum(map(sys.getsizeof, column)) for column in columns)
+    numpy = sum(array.nbytes + np.ma.getmaskarray(array).nbytes for array in arrays.values())
+    return python + numpy
+
+
+def _rows_to_columns(rows: List[Any], columns: List[_append_column_type]) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Transposes rows of python values into arrays that can be appended to the columns, or returns None if that isn't
+    possible without the database converting values.
+    """
+    if not all(isinstance(row, Sequence) and not isinstance(row, str) and len(row) == len(columns) for row in rows):
+        return None
+    data = {}
+    for (name, sql_type, digits, nullable), values in zip(columns, zip(*rows)):
+        array = append_column(list(values), sql_type, digits, nullable)
+        if array is None:
+            return None
+        data[name] = array
+    return data
 
 
 class Cursor:
@@ -35,6 +149,12 @@ class Cursor:
         self.prepare_id: Optional[int] = None
         self.description: Optional[Description] = None
         self.row_factory = None
+        # every cursor has its own result, so cursors can be used by different threads
+        self.result = None
+        # the result if it comes from the result cache of the connection
+        self._cached_result: Optional[CachedResult] = None
+        # the operation that produced the result, for the metrics of the connection
+        self._operation: Optional[str] = None
 
         self._fetch_generator: Optional[Iterator['Row']] = None
 
@@ -48,23 +168,62 @@ class Cursor:
         self.close()
 
     def _set_description(self):
-        self.description = self.connection.get_description()
+        self.description = self.connection.get_description(self.result)
 
-    def __iter__(self) -> Iterator[Union['Row', Sequence[Any]]]:
+    def _set_result(self, result) -> None:
+        self._cleanup_result()
+        self.result = result
+
+    def _cleanup_result(self) -> None:
+        result, self.result = self.result, None
+        self._cached_result = None
+        self._fetch_generator = None
+        if result and self.connection:
+            self.connection.cleanup_result(result)
+
+    def _has_result(self) -> bool:
+        return bool(self.result) or self._cached_result is not None
+
+    def _record_conversion(self, rows: int) -> None:
+        """
+        Count the values of every column that are converted from the result, if metrics are enabled.
+        """
+        metrics = self.connection.metrics
+        result = self.result
+        if metrics is None or not result or not rows:
+            return
+
+        from monetdbe._cffi.convert import monet_c_type_map
+        from monetdbe._cffi.internal import result_fetch
+
+        with self.connection.lock:
+            types = [monet_c_type_map[result_fetch(result, x).type] for x in range(result.ncols)]
+        for type_info in types:
+            metrics.record_conversion(type_info.sql_type, rows, rows * type_info.numpy_type.itemsize)
+
+    def _rows(self) -> Iterator[Tuple[Any, ...]]:
         # we import this late, otherwise the whole monetdbe project is unimportable
         # if we don't have access to monetdbe shared library
         from monetdbe._cffi.convert import extract
         from monetdbe._cffi.internal import result_fetch
 
-        self._check_connection()
+        if self._cached_result is not None:
+            yield from zip(*self._cached_result.columns)
+            return
+
+        result = self.result
+        if not result:
+            return
+
+        with self.connection.lock:
+            columns = [result_fetch(result, x) for x in range(result.ncols)]
+        for r in range(result.nrows):
+            yield tuple(extract(rcol, r, self.connection.text_factory) for rcol in columns)
 
-        if not self.connection.result:
-            raise StopIteration
+    def __iter__(self) -> Iterator[Union['Row', Sequence[Any]]]:
+        self._check_connection()
 
-        columns = list(map(lambda x: result_fetch(self.connection.result, x),
-                           range(self.connection.result.ncols)))  # type: ignore[union-attr]
-        for r in range(self.connection.result.nrows):
-            row = tuple(extract(rcol, r, self.connection.text_factory) for rcol in columns)
+        for row in self._rows():
             if self.connection.row_factory:
                 yield self.connection.row_factory(cur=self, row=row)
             elif self.row_factory:  # Sqlite backwards compatibly
@@ -89,7 +248,7 @@ class Cursor:
         Raises:
             ProgrammingError: if no result is available.
         """
-        if not self.connection.result:
+        if not self._has_result():
             raise ProgrammingError("fetching data but no query executed")
 
     def _execute_python(self, operation: str, parameters: parameters_type = None) -> 'Cursor':
@@ -110,7 +269,7 @@ class Cursor:
 
         self.description = None  # which will be set later in fetchall
 
-        self.connection.cleanup_result()
+        self._cleanup_result()
 
         splitted = strip_split_and_clean(operation)
         if len(splitted) == 0:
@@ -119,54 +278,261 @@ class Cursor:
             raise ProgrammingError("Multiple queries in one execute() call")
 
         formatted = format_query(operation, parameters)
-        self.connection.result, self.rowcount = self.connection.query(formatted, make_result=True)
+        self._operation = formatted
+        self.result, self.rowcount = self.connection.query(formatted, make_result=True)
         self.connection.total_changes += self.rowcount
         self._set_description()
         return self
 
     def _execute_monetdbe(self, operation: str, parameters: parameters_type = None):
-        from monetdbe._cffi.internal import bind, execute
         self._check_connection()
-        prepare_result = self.connection.prepare(operation)
-        statement = prepare_result[0]
-
-        self.connection.type_info = None
-        if len(prepare_result) == 2:
-            self.connection.type_info = prepare_result[1]
-
-        if parameters:
-            for index, parameter in enumerate(parameters):
-                bind(statement, parameter, index, self.connection.type_info)
-        self.connection.result, self.rowcount = execute(statement, make_result=True)
-        self.connection.cleanup_statement(statement)
+        if parameters and any(isinstance(p, list_parameter_types) for p in parameters):
+            # the temporary tables of the values are shared by the threads using the connection
+            with self.connection.lock:
+                operation, parameters = rewrite_in_parameters(operation, parameters, self._in_list_subquery)
+                with self.connection.prepared(operation) as statement:
+                    return self._execute_statement(statement, parameters)
+        with self.connection.prepared(operation) as statement:
+            return self._execute_statement(statement, parameters)
+
+    def _in_list_subquery(self, index: int, values: Any) -> str:
+        """
+        Load a list of values bound to an "IN ?" parameter into a temporary table of the session, and return a subquery
+        selecting the values.
+
+        The table is reused by later queries, so its name and the rewritten query (and its prepared statement) stay
+        the same.
+        """
+        if isinstance(values, np.ndarray):
+            column = values
+        elif isinstance(values, (set, frozenset)):
+            column = np.array(list(values))
+        else:
+            column = np.array(values)
+        if column.ndim != 1:
+            raise ProgrammingError(f"Can't bind a {column.ndim} dimensional list to parameter {index}")
+        sql_type, column = infer_column(column)
+        if column.dtype.kind == 'O':
+            raise ProgrammingError(f"Can't bind a list of {sql_type} values to parameter {index}")
+        if sql_type.startswith('VARCHAR'):
+            sql_type = 'STRING'
+
+        key = (index, sql_type)
+        name, generation = self.connection._in_list_tables.get(key, (f"monetdbe_in_{next(_in_list_counter)}", None))
+        if generation != self.connection.statement_cache.generation:
+            # the table may have been rolled back or not created yet
+            self.connection.query(f"CREATE LOCAL TEMPORARY TABLE IF NOT EXISTS {name} (v {sql_type}) "
+                                  "ON COMMIT PRESERVE ROWS")
+            self.connection._in_list_tables[key] = name, self.connection.statement_cache.generation
+        self.connection.query(f"DELETE FROM tmp.{name}")
+        if len(column):
+            self.connection.append(name, {'v': column}, schema='tmp')
+        return f"SELECT v FROM tmp.{name}"
+
+    def _execute_statement(self, statement: 'Statement', parameters: parameters_type = None) -> 'Cursor':
+        """
+        Execute a prepared statement.
+
+        Returns:
+            the cursor object itself
+        """
+        self._check_connection()
+        self.description = None
+        self._cleanup_result()
+        self.connection.type_info = statement.param_types
+        self._operation = statement.operation
+        self.result, self.rowcount = statement._execute(parameters, make_result=True)
         self.connection.total_changes += self.rowcount
         self._set_description()
         return self
 
+    def _executemany_statement(self, statement: 'Statement', seq_of_parameters: Iterable[Sequence[Any]]) -> 'Cursor':
+        """
+        Execute a prepared statement for every parameter sequence.
+
+        Returns:
+            the cursor object itself
+        """
+        self._check_connection()
+        self.description = None
+        self._cleanup_result()
+        self.rowcount = statement._executemany(iter(seq_of_parameters))
+        self.connection.total_changes += self.rowcount
+        return self
+
     def execute(
             self,
             operation: str,
             parameters: parameters_type = None,
-            paramstyle: str = "qmark"
+            paramstyle: str = "qmark",
+            timeout: Optional[float] = None
     ) -> 'Cursor':
+        """
+        Execute a database operation.
+
+        Args:
+            operation: the SQL query to execute
+            parameters: an optional sequence or mapping of arguments for the operation
+            paramstyle: the style of the parameters, can be qmark, numeric, named, format or pyformat
+            timeout: the maximum duration of the query in seconds, after which it is interrupted
+
+        Returns:
+            the cursor object itself
+
+        Raises:
+            OperationalError: if the query is interrupted by the timeout
+        """
         if paramstyle not in paramstyles:
             raise ValueError(f"Unknown paramstyle {paramstyle}")
+        self._check_connection()
+        # the session is looked up before the query runs, interrupt() can't use the connection while it runs
+        self.connection._get_session_id()
+        with self._timeout(timeout):
+            self._check_connection()
+            if self.connection._progress_handler is None:
+                return self._execute_operation(operation, parameters, paramstyle)
+            return self.connection._with_progress(self._execute_operation, operation, parameters, paramstyle)
+
+    def _execute_operation(self, operation: str, parameters: parameters_type, paramstyle: str) -> 'Cursor':
+        references = self._cacheable(operation)
+        if references is None:
+            return self._execute_uncached(operation, parameters, paramstyle)
+        return self._execute_cached(operation, parameters, paramstyle, references)
+
+    def _execute_uncached(self, operation: str, parameters: parameters_type, paramstyle: str) -> 'Cursor':
         if (not parameters or isinstance(parameters, Sequence)) and paramstyle == "qmark":
             return self._execute_monetdbe(operation, parameters)
         return self._execute_python(operation, parameters)
 
+    def _cacheable(self, operation: str) -> Optional[FrozenSet[_table_reference]]:
+        """
+        Returns the tables the operation reads if its result can be cached, or None.
+        """
+        if not self.connection.result_cache.max_bytes or self.connection.text_factory:
+            return None
+        return referenced_tables(operation)
+
+    def _execute_cached(
+            self,
+            operation: str,
+            parameters: parameters_type,
+            paramstyle: str,
+            references: FrozenSet[_table_reference]
+    ) -> 'Cursor':
+        """
+        Serve the result of a query from the result cache of the connection, or execute it and cache the result.
+        """
+        frozen = _freeze_parameters(parameters)
+        if frozen is None:
+            return self._execute_uncached(operation, parameters, paramstyle)
+        key = (normalize_query(operation), paramstyle, frozen)
+        cache = self.connection.result_cache
+        with self.connection.lock:
+            cached = cache.get(key)
+            version = cache.version
+        if cached is None:
+            self._execute_uncached(operation, parameters, paramstyle)
+            if not self.result or not self._base_tables(references):
+                return self
+            cached = self._convert_result(frozenset(table for _, table in references))
+            if cached is None:
+                return self
+            with self.connection.lock:
+                cache.put(key, cached, version)
+        else:
+            self.connection.total_changes += cached.rowcount
+
+        self._cleanup_result()
+        self._cached_result = cached
+        self._operation = operation
+        self.description = cached.description
+        self.rowcount = cached.rowcount
+        return self
+
+    def _base_tables(self, references: FrozenSet[_table_reference]) -> bool:
+        """
+        Returns True if all references are regular tables, and not views, temporary or merge tables, of which the
+        contents can change without the result cache noticing.
+        """
+        base_tables = self.connection.result_cache.base_tables
+        unknown = [reference for reference in references if reference not in base_tables]
+        if unknown:
+            conditions = " OR ".join(
+                f"(s.name = {monet_escape(schema) if schema else 'CURRENT_SCHEMA'} AND t.name = {monet_escape(table)})"
+                for schema, table in unknown)
+            found = self.connection.cursor()._execute_python(
+                "SELECT s.name, t.name, CURRENT_SCHEMA FROM sys.tables t JOIN sys.schemas s ON t.schema_id = s.id "
+                f"WHERE t.type IN (0, 10) AND ({conditions})").fetchall()
+            existing = {(schema, table) for schema, table, _ in found}
+            current = found[0][2] if found else None
+            with self.connection.lock:
+                for schema, table in unknown:
+                    base_tables[(schema, table)] = (schema or current, table) in existing
+        return all(base_tables.get(reference, False) for reference in references)
+
+    def _convert_result(self, tables: FrozenSet[str]) -> Optional[CachedResult]:
+        """
+        Convert the result to python values and arrays for the result cache, or return None if it doesn't fit.
+        """
+        from monetdbe._cffi.convert import extract
+        from monetdbe._cffi.internal import result_fetch, result_fetch_numpy
+
+        result = self.result
+        # time columns can't be converted to numpy, and the result should fit in the cache with 8 bytes per value
+        if any(d.type_code == 'time' for d in self.description) or \
+                result.nrows * result.ncols * 8 > self.connection.result_cache.max_bytes:
+            return None
+        with self.connection.lock:
+            rcols = [result_fetch(result, c) for c in range(result.ncols)]
+            columns = [[extract(rcol, r) for r in range(result.nrows)] for rcol in rcols]
+            arrays = {name: _read_only_copy(array) for name, array in result_fetch_numpy(result).items()}
+        return CachedResult(self.description, self.rowcount, columns, arrays, tables, _estimate_size(columns, arrays))
+
+    @contextmanager
+    def _timeout(self, timeout: Optional[float]):
+        """
+        Interrupt the connection if the block takes longer than timeout seconds.
+        """
+        if timeout is None:
+            yield
+            return
+        self._check_connection()
+        timed_out = Event()
+
+        def interrupt():
+            # set first, the interrupted query can fail before interrupt() returns
+            timed_out.set()
+            self.connection.interrupt()
+
+        timer = Timer(timeout, interrupt)
+        timer.daemon = True
+        timer.start()
+        try:
+            yield
+        except Error as e:
+            if timed_out.is_set():
+                raise OperationalError(f"Query interrupted after the timeout of {timeout} seconds") from e
+            raise
+        finally:
+            timer.cancel()
+            # an interrupt that is in progress shouldn't hit the next query
+            timer.join()
+
     def executemany(self, operation: str, seq_of_parameters: Union[Iterator, Iterable[Iterable]]) -> 'Cursor':
         """
         Prepare a database operation (query or command) and then execute it against all parameter sequences or
         mappings found in the sequence seq_of_parameters.
 
+        With qmark style parameters the operation is prepared only once, and the parameters are consumed lazily.
+
         Args:
             operation: the SQL query to execute
             seq_of_parameters: An optional iterator or iterable containing an iterable of arguments
         """
         self._check_connection()
+        self.connection._get_session_id()
         self.description = None  # which will be set later in fetchall
-        self.connection.cleanup_result()
+        self._cleanup_result()
         total_affected_rows = 0
 
         if operation[:6].lower().strip() == 'select':
@@ -177,27 +543,194 @@ class Cursor:
         else:
             iterator = seq_of_parameters  # type: ignore   # mypy gets confused here
 
-        while True:
-            try:
-                parameters = next(iterator)
-            except StopIteration:
-                break
+        try:
+            first = next(iterator)
+        except StopIteration:
+            first = None
 
-            formatted = format_query(operation, parameters)
-            self.connection.result, affected_rows = self.connection.query(formatted, make_result=True)
-            total_affected_rows += affected_rows
+        if first is not None and _uses_qmark(operation, first):
+            total_affected_rows = self._executemany_monetdbe(operation, chain([first], iterator))
+        elif first is not None:
+            total_affected_rows = self._executemany_python(operation, chain([first], iterator))
 
         self.rowcount = total_affected_rows
         self.connection.total_changes += total_affected_rows
         self._set_description()
         return self
 
+    def _executemany_python(self, operation: str, iterator: Iterator[parameters_type]) -> int:
+        """
+        Format the operation in python for every parameter sequence or mapping produced by the iterator. The rows of
+        an "INSERT ... VALUES (...)" are inserted with multi-row INSERT statements.
+
+        Returns:
+            the total number of affected rows
+        """
+        split = split_values_insert(operation)
+        if split:
+            prefix, values = split
+            return self._insert_values(prefix, (format_query(values, parameters) for parameters in iterator))
+
+        total_affected_rows = 0
+        for parameters in iterator:
+            formatted = format_query(operation, parameters)
+            result, affected_rows = self.connection.query(formatted, make_result=True)
+            self._set_result(result)
+            total_affected_rows += affected_rows
+        return total_affected_rows
+
+    def _insert_values(self, prefix: str, rows: Iterable[str]) -> int:
+        """
+        Insert rows of SQL literals like "(1, 'a')", combining at most insert_batch_rows rows or insert_batch_bytes
+        bytes in a single INSERT statement.
+
+        Args:
+            prefix: the statement up to and including VALUES
+            rows: the rows to insert
+
+        Returns:
+            the total number of affected rows
+        """
+        total_affected_rows = 0
+        batch: List[str] = []
+        size = 0
+        for row in rows:
+            batch.append(row)
+            size += len(row)
+            if len(batch) >= insert_batch_rows or size >= insert_batch_bytes:
+                total_affected_rows += self.connection.query(prefix + ', '.join(batch))[1]
+                batch = []
+                size = 0
+        if batch:
+            total_affected_rows += self.connection.query(prefix + ', '.join(batch))[1]
+        return total_affected_rows
+
+    def _executemany_monetdbe(self, operation: str, iterator: Iterator[Sequence[Any]]) -> int:
+        """
+        Execute a qmark style operation for every parameter sequence produced by the iterator.
+
+        The rows of a simple "INSERT INTO t VALUES (?, ...)" are collected in chunks, which are appended to the table
+        as columns. Chunks with values that don't strictly fit the column types are inserted row by row.
+
+        Returns:
+            the total number of affected rows
+        """
+        target = self._append_target(operation)
+        if not target:
+            return self._executemany_prepared(operation, iterator)
+
+        schema, table, columns = target
+        total_affected_rows = 0
+        while True:
+            chunk = list(islice(iterator, executemany_append_chunk_size))
+            if not chunk:
+                return total_affected_rows
+            data = _rows_to_columns(chunk, columns)
+            if data is None:
+                total_affected_rows += self._executemany_prepared(operation, iter(chunk))
+            else:
+                self.connection.append(table, data, schema)
+                total_affected_rows += len(chunk)
+
+    def _append_target(self, operation: str) -> Optional[Tuple[str, str, List[_append_column_type]]]:
+        """
+        Returns the schema, table and columns (in placeholder order) if the operation is an INSERT of all columns of
+        a table that can be appended to.
+        """
+        parsed = parse_simple_insert(operation)
+        if not parsed:
+            return None
+        schema, table, names, placeholders = parsed
+        existing = self.connection.get_append_columns(table, schema)
+        if not existing:
+            return None
+        by_name = {name: (name, sql_type, digits, nullable) for _, name, sql_type, digits, nullable in existing}
+        if names is None:
+            names = list(by_name)
+        if len(names) != placeholders or sorted(names) != sorted(by_name):
+            return None
+        return existing[0][0], table, [by_name[name] for name in names]
+
+    def _executemany_prepared(self, operation: str, iterator: Iterator[Sequence[Any]]) -> int:
+        """
+        Prepare the operation (or reuse it from the statement cache), and execute it for every parameter sequence
+        produced by the iterator. From the first sequence with a value that can't be bound to its parameter as is, the
+        rest is formatted in python instead.
+
+        Returns:
+            the total number of affected rows
+        """
+        total_affected_rows = 0
+        remaining = None
+        with self.connection.prepared(operation) as statement:
+            for parameters in iterator:
+                if not statement._fits(parameters):
+                    remaining = chain([parameters], iterator)
+                    break
+                _, affected_rows = statement._execute(parameters)
+                total_affected_rows += affected_rows
+        if remaining is not None:
+            # values of other types than their parameters, like numbers for a string column, are formatted as SQL
+            # literals which MonetDB converts
+            total_affected_rows += self._executemany_python(operation, remaining)
+        return total_affected_rows
+
+    def execute_batch(
+            self,
+            operation: str,
+            seq_of_parameters: Iterable[Sequence[Any]],
+            batch_column: str = 'batch'
+    ) -> 'pd.DataFrame':
+        """
+        Execute a query for every parameter sequence on a single prepared statement, and concatenate the results.
+
+        Args:
+            operation: the SQL query to execute, with qmark style placeholders
+            seq_of_parameters: an iterable of parameter sequences
+            batch_column: the name of the extra column with the index of the parameter sequence that produced a row
+
+        Returns:
+            A pandas DataFrame with the rows of all results
+
+        Raises:
+            ProgrammingError: if the query has a column named like the batch column
+        """
+        import pandas as pd
+        from monetdbe._cffi.internal import result_fetch_numpy
+
+        self._check_connection()
+        self.description = None
+        self._cleanup_result()
+
+        batches = []
+        counts = []
+        with self.connection.prepared(operation) as statement:
+            names = [column.name for column in statement.columns]
+            if batch_column in names:
+                raise ProgrammingError(f"The query already has a column named {batch_column}")
+            for parameters in seq_of_parameters:
+                result, _ = statement._execute(parameters, make_result=True)
+                try:
+                    # the arrays are views of the result, which is freed below
+                    with self.connection.lock:
+                        batches.append({name: np.ma.array(values, copy=True)
+                                        for name, values in result_fetch_numpy(result).items()})
+                    counts.append(result.nrows)
+                finally:
+                    self.connection.cleanup_result(result)
+
+        data = {batch_column: np.repeat(np.arange(len(batches), dtype=np.int64), counts)}
+        for name in batches[0] if batches else names:
+            data[name] = np.ma.concatenate([batch[name] for batch in batches]) if batches else np.array([])
+        self.rowcount = sum(counts)
+        return pd.DataFrame(data)
+
     def close(self) -> None:
         """
         Shut down the connection.
         """
-        if hasattr(self, 'connection') and self.connection and self.connection.result:
-            self.connection.cleanup_result()
+        if hasattr(self, 'connection') and self.connection and self._has_result():
+            self._cleanup_result()
         self.connection = None
 
     def executescript(self, sql_script: str) -> None:
@@ -223,12 +756,12 @@ class Cursor:
     def create(self, table, values, schema=None):
         """
         Creates a table from a set of values or a pandas DataFrame.
+
+        The column types are inferred from the data, and the table is created and filled in a single transaction.
         """
         # note: this is a backwards compatibility function with monetdblite
         self._check_connection()
 
-        column_types = []
-
         if not isinstance(values, dict):
             values = _pandas_to_numpy_dict(values)
         else:
@@ -241,27 +774,12 @@ class Cursor:
             values = vals
         if schema is None:
             schema = "sys"
+
+        column_types = []
         for key, value in values.items():
-            arr = np.array(value)
-            if arr.dtype == np.bool_:
-                column_type = "BOOLEAN"
-            elif arr.dtype == np.int8:
-                column_type = 'TINYINT'
-            elif arr.dtype == np.int16 or arr.dtype == np.uint8:
-                column_type = 'SMALLINT'
-            elif arr.dtype == np.int32 or arr.dtype == np.uint16:
-                column_type = 'INT'
-            elif arr.dtype == np.int64 or arr.dtype == np.uint32 or arr.dtype == np.uint64:
-                column_type = 'BIGINT'
-            elif arr.dtype == np.float32:
-                column_type = 'REAL'
-            elif arr.dtype == np.float64:
-                column_type = 'DOUBLE'
-            elif np.issubdtype(arr.dtype, np.str_) or np.issubdtype(arr.dtype, np.str_) or np.issubdtype(arr.dtype, np.object_):
-                column_type = 'STRING'
-            else:
-                raise Exception('Unsupported dtype: %s' % (str(arr.dtype)))
+            column_type, values[key] = infer_column(value, key)
             column_types.append(column_type)
+
         query = 'CREATE TABLE %s.%s (' % (
             monet_identifier_escape(schema), monet_identifier_escape(table))
         index = 0
@@ -269,22 +787,46 @@ class Cursor:
             query += '%s %s, ' % (monet_identifier_escape(key), column_types[index])
             index += 1
         query = query[:-2] + ");"
-        # create the table
-        self.execute(query)
-        # insert the data into the table
-        self.insert(table, values, schema=schema)
+
+        with self._transaction():
+            # create the table
+            self.execute(query)
+            # insert the data into the table
+            self.insert(table, values, schema=schema)
         return self
 
+    @contextmanager
+    def _transaction(self):
+        """
+        Run a block in a transaction, if we are in autocommit mode and not in a transaction yet. In all other cases
+        the block becomes part of the transaction of the user.
+        """
+        if not self.connection.autocommit or self.connection.in_transaction:
+            yield
+            return
+
+        self.execute("START TRANSACTION")
+        try:
+            yield
+        except Exception:
+            self.execute("ROLLBACK")
+            raise
+        self.execute("COMMIT")
+
     def _insert_slow(self, table: str, data: Dict[str, np.ndarray], schema: str = 'sys'):
-        column_names = data.keys()
-        rows = data.values()
-        columns = ", ".join([str(i) for i in column_names])
-        rows_zipped = list(zip(*rows))
-        qmarks = ", ".join(['?'] * len(column_names))
-        query = f"insert into {schema}.{table} ({columns}) values ({qmarks})"
-        return self.executemany(query, rows_zipped)
+        self._check_connection()
+        self.description = None
+        self._cleanup_result()
+        # quoted like in create(), and like append() which takes the names as they are
+        columns = ", ".join(monet_identifier_escape(name) for name in data.keys())
+        literals = [convert_column(values).tolist() for values in data.values()]
+        rows = ('(' + ', '.join(row) + ')' for row in zip(*literals))
+        prefix = f"insert into {monet_identifier_escape(schema)}.{monet_identifier_escape(table)} ({columns}) values "
+        self.rowcount = self._insert_values(prefix, rows)
+        self.connection.total_changes += self.rowcount
+        return self
 
-    def insert(self, table: str, values: Union[pd.DataFrame, Mapping[str, np.ndarray]], schema: str = 'sys'):
+    def insert(self, table: str, values: Union['pd.DataFrame', Mapping[str, np.ndarray]], schema: str = 'sys'):
         """
         Inserts a set of values into the specified table.
 
@@ -293,7 +835,7 @@ class Cursor:
             values: The values. must be either a pandas DataFrame or a dictionary of values.
             schema: The SQL schema to use. If no schema is specified, the "sys" schema is used.
        """
-        if isinstance(values, pd.DataFrame):
+        if _is_dataframe(values):
             prepared = _pandas_to_numpy_dict(values)
         else:
             prepared = values
@@ -312,6 +854,79 @@ class Cursor:
             return self._insert_slow(table, prepared, schema)
         return self.connection.append(schema=schema, table=table, data=prepared)
 
+    def upsert(
+            self,
+            table: str,
+            values: Union['pd.DataFrame', Mapping[str, np.ndarray]],
+            key_columns: Union[str, Sequence[str]],
+            schema: str = 'sys'
+    ) -> 'Cursor':
+        """
+        Insert or update a set of values in the specified table.
+
+        The values are appended to a temporary table, which is then merged into the table with a single MERGE INTO
+        statement. Rows that match an existing row on all key columns update that row, the others are inserted.
+        Rows with a NULL key never match and are always inserted.
+
+        Args:
+            table: The table to merge into
+            values: The values. must be either a pandas DataFrame or a dictionary of values.
+            key_columns: The name(s) of the column(s) identifying a row
+            schema: The SQL schema to use. If no schema is specified, the "sys" schema is used.
+
+        Returns:
+            the cursor, with the number of merged rows as rowcount
+        """
+        self._check_connection()
+
+        if _is_dataframe(values):
+            prepared = _pandas_to_numpy_dict(values)
+        else:
+            prepared = dict(values)
+
+        if isinstance(key_columns, str):
+            key_columns = [key_columns]
+        missing = [key for key in key_columns if key not in prepared]
+        if missing:
+            raise ProgrammingError(f"Key columns {', '.join(missing)} are not in the upserted values")
+
+        columns = [monet_identifier_escape(column) for column in prepared]
+        keys = [monet_identifier_escape(key) for key in key_columns]
+        updates = [column for column in columns if column not in keys]
+        target = f"{monet_identifier_escape(schema)}.{monet_identifier_escape(table)}"
+        staging = f"monetdbe_upsert_{next(_upsert_counter)}"
+
+        merge = f"MERGE INTO {target} AS t USING tmp.{staging} AS s ON " + \
+            " AND ".join(f"t.{key} = s.{key}" for key in keys)
+        if updates:
+            merge += " WHEN MATCHED THEN UPDATE SET " + ", ".join(f"{column} = s.{column}" for column in updates)
+        merge += f" WHEN NOT MATCHED THEN INSERT ({', '.join(columns)}) " \
+            f"VALUES ({', '.join(f's.{column}' for column in columns)})"
+
+        with self._transaction():
+            self.execute(f"CREATE LOCAL TEMPORARY TABLE {staging} AS SELECT {', '.join(columns)} FROM {target} "
+                         "WITH NO DATA ON COMMIT PRESERVE ROWS")
+            try:
+                self.insert(staging, prepared, schema='tmp')
+                merged = self.execute(merge).rowcount
+            except Exception:
+                self._drop_staging(staging)
+                raise
+            self.execute(f"DROP TABLE tmp.{staging}")
+
+        self.rowcount = merged
+        return self
+
+    def _drop_staging(self, staging: str) -> None:
+        """
+        Drop the staging table of a failed upsert, also when the upsert is part of the transaction of the user.
+        """
+        try:
+            self.execute(f"DROP TABLE IF EXISTS tmp.{staging}")
+        except Error:
+            # the failure aborted the transaction, rolling it back also drops the table
+            pass
+
     def setoutputsize(self, *args, **kwargs) -> None:
         """
         This method would normally set a column buffer size for fetching of large columns.
@@ -360,10 +975,12 @@ class Cursor:
         raise NotImplementedError
 
     def read_csv(self, table, *args, **kwargs):
+        import pandas as pd
+
         values = pd.read_csv(*args, **kwargs)
         return self.create(table=table, values=values)
 
-    def fetchdf(self) -> pd.DataFrame:
+    def fetchdf(self) -> 'pd.DataFrame':
         """
         Fetch all results and return a Pandas DataFrame.
 
@@ -371,6 +988,8 @@ class Cursor:
         """
         self._check_connection()
         self._check_result()
+        import pandas as pd
+
         return pd.DataFrame(cast(pd.DataFrame, self.fetchnumpy()))  # cast to make mypy happy
 
     def fetchmany(self, size=None):
@@ -390,7 +1009,7 @@ class Cursor:
         self._check_connection()
         # self._check_result() sqlite test suite doesn't want us to bail out
 
-        if not self.connection.result:
+        if not self._has_result():
             return []
 
         if not size:
@@ -399,11 +1018,13 @@ class Cursor:
             self._fetch_generator = self.__iter__()
 
         rows = []
-        for i in range(size):
-            try:
-                rows.append(next(self._fetch_generator))
-            except StopIteration:
-                break
+        with self.connection.measure('fetch', self._operation):
+            for i in range(size):
+                try:
+                    rows.append(next(self._fetch_generator))
+                except StopIteration:
+                    break
+            self._record_conversion(len(rows))
         return rows
 
     def fetchone(self) -> Optional[Union['Row', Sequence]]:
@@ -420,15 +1041,18 @@ class Cursor:
         self._check_connection()
         # self._check_result() sqlite test suite doesn't want us to bail out
 
-        if not self.connection.result:
+        if not self._has_result():
             return None
 
         if not self._fetch_generator:
             self._fetch_generator = self.__iter__()
-        try:
-            return next(self._fetch_generator)  # type: ignore[arg-type]
-        except StopIteration:
-            return None
+        with self.connection.measure('fetch', self._operation):
+            try:
+                row = next(self._fetch_generator)
+            except StopIteration:
+                return None
+            self._record_conversion(1)
+        return row  # type: ignore[return-value]
 
     def write_csv(self, table, *args, **kwargs):
         return self.execute(f"select * from {table}").fetchdf().to_csv(*args, **kwargs)
@@ -462,11 +1086,13 @@ class Cursor:
         if not self.connection.consistent:
             raise InterfaceError("Tranaction rolled back, state inconsistent")
 
-        if not self.connection.result:
+        if not self._has_result():
             return []
 
-        rows = [i for i in self]
-        self.connection.cleanup_result()
+        with self.connection.measure('fetch', self._operation):
+            rows = [i for i in self]
+            self._record_conversion(len(rows))
+        self._cleanup_result()
         return rows
 
     def _fetchnumpy_slow(self) -> Mapping[str, np.ndarray]:
@@ -493,4 +1119,11 @@ class Cursor:
 
         self._check_connection()
         self._check_result()
-        return result_fetch_numpy(self.connection.result)  # type: ignore[union-attr]
+        if self._cached_result is not None:
+            with self.connection.measure('fetch', self._operation):
+                return dict(self._cached_result.arrays)
+        with self.connection.measure('fetch', self._operation):
+            with self.connection.lock:
+                arrays = result_fetch_numpy(self.result)
+            self._record_conversion(self.result.nrows)
+        return arrays
@@ -25,7 +25,7 @@ from time import localtime
 from monetdbe.connection import Connection
 
 paramstyle = "qmark"
-threadsafety = 1
+threadsafety = 2
 apilevel = "2.0"
 Date = date
 Time = time
@@ -0,0 +1,198 @@
+"""
+This module contains a cache of query results on disk, which is shared by processes and kept between runs.
+
+Every result is stored as a directory with a .npy file per column, which later runs map into memory instead of
+executing the query again.
+"""
+import json
+import os
+from hashlib import sha256
+from pathlib import Path
+from shutil import rmtree
+from tempfile import mkdtemp
+from typing import Union, Optional, Mapping, Dict, List, Tuple, Any, TYPE_CHECKING
+
+import numpy as np
+
+from monetdbe.connection import Connection
+from monetdbe.cursors import _freeze_parameters  # type: ignore[attr-defined]
+from monetdbe.exceptions import ProgrammingError
+from monetdbe.formatting import parameters_type, normalize_query, referenced_tables
+from monetdbe.monetize import monet_escape, monet_identifier_escape
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# the schema, name, id and number of rows of every table a query reads
+_stamp_type = List[Tuple[str, str, int, int]]
+
+
+class DiskCache:
+    """
+    A cache of query results in a directory, keyed by the query, its parameters and the database.
+
+    A cached result is used as long as the tables the query reads have the same number of rows, and haven't been
+    dropped and created again. Updates that don't change the number of rows are not noticed, call clear() after
+    changing the tables in place. Like the result cache of a connection, only queries that read regular tables by name
+    are cached, other queries are executed every time.
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Args:
+            directory: where to store the results, it is created if it doesn't exist
+        """
+        self.directory = Path(directory).resolve()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+
+    def fetchnumpy(self, connection: Connection, query: str, parameters: parameters_type = None) \
+            -> Mapping[str, np.ndarray]:
+        """
+        Return the cached result of a query, or execute it and cache the result.
+
+        Args:
+            connection: a connection to a database directory
+            query: the SELECT query, with qmark style placeholders
+            parameters: the parameters of the query
+
+        Returns:
+            The result like Cursor.fetchnumpy(). Cached columns are read-only arrays mapped from the cache files.
+        """
+        connection._check()
+        if connection._database is None:
+            raise ProgrammingError("Results of an in-memory database can't be cached on disk")
+
+        frozen = _freeze_parameters(parameters)
+        references = referenced_tables(query)
+        stamp = self._stamp(connection, references) if references and frozen is not None else None
+        if stamp is None:
+            return self._execute(connection, query, parameters)
+
+        key = repr((str(connection._database), normalize_query(query), frozen))
+        path = self.directory / sha256(key.encode()).hexdigest()
+        cached = self._load(path, key, stamp)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        result = self._execute(connection, query, parameters)
+        self._store(path, key, stamp, result)
+        return result
+
+    @staticmethod
+    def _execute(connection: Connection, query: str, parameters: parameters_type) -> Dict[str, np.ndarray]:
+        """
+        Execute the query, and copy the result out of the buffers of MonetDB, which are freed with the cursor.
+        """
+        cursor = connection.cursor()
+        try:
+            result = cursor._execute_uncached(query, parameters, "qmark").fetchnumpy()
+            return {name: np.ma.array(values, copy=True) for name, values in result.items()}
+        finally:
+            cursor.close()
+
+    def fetchdf(self, connection: Connection, query: str, parameters: parameters_type = None) -> 'pd.DataFrame':
+        """
+        Like fetchnumpy(), but returns a pandas DataFrame.
+        """
+        import pandas as pd
+
+        return pd.DataFrame(dict(self.fetchnumpy(connection, query, parameters)))
+
+    def clear(self) -> None:
+        """
+        Remove all cached results.
+        """
+        for path in self.directory.iterdir():
+            if path.is_dir():
+                rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _stamp(connection: Connection, references: Any) -> Optional[_stamp_type]:
+        """
+        Look up the id and number of rows of the tables, or return None if any of them isn't a regular table.
+        """
+        conditions = " OR ".join(
+            f"(s.name = {monet_escape(schema) if schema else 'CURRENT_SCHEMA'} AND t.name = {monet_escape(table)})"
+            for schema, table in references)
+        # these queries bypass the result cache of the connection, which doesn't see changes by other connections
+        found = connection.cursor()._execute_python(
+            "SELECT s.name, t.name, t.id, CURRENT_SCHEMA FROM sys.tables t JOIN sys.schemas s ON t.schema_id = s.id "
+            f"WHERE t.type IN (0, 10) AND ({conditions})").fetchall()
+        if not found:
+            return None
+        current = found[0][3]
+        tables = {(schema, table): id_ for schema, table, id_, _ in found}
+        resolved = sorted({(schema or current, table) for schema, table in references})
+        if any(reference not in tables for reference in resolved):
+            return None
+        counts = connection.cursor()._execute_python("SELECT " + ", ".join(
+            f"(SELECT count(*) FROM {monet_identifier_escape(schema)}.{monet_identifier_escape(table)})"
+            for schema, table in resolved)).fetchone()
+        return [(schema, table, tables[(schema, table)], count) for (schema, table), count in zip(resolved, counts)]
+
+    @staticmethod
+    def _load(path: Path, key: str, stamp: _stamp_type) -> Optional[Dict[str, np.ndarray]]:
+        try:
+            with open(path / 'meta.json') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta['key'] != key or meta['stamp'] != json.loads(json.dumps(stamp)):
+            return None
+
+        # an empty file can't be mapped into memory
+        mmap_mode = 'r' if meta['rows'] else None
+        result = {}
+        try:
+            for i, (name, masked) in enumerate(zip(meta['columns'], meta['masked'])):
+                data = np.load(path / f'{i}.npy', mmap_mode=mmap_mode, allow_pickle=False)
+                mask = np.load(path / f'{i}.mask.npy', mmap_mode=mmap_mode, allow_pickle=False) if masked \
+                    else np.ma.nomask
+                result[name] = np.ma.masked_array(data, mask=mask)
+        except (OSError, ValueError):
+            # removed or replaced by another process in the meantime
+            return None
+        return result
+
+    def _store(self, path: Path, key: str, stamp: _stamp_type, result: Mapping[str, np.ndarray]) -> None:
+        """
+        Write a result to a new directory, which then replaces the cached result.
+        """
+        columns = [(name, np.ma.getdata(array), np.ma.getmaskarray(array)) for name, array in result.items()]
+        if any(data.dtype.kind == 'O' for _, data, _ in columns):
+            # arrays of python objects can only be pickled, which can't be mapped into memory
+            return
+
+        tmp = Path(mkdtemp(dir=self.directory, prefix='.tmp'))
+        try:
+            for i, (_, data, mask) in enumerate(columns):
+                np.save(tmp / f'{i}.npy', data, allow_pickle=False)
+                if mask.any():
+                    np.save(tmp / f'{i}.mask.npy', mask, allow_pickle=False)
+            meta = {
+                'key': key,
+                'stamp': stamp,
+                'rows': len(columns[0][1]) if columns else 0,
+                'columns': [name for name, _, _ in columns],
+                'masked': [bool(mask.any()) for _, _, mask in columns],
+            }
+            with open(tmp / 'meta.json', 'w') as f:
+                json.dump(meta, f)
+
+            # readers that mapped the files of the old result keep them until they are done
+            old = None
+            if path.exists():
+                old = Path(mkdtemp(dir=self.directory, prefix='.old'))
+                os.replace(path, old / 'result')
+            os.replace(tmp, path)
+            if old:
+                rmtree(old, ignore_errors=True)
+        except OSError:
+            # another process stored the result at the same time
+            pass
+        finally:
+            rmtree(tmp, ignore_errors=True)
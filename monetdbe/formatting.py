@@ -1,12 +1,89 @@
-from re import compile, sub, DOTALL
+from re import compile, findall, sub, DOTALL, IGNORECASE
+from functools import lru_cache
+from itertools import count
 from string import Formatter
-from typing import Dict, Optional, Union, Iterable, Any, List, Sized, Collection, Sequence, Mapping
+from typing import Dict, Optional, Union, Iterable, Any, List, Sized, Collection, Sequence, Mapping, Tuple, Callable, \
+    NamedTuple, FrozenSet
+
+import numpy as np
 
 from monetdbe.exceptions import ProgrammingError
 from monetdbe.monetize import convert
 
-# use this pattern to split a string on non-escaped semicolumns
-semicolumn_split_pattern = compile(r'''((?:[^;"']|"[^"]*"|'[^']*')+)''')
+# the tokens of an SQL script: quoted strings and identifiers, line and block comments, semicolons and other text.
+# unterminated strings and comments run to the end of the script.
+script_token_pattern = compile(r"""'(?:[^'\\]|\\.)*'?|"[^"]*"?|--[^\n]*|/\*.*?(?:\*/|\Z)|;|[^'";/-]+|[/-]""", DOTALL)
+
+# the number of queries for which the parsed query templates are kept
+template_cache_size = 256
+
+# statements after which prepared statements may refer to changed or removed objects
+schema_change_pattern = compile(r'\s*(?:create|drop|alter|comment|grant|revoke|rollback|set\s+schema)\b', IGNORECASE)
+
+# qmark placeholders outside of quoted strings, and the "IN ?" and "= ANY(?)" forms that accept a list of values
+in_parameter_pattern = compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|(\bin\s*\?|=\s*any\s*\(\s*\?\s*\))|\?""", IGNORECASE)
+
+# parameter types that are bound as a list of values
+list_parameter_types = (list, tuple, set, frozenset, range, np.ndarray)
+
+# a quoted or unquoted SQL identifier
+identifier_pattern = r'(?:"(?:[^"]|"")+"|[A-Za-z_][A-Za-z0-9_]*)'
+
+# an INSERT into a table with an optional column list, ending in a VALUES list which can be extended with more rows
+values_insert_pattern = compile(
+    rf'(\s*insert\s+into\s+(?:{identifier_pattern}\s*\.\s*)?{identifier_pattern}\s*'
+    rf'(?:\(\s*{identifier_pattern}(?:\s*,\s*{identifier_pattern})*\s*\)\s*)?values\s*)(\(.*\))\s*;?\s*',
+    IGNORECASE | DOTALL
+)
+
+# an INSERT of a single row of qmark placeholders into a table, with an optional column list
+simple_insert_pattern = compile(
+    rf'\s*insert\s+into\s+(?:({identifier_pattern})\s*\.\s*)?({identifier_pattern})\s*'
+    rf'(?:\(\s*({identifier_pattern}(?:\s*,\s*{identifier_pattern})*)\s*\)\s*)?'
+    r'values\s*\((\s*\?(?:\s*,\s*\?)*)\s*\)\s*;?\s*',
+    IGNORECASE
+)
+
+# quoted strings and identifiers, and the whitespace between the other tokens of a query
+normalize_pattern = compile(r"""('(?:[^'\\]|\\.)*'|"[^"]*")|\s+""")
+
+# a quoted string
+literal_pattern = compile(r"'(?:[^'\\]|\\.)*'")
+
+# statements that only read, and don't change the results of other queries
+read_pattern = compile(r'\s*(?:select|with|explain|plan|start\s+transaction|begin|commit|savepoint|release)\b',
+                       IGNORECASE)
+
+# the keywords of statements that change data, a WITH query containing these may write
+write_keyword_pattern = compile(r'\b(?:insert|update|delete|merge|copy|truncate)\b', IGNORECASE)
+
+# statements that change the data of a single table, the table name is in the second group
+write_pattern = compile(
+    rf'\s*(?:insert\s+into|update|delete\s+from|truncate(?:\s+table)?|merge\s+into|copy\b[^;]*?\binto)\s+'
+    rf'(?:({identifier_pattern})\s*\.\s*)?({identifier_pattern})',
+    IGNORECASE | DOTALL
+)
+
+# a query of which the result can be cached
+select_pattern = compile(r'\s*(?:select|with)\b', IGNORECASE)
+
+# functions and expressions of which the value changes without the tables changing
+volatile_pattern = compile(
+    r'\b(?:now|rand|random|uuid|sys\s*\.\s*queue|current_(?:date|time|timestamp|timezone|user|role|sessionid)|'
+    r'localtime|localtimestamp|next\s+value)\b',
+    IGNORECASE
+)
+
+# the start of a table reference
+from_pattern = compile(r'\b(?:from|join)\b', IGNORECASE)
+
+# a table name after FROM or JOIN. The third group matches if it is a function call, or if it is followed by a comma
+# (with an optional alias), which starts another table reference this module doesn't parse.
+table_reference_pattern = compile(
+    rf'\s*(?:({identifier_pattern})\s*\.\s*)?({identifier_pattern})'
+    rf'(\s*\(|\s+(?:as\s+)?{identifier_pattern}\s*,|\s*,)?',
+    IGNORECASE
+)
 
 
 def remove_quoted_substrings(query: str):
@@ -28,16 +105,184 @@ def strip_split_and_clean(script: str):
     """
 
     results = []
-    for q in semicolumn_split_pattern.split(script)[1::2]:
-        q = sub(r'^\s*--.*\n?', '', q)
-        q = sub(r'/*.*\*/', '', q, flags=DOTALL)
-        q = q.strip()
-        if q:
-            results.append(q)
+    tokens: List[str] = []
+    # a single pass over the tokens, so the time is linear in the size of the script
+    for token in script_token_pattern.findall(script) + [';']:
+        if token == ';':
+            query = ''.join(tokens).strip()
+            if query:
+                results.append(query)
+            tokens = []
+        elif token.startswith('--') or token.startswith('/*'):
+            # a comment separates tokens like whitespace
+            tokens.append(' ')
+        else:
+            tokens.append(token)
 
     return results
 
 
+def _unquote_identifier(identifier: str) -> str:
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    # unquoted identifiers are case insensitive and stored in lower case
+    return identifier.lower()
+
+
+def changes_schema(query: str) -> bool:
+    """
+    Returns True if the query may change the schema or rolls back a transaction, which invalidates prepared statements.
+    """
+    return bool(schema_change_pattern.match(query))
+
+
+def rewrite_in_parameters(
+        query: str,
+        parameters: Sequence[Any],
+        subquery: Callable[[int, Any], str]
+) -> Tuple[str, List[Any]]:
+    """
+    Replace "IN ?" and "= ANY(?)" placeholders that are bound to a list of values by a subquery.
+
+    args:
+        query: a query with qmark style placeholders
+        parameters: the parameters of the query
+        subquery: returns a subquery that selects the values, given the index and value of a list parameter
+
+    returns:
+        The rewritten query, and the parameters that are left
+    """
+    replaced = set()
+    placeholders = count()
+
+    def replace(match):
+        if match.group(0)[0] in ('"', "'"):
+            return match.group(0)
+        index = next(placeholders)
+        if not match.group(1):
+            return match.group(0)
+        value = parameters[index] if index < len(parameters) else None
+        in_list = match.group(1)[0] in 'iI'
+        if not isinstance(value, list_parameter_types):
+            # a single value
+            return 'IN (?)' if in_list else match.group(0)
+        replaced.add(index)
+        return f"{'IN' if in_list else '= ANY'} ({subquery(index, value)})"
+
+    rewritten = in_parameter_pattern.sub(replace, query)
+    return rewritten, [value for index, value in enumerate(parameters) if index not in replaced]
+
+
+def split_values_insert(query: str) -> Optional[Tuple[str, str]]:
+    """
+    Split "INSERT INTO t VALUES (...)" in the part up to and including VALUES, and the list of values.
+
+    returns:
+        the two parts, or None if the query is not an INSERT ending in a VALUES list
+    """
+    match = values_insert_pattern.fullmatch(query)
+    if not match or not _is_single_row(match.group(2)):
+        return None
+    return match.group(1), match.group(2)
+
+
+def _is_single_row(values: str) -> bool:
+    """
+    Returns True if the values are a single parenthesised row, the parenthesis opened first is closed at the end.
+    """
+    depth = 0
+    tokens = script_token_pattern.findall(values)
+    for i, token in enumerate(tokens):
+        if token == ';' or token.startswith('--') or token.startswith('/*'):
+            return False
+        if token[0] in ('"', "'"):
+            continue
+        for position, char in enumerate(token):
+            if char == '(':
+                depth += 1
+            elif char == ')':
+                depth -= 1
+                if depth == 0 and (i != len(tokens) - 1 or position != len(token) - 1):
+                    return False
+    return depth == 0
+
+
+def parse_simple_insert(query: str) -> Optional[Tuple[Optional[str], str, Optional[List[str]], int]]:
+    """
+    Parse an INSERT of a single row of qmark placeholders, like "INSERT INTO s.t (a, b) VALUES (?, ?)".
+
+    returns:
+        The schema (None if not specified), the table, the column names (None if not specified) and the number of
+        placeholders, or None if the query is anything else.
+    """
+    match = simple_insert_pattern.fullmatch(query)
+    if not match:
+        return None
+    schema, table, columns, placeholders = match.groups()
+    return (
+        _unquote_identifier(schema) if schema else None,
+        _unquote_identifier(table),
+        [_unquote_identifier(c) for c in findall(identifier_pattern, columns)] if columns else None,
+        placeholders.count('?'),
+    )
+
+
+@lru_cache(maxsize=template_cache_size)
+def normalize_query(query: str) -> str:
+    """
+    Collapse the whitespace outside of quoted strings and identifiers, and strip a trailing semicolon, so queries that
+    only differ in layout are the same.
+    """
+    normalized = normalize_pattern.sub(lambda match: match.group(1) or ' ', query).strip()
+    return normalized[:-1].rstrip() if normalized.endswith(';') else normalized
+
+
+@lru_cache(maxsize=template_cache_size)
+def written_tables(query: str) -> Optional[FrozenSet[str]]:
+    """
+    Find the table of which a statement changes the data.
+
+    returns:
+        The name of the table without its schema, an empty set if the statement doesn't change data, or None if the
+        statement may change anything.
+    """
+    if changes_schema(query):
+        return None
+    stripped = literal_pattern.sub("''", query)
+    if read_pattern.match(stripped):
+        if select_pattern.match(stripped) and write_keyword_pattern.search(stripped):
+            return None
+        return frozenset()
+    match = write_pattern.match(stripped)
+    if not match:
+        return None
+    return frozenset((_unquote_identifier(match.group(2)),))
+
+
+@lru_cache(maxsize=template_cache_size)
+def referenced_tables(query: str) -> Optional[FrozenSet[Tuple[Optional[str], str]]]:
+    """
+    Find the tables a SELECT reads from.
+
+    returns:
+        The schema (None if not specified) and name of every table after FROM and JOIN, or None if the query isn't a
+        SELECT only reading tables by name, or if its result can change without the tables changing.
+    """
+    if not select_pattern.match(query) or written_tables(query) != frozenset():
+        return None
+    stripped = literal_pattern.sub("''", query)
+    if volatile_pattern.search(stripped):
+        return None
+    tables = set()
+    for start in from_pattern.finditer(stripped):
+        reference = table_reference_pattern.match(stripped, start.end())
+        if not reference or reference.group(3):
+            return None
+        schema, table = reference.group(1), reference.group(2)
+        tables.add((_unquote_identifier(schema) if schema else None, _unquote_identifier(table)))
+    return frozenset(tables) or None
+
+
 def escape(v):
     return f"'{v}'"
 
@@ -62,26 +307,105 @@ class DefaultFormatter(Formatter):
 parameters_type = Optional[Union[Sequence[Any], Dict[str, Any]]]
 
 
+class Template(NamedTuple):
+    """
+    A parsed str.format() template: the literal text around the replacement fields, and the name, conversion and
+    format spec of every field. Templates using other features of str.format(), like indexing or attributes of the
+    arguments, are filled in with str.format() instead.
+    """
+    literals: Tuple[str, ...]
+    fields: Tuple[Tuple[str, Optional[str], str], ...]
+    source: str
+    simple: bool
+
+
+@lru_cache(maxsize=template_cache_size)
+def _cleaned(query: str) -> str:
+    return remove_quoted_substrings(query)
+
+
+@lru_cache(maxsize=template_cache_size)
+def _compile(template: str) -> Template:
+    literals = ['']
+    fields = []
+    for literal, field, spec, conversion in Formatter().parse(template):
+        literals[-1] += literal
+        if field is not None:
+            fields.append((field, conversion, spec))
+            literals.append('')
+    return Template(tuple(literals), tuple(fields), template, _is_simple(fields))
+
+
+def _is_simple(fields: List[Tuple[str, Optional[str], str]]) -> bool:
+    """
+    Returns True if _render() can fill in the fields: bare indexes and names, without nested fields in the format specs
+    or a mix of automatic and manual numbering.
+    """
+    for field, conversion, spec in fields:
+        if field and not field.isdigit() and not field.isidentifier():
+            return False
+        if (conversion and conversion not in _conversions) or '{' in spec:
+            return False
+    numbered = {not field for field, _, _ in fields if not field or field.isdigit()}
+    return len(numbered) < 2
+
+
+@lru_cache(maxsize=template_cache_size)
+def _numeric_template(query: str) -> Template:
+    return _compile(sub(r':(\w+)', r'{\1}', query))
+
+
+@lru_cache(maxsize=template_cache_size)
+def _qmark_template(query: str) -> Template:
+    return _compile(query.replace('?', '{}'))
+
+
+_conversions = {'r': repr, 's': str, 'a': ascii}
+
+
+def _render(template: Template, args: Sequence[str] = (), kwargs: Optional[Mapping[str, str]] = None) -> str:
+    """
+    Fill in a template, like str.format(*args, **kwargs).
+    """
+    kwargs = kwargs or {}
+    if not template.simple:
+        return template.source.format(*args, **kwargs)
+    parts = [template.literals[0]]
+    auto_number = count()
+    for (field, conversion, spec), literal in zip(template.fields, template.literals[1:]):
+        if not field:
+            value: Any = args[next(auto_number)]
+        elif field.isdigit():
+            value = args[int(field)]
+        else:
+            value = kwargs[field]
+        if conversion:
+            value = _conversions[conversion](value)
+        if spec:
+            value = format(value, spec)
+        parts.append(value)
+        parts.append(literal)
+    return ''.join(parts)
+
+
 def _format_mapping(cleaned_query: str, parameters: Dict[str, Any], query: str):
     if '?' in cleaned_query:
         raise ProgrammingError("'?' in formatting with mapping as parameters")
 
     escaped: Dict[str, str] = {k: convert(v) for k, v in parameters.items()}
 
-    if ':' in cleaned_query:  # qmark
-        x = sub(r':(\w+)', r'{\1}', query)
-    elif '%' in cleaned_query:
+    if ':' not in cleaned_query and '%' in cleaned_query:
         return query % escaped
 
     if hasattr(type(parameters), '__missing__'):
         # this is something like a dict with a default value
         try:
             # mypy doesn't understand that this is a dict-like with a default __missing__ value
-            return DefaultFormatter(parameters).format(x, **escaped)
+            return DefaultFormatter(parameters).format(sub(r':(\w+)', r'{\1}', query), **escaped)
         except KeyError as e:
             raise ProgrammingError(e)
     try:
-        return x.format(**escaped)
+        return _render(_numeric_template(query), kwargs=escaped)
     except KeyError as e:
         raise ProgrammingError(e)
 
@@ -91,12 +415,10 @@ def _format_iterable(cleaned_query: str, parameters: Sequence[Any], query: str):
     escaped_list: List[str] = [convert(parameters[i]) for i in range(len(parameters))]
 
     if ':' in cleaned_query:
-        x = sub(r':(\w+)', r'{\1}', query)
-
         # The numbering used starts at 1, while python starts 0, so we insert a bogus prefix
         prefixed = [''] + escaped_list
 
-        return x.format(*prefixed)
+        return _render(_numeric_template(query), prefixed)
 
     if '?' in cleaned_query:  # qmark style
 
@@ -104,7 +426,7 @@ def _format_iterable(cleaned_query: str, parameters: Sequence[Any], query: str):
             raise ProgrammingError(f"Number of arguments ({len(escaped_list)}) doesn't "
                                    f"match number of '?' ({cleaned_query.count('?')})")
 
-        return query.replace('?', '{}').format(*escaped_list)
+        return _render(_qmark_template(query), escaped_list)
     elif '%s' in cleaned_query:  # pyformat style
         return query % tuple(escaped_list)
     else:
@@ -115,7 +437,7 @@ def format_query(query: str, parameters: parameters_type = None) -> str:
     if not isinstance(query, str):
         raise TypeError
 
-    cleaned_query = remove_quoted_substrings(query)
+    cleaned_query = _cleaned(query)
 
     if parameters is None:
         for symbol in ':?':
@@ -0,0 +1,239 @@
+"""
+Infer MonetDB column types from numpy arrays, used to create tables from data.
+"""
+import datetime
+import decimal
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+
+from monetdbe.exceptions import ProgrammingError
+
+# the largest decimal precision that still fits in a 64 bit integer, larger decimals are inserted as literals
+max_append_decimal_precision = 18
+
+# the largest decimal precision supported by MonetDB
+max_decimal_precision = 38
+
+# the range of BIGINT, its smallest value is used for NULL
+bigint_min = int(np.iinfo(np.int64).min) + 1
+bigint_max = int(np.iinfo(np.int64).max)
+
+numpy_sql_types = {
+    np.dtype(np.bool_): 'BOOLEAN',
+    np.dtype(np.int8): 'TINYINT',
+    np.dtype(np.int16): 'SMALLINT',
+    np.dtype(np.uint8): 'SMALLINT',
+    np.dtype(np.int32): 'INT',
+    np.dtype(np.uint16): 'INT',
+    np.dtype(np.int64): 'BIGINT',
+    np.dtype(np.uint32): 'BIGINT',
+    np.dtype(np.uint64): 'BIGINT',
+    np.dtype(np.float16): 'REAL',
+    np.dtype(np.float32): 'REAL',
+    np.dtype(np.float64): 'DOUBLE',
+}
+
+append_integer_types = {
+    'tinyint': np.dtype(np.int8),
+    'smallint': np.dtype(np.int16),
+    'int': np.dtype(np.int32),
+    'bigint': np.dtype(np.int64),
+}
+
+append_float_types = {
+    'real': np.dtype(np.float32),
+    'double': np.dtype(np.float64),
+}
+
+
+def is_null(value: Any) -> bool:
+    """
+    Returns True for None, NaN and the pandas NA and NaT singletons.
+    """
+    if value is None or value is np.ma.masked:
+        return True
+    if isinstance(value, float) and value != value:
+        return True
+    # don't import pandas just to check for its missing value types
+    return type(value).__name__ in ('NAType', 'NaTType')
+
+
+def _varchar(values: np.ndarray) -> str:
+    lengths = np.char.str_len(values.compressed() if np.ma.isMaskedArray(values) else values)
+    return f"VARCHAR({max(int(lengths.max(initial=0)), 1)})"
+
+
+def _decimal_type(values: List[decimal.Decimal]) -> Tuple[int, int]:
+    """
+    Returns the precision and scale required to store all values.
+    """
+    scale = 0
+    integer_digits = 1
+    for value in values:
+        if not value.is_finite():
+            raise ProgrammingError(f"Can't store {value} in a DECIMAL column")
+        sign, digits, exponent = value.as_tuple()
+        scale = max(scale, -exponent)  # type: ignore[operator]
+        integer_digits = max(integer_digits, len(digits) + exponent)  # type: ignore[operator]
+    return integer_digits + scale, scale
+
+
+def _masked(values: List[Any], mask: np.ndarray, dtype: Any, fill: Any) -> np.ndarray:
+    data = np.array([fill if null else value for value, null in zip(values, mask)], dtype=dtype)
+    return np.ma.masked_array(data, mask=mask)
+
+
+def _infer_object(values: np.ndarray, name: Optional[str]) -> Tuple[str, np.ndarray]:
+    data = values.tolist()
+    mask = np.ma.getmaskarray(values) | np.array([is_null(v) for v in data], dtype=bool)
+    present = [v for v, null in zip(data, mask) if not null]
+
+    if not present:
+        return 'STRING', np.ma.masked_array(np.array([''] * len(data)), mask=mask)
+
+    if all(isinstance(v, (bool, np.bool_)) for v in present):
+        return 'BOOLEAN', _masked(data, mask, np.bool_, False)
+
+    if all(_is_integer(v) for v in present):
+        if all(bigint_min <= v <= bigint_max for v in present):
+            return 'BIGINT', _masked(data, mask, np.int64, 0)
+        # too large for BIGINT, these are inserted as literals into a DECIMAL column without decimals
+        precision = max(len(str(abs(int(v)))) for v in present)
+        if precision > max_decimal_precision:
+            column = f" in column {name}" if name is not None else ""
+            raise ProgrammingError(f"Can't store integers with more than {max_decimal_precision} digits{column}")
+        return f"DECIMAL({precision},0)", \
+            np.array([None if null else decimal.Decimal(int(v)) for v, null in zip(data, mask)], dtype=object)
+
+    if all(isinstance(v, (int, float, np.integer, np.floating)) for v in present):
+        return 'DOUBLE', _masked(data, mask, np.float64, 0.0)
+
+    if all(isinstance(v, decimal.Decimal) for v in present):
+        precision, scale = _decimal_type(present)
+        sql_type = f"DECIMAL({precision},{scale})"
+        if precision > max_append_decimal_precision:
+            return sql_type, np.array([None if null else v for v, null in zip(data, mask)], dtype=object)
+        # decimals are appended as integers, scaled by the number of decimals of the column
+        scaled = [0 if null else int(v.scaleb(scale)) for v, null in zip(data, mask)]
+        return sql_type, np.ma.masked_array(np.array(scaled, dtype=np.int64), mask=mask)
+
+    if all(isinstance(v, datetime.datetime) for v in present):
+        naive = [v.astimezone(datetime.timezone.utc).replace(tzinfo=None) if v.tzinfo else v for v in present]
+        stamps = iter(naive)
+        return 'TIMESTAMP', np.array([None if null else next(stamps) for null in mask], dtype='datetime64[us]')
+
+    if all(isinstance(v, datetime.date) and not isinstance(v, datetime.datetime) for v in present):
+        return 'DATE', np.array([None if null else v for v, null in zip(data, mask)], dtype='datetime64[D]')
+
+    if all(isinstance(v, datetime.time) for v in present):
+        return 'TIME', np.array([None if null else v for v, null in zip(data, mask)], dtype=object)
+
+    if all(isinstance(v, (bytes, bytearray, memoryview)) for v in present):
+        return 'BLOB', np.array([None if null else bytes(v) for v, null in zip(data, mask)], dtype=object)
+
+    if all(isinstance(v, str) for v in present):
+        strings = np.ma.masked_array(np.array(['' if null else v for v, null in zip(data, mask)]), mask=mask)
+        return _varchar(strings), strings
+
+    # mixed types, store their string representation
+    strings = np.ma.masked_array(np.array(['' if null else str(v) for v, null in zip(data, mask)]), mask=mask)
+    return 'STRING', strings
+
+
+def infer_column(values: np.ndarray, name: Optional[str] = None) -> Tuple[str, np.ndarray]:
+    """
+    Infer the SQL type of a column.
+
+    args:
+        values: a (masked) numpy array
+        name: the name of the column, used in error messages
+
+    returns:
+        The SQL column type and the values converted to an array suitable for appending to a column of that type.
+
+    raises:
+        ProgrammingError: if there is no matching SQL type
+    """
+    dtype = values.dtype
+    if dtype in numpy_sql_types:
+        if dtype == np.float16:
+            values = values.astype(np.float32)
+        return numpy_sql_types[dtype], values
+    if dtype.kind == 'M':
+        unit, _ = np.datetime_data(dtype)
+        if unit in ('Y', 'M', 'W', 'D'):
+            return 'DATE', values.astype('datetime64[D]')
+        return 'TIMESTAMP', values
+    if dtype.kind == 'U':
+        return _varchar(values), values
+    if dtype.kind == 'S':
+        return 'BLOB', np.array([None if is_null(v) else bytes(v) for v in values.tolist()], dtype=object)
+    if dtype.kind == 'O':
+        return _infer_object(values, name)
+    raise ProgrammingError(f"Unsupported dtype: {dtype}")
+
+
+def _is_integer(value: Any) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_))
+
+
+def _is_float(value: Any) -> bool:
+    return isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_))
+
+
+def append_column(values: List[Any], sql_type: str, digits: int = 0, nullable: bool = True) -> Optional[np.ndarray]:
+    """
+    Convert a list of python values to an array that can be appended to an existing column.
+
+    args:
+        values: the python values, None for NULL
+        sql_type: the SQL type of the column, as stored in sys.columns
+        digits: the maximum length of VARCHAR columns
+        nullable: if the column accepts NULL values
+
+    returns:
+        The (masked) array, or None if a value doesn't strictly fit the column. These values should be inserted with
+        an INSERT statement instead, so the database can convert them or report an error.
+    """
+    mask = np.array([is_null(v) for v in values], dtype=bool)
+    if not nullable and mask.any():
+        return None
+    present = [v for v, null in zip(values, mask) if not null]
+
+    if sql_type in append_integer_types:
+        dtype = append_integer_types[sql_type]
+        info = np.iinfo(dtype)
+        # the smallest value of an integer type is used for NULL
+        if not all(_is_integer(v) and info.min < v <= info.max for v in present):
+            return None
+        return _masked(values, mask, dtype, 0)
+
+    if sql_type in append_float_types:
+        dtype = append_float_types[sql_type]
+        limit = float(np.finfo(dtype).max)
+        if not all(_is_float(v) and abs(v) <= limit for v in present):
+            return None
+        return _masked(values, mask, dtype, 0.0)
+
+    if sql_type == 'boolean':
+        if not all(isinstance(v, (bool, np.bool_)) for v in present):
+            return None
+        return _masked(values, mask, np.bool_, False)
+
+    if sql_type in ('varchar', 'clob'):
+        if not all(isinstance(v, str) and (not digits or len(v) <= digits) for v in present):
+            return None
+        return _masked(values, mask, np.str_, '')
+
+    if sql_type == 'date':
+        if not all(isinstance(v, datetime.date) and not isinstance(v, datetime.datetime) for v in present):
+            return None
+        return np.array([None if null else v for v, null in zip(values, mask)], dtype='datetime64[D]')
+
+    if sql_type == 'timestamp':
+        if not all(isinstance(v, datetime.datetime) and v.tzinfo is None for v in present):
+            return None
+        return np.array([None if null else v for v, null in zip(values, mask)], dtype='datetime64[us]')
+
+    return None
@@ -0,0 +1,225 @@
+"""
+This module contains the metrics of a connection, which record where the time of the statements goes.
+
+Metrics are disabled by default, enable them with Connection(metrics=True) and read them with Connection.stats().
+"""
+from collections import namedtuple, Counter
+from contextlib import contextmanager
+from math import ceil, log2
+from threading import Lock, local
+from time import perf_counter
+from typing import Optional, Dict, List, Callable, Any, Iterator
+
+# the phases of a statement that are timed
+phases = ('prepare', 'execute', 'append', 'fetch', 'cleanup')
+
+# the upper bound of the first histogram bucket in seconds, every next bucket is twice as wide
+first_bucket = 1e-6
+
+# the number of histogram buckets, the last one counts everything above about 2 minutes
+bucket_count = 28
+
+# a timed phase of a statement, as passed to the hooks
+Measurement = namedtuple('Measurement', ('phase', 'operation', 'seconds', 'allocations'))
+
+# the number of cffi allocations by each thread, see count_allocations()
+_allocations = local()
+# the number of open connections with metrics, allocations are only counted while there are any
+_counting = 0
+_counting_lock = Lock()
+
+
+class _CountingFFI:
+    """
+    Forwards to the cffi FFI object of the bindings, counting the calls of new() by the current thread.
+    """
+
+    def __init__(self, ffi):
+        self._ffi = ffi
+
+    def __getattr__(self, name: str) -> Any:
+        # forwarded attributes are looked up once
+        value = getattr(self._ffi, name)
+        setattr(self, name, value)
+        return value
+
+    def new(self, *args):
+        _allocations.count = getattr(_allocations, 'count', 0) + 1
+        return self._ffi.new(*args)
+
+
+def count_allocations() -> None:
+    """
+    Start counting the cffi allocations of the bindings, for a connection that enables metrics. The bindings are
+    shared by all connections, so while any connection with metrics is open, the allocations of the other connections
+    also go through the counting wrapper, they are only not recorded. Call stop_counting_allocations() when the
+    connection is closed.
+    """
+    global _counting
+
+    from monetdbe._cffi import internal
+    from monetdbe._cffi.convert import bind
+
+    with _counting_lock:
+        if not _counting:
+            # internal.py and bind.py are the only modules that allocate
+            internal.ffi = _CountingFFI(internal.ffi)  # type: ignore[assignment]
+            bind.ffi = _CountingFFI(bind.ffi)  # type: ignore[assignment]
+        _counting += 1
+
+
+def stop_counting_allocations() -> None:
+    """
+    Stop counting for a closed connection, the bindings allocate without the wrapper again once no connection with
+    metrics is open.
+    """
+    global _counting
+
+    from monetdbe._cffi import internal
+    from monetdbe._cffi.convert import bind
+
+    with _counting_lock:
+        if not _counting:
+            return
+        _counting -= 1
+        if not _counting:
+            internal.ffi = internal.ffi._ffi  # type: ignore[attr-defined]
+            bind.ffi = bind.ffi._ffi  # type: ignore[attr-defined]
+
+
+def counting_allocations() -> bool:
+    """
+    Returns True if the cffi allocations of the bindings are counted.
+    """
+    return bool(_counting)
+
+
+def allocations() -> int:
+    """
+    The number of cffi allocations by the current thread while counting.
+    """
+    return getattr(_allocations, 'count', 0)
+
+
+class Histogram:
+    """
+    Counts values in exponentially growing buckets, and keeps their count, total, minimum and maximum.
+    """
+
+    def __init__(self, first: float = first_bucket):
+        """
+        Args:
+            first: the upper bound of the first bucket
+        """
+        self.first = first
+        self.buckets = [0] * bucket_count
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def record(self, value: float) -> None:
+        index = 0 if value <= self.first else min(ceil(log2(value / self.first)), bucket_count - 1)
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        The upper bound of the bucket containing the q quantile, or None if nothing has been recorded.
+        """
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+            if seen >= rank and bucket:
+                return min(self.first * 2 ** index, self.max)  # type: ignore[type-var]
+        return self.max
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.quantile(0.5),
+            'p90': self.quantile(0.9),
+            'p99': self.quantile(0.99),
+            'buckets': {self.first * 2 ** index: bucket for index, bucket in enumerate(self.buckets) if bucket},
+        }
+
+
+class Metrics:
+    """
+    The metrics of a connection: a histogram of the wall time of every phase of the statements, the number of rows
+    and bytes converted from MonetDB per SQL type, and a histogram of the cffi allocations per timed phase.
+
+    The bytes of a column are the size of its data as MonetDB returns it, pointers for strings and other variable
+    sized values. Results served from the result cache are not converted, they only add to the fetch timings.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._hooks: List[Callable[[Measurement], None]] = []
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Forget everything that has been recorded.
+        """
+        with self._lock:
+            self.timings = {phase: Histogram() for phase in phases}
+            self.allocations = Histogram(first=1)
+            self.rows: Counter = Counter()
+            self.bytes: Counter = Counter()
+
+    def add_hook(self, hook: Callable[[Measurement], None]) -> None:
+        """
+        Call a function with every measurement, to export them to another metrics system. The hook is called on the
+        thread running the statement, it should be quick and not use the connection.
+        """
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable[[Measurement], None]) -> None:
+        self._hooks.remove(hook)
+
+    @contextmanager
+    def measure(self, phase: str, operation: Optional[str] = None) -> Iterator[None]:
+        """
+        Time a phase of a statement, also if it fails.
+        """
+        before = allocations()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.record(Measurement(phase, operation, perf_counter() - start, allocations() - before))
+
+    def record(self, measurement: Measurement) -> None:
+        with self._lock:
+            self.timings[measurement.phase].record(measurement.seconds)
+            self.allocations.record(measurement.allocations)
+        for hook in self._hooks:
+            hook(measurement)
+
+    def record_conversion(self, sql_type: str, rows: int, nbytes: int) -> None:
+        """
+        Count the values of a column converted to python objects or numpy arrays.
+        """
+        with self._lock:
+            self.rows[sql_type] += rows
+            self.bytes[sql_type] += nbytes
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'timings': {phase: histogram.as_dict() for phase, histogram in self.timings.items()},
+                'allocations': self.allocations.as_dict(),
+                'rows': dict(self.rows),
+                'bytes': dict(self.bytes),
+            }
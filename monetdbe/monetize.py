@@ -106,6 +106,31 @@ class PrepareProtocol:
     ...
 
 
+def convert_column(values: np.ndarray) -> np.ndarray:
+    """
+    Converts a (masked) numpy array to SQL literals, like convert() for every value but vectorized where possible.
+    """
+    mask = np.ma.getmaskarray(values)
+    data = np.ma.getdata(values)
+    kind = data.dtype.kind
+    if kind == 'b':
+        literals = np.where(data, 'true', 'false')
+    elif kind in 'iu':
+        literals = data.astype(str)
+    elif kind == 'f':
+        literals = data.astype(str)
+        mask = mask | np.isnan(data)
+    elif kind == 'U':
+        escaped = np.char.replace(np.char.replace(data, "\\", "\\\\"), "'", "\\'")
+        literals = np.char.add(np.char.add("'", escaped), "'")
+    elif kind == 'M':
+        literals = np.char.add(np.char.add("'", np.datetime_as_string(data)), "'")
+        mask = mask | np.isnat(data)
+    else:
+        literals = np.array([convert(value) for value in data.tolist()], dtype=object)
+    return np.where(mask, 'NULL', literals)
+
+
 def convert(data: Any) -> str:
     """
     Return the appropriate conversion function based upon the python type.
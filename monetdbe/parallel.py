@@ -0,0 +1,224 @@
+"""
+This module runs read-only queries over partitions of a database in parallel worker processes.
+
+MonetDB/e supports a single database per process, so every worker opens a private copy of the database. This scales
+CPU heavy processing of the results in Python past the GIL.
+"""
+import multiprocessing
+import tarfile
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from shutil import copytree, ignore_patterns
+from tempfile import TemporaryDirectory
+from typing import Optional, Union, Sequence, Any, Callable, List, Mapping, Dict, Tuple
+
+import numpy as np
+
+from monetdbe.connection import Connection
+from monetdbe.exceptions import ProgrammingError
+from monetdbe.monetize import monet_escape
+
+# the connection to the copy of the database of a worker process
+_worker_connection: Optional[Connection] = None
+
+# how an array is sent to the parent: the name, dtype and shape of its shared memory, or the array itself if it
+# contains python objects
+_shared_array = Union[Tuple[str, str, Tuple[int, ...]], np.ndarray]
+
+
+def key_ranges(low: int, high: int, n: int) -> List[Tuple[int, int]]:
+    """
+    Split the keys from low up to high in n ranges, as (low, high) parameters for a query like
+    "... WHERE k >= ? AND k < ?".
+    """
+    bounds = np.linspace(low, high, n + 1).round().astype(np.int64).tolist()
+    return [(bounds[i], bounds[i + 1]) for i in range(n)]
+
+
+def modulo_buckets(n: int) -> List[Tuple[int, int]]:
+    """
+    Partition the keys in n buckets, as (n, bucket) parameters for a query like "... WHERE mod(k, ?) = ?".
+    """
+    return [(n, bucket) for bucket in range(n)]
+
+
+def _find_database(directory: Path) -> Path:
+    # a snapshot may contain the database directory itself
+    if (directory / 'bat').exists():
+        return directory
+    subdirectories = [path for path in directory.iterdir() if path.is_dir()]
+    if len(subdirectories) == 1:
+        return _find_database(subdirectories[0])
+    raise ProgrammingError(f"{directory} doesn't contain a database")
+
+
+def _init_worker(source: str, target: str) -> None:
+    global _worker_connection
+
+    copy = Path(target) / str(multiprocessing.current_process().pid)
+    if source.endswith('.tar'):
+        with tarfile.open(source) as snapshot:
+            snapshot.extractall(copy)
+        database = _find_database(copy)
+    else:
+        database = Path(copytree(source, copy, ignore=ignore_patterns('.gdk_lock')))
+    _worker_connection = Connection(database, autocommit=True)
+
+
+def _share(values: np.ndarray, shared: List[SharedMemory]) -> _shared_array:
+    if values.dtype.kind == 'O' or not values.nbytes:
+        return values
+    memory = SharedMemory(create=True, size=values.nbytes)
+    shared.append(memory)
+    np.ndarray(values.shape, dtype=values.dtype, buffer=memory.buf)[...] = values
+    return memory.name, values.dtype.str, values.shape
+
+
+def _unshare(shared: _shared_array) -> np.ndarray:
+    if isinstance(shared, np.ndarray):
+        return shared
+    name, dtype, shape = shared
+    memory = SharedMemory(name=name)
+    try:
+        return np.ndarray(shape, dtype=dtype, buffer=memory.buf).copy()
+    finally:
+        memory.close()
+        memory.unlink()
+
+
+def _discard(shared: Optional[_shared_array]) -> None:
+    """
+    Free the shared memory of an array that won't be used.
+    """
+    if shared is None or isinstance(shared, np.ndarray):
+        return
+    try:
+        memory = SharedMemory(name=shared[0])
+    except FileNotFoundError:
+        return
+    memory.close()
+    memory.unlink()
+
+
+def _discard_results(results: List[Dict[str, Tuple[_shared_array, Optional[_shared_array]]]]) -> None:
+    for columns in results:
+        for data, mask in columns.values():
+            _discard(data)
+            _discard(mask)
+
+
+def _run_partition(query: str, parameters: Sequence[Any], process: Optional[Callable[[Mapping[str, np.ndarray]], Any]]):
+    assert _worker_connection
+    # the arrays are views of the result of the cursor, which is kept until they are copied
+    cursor = _worker_connection.cursor()
+    try:
+        result = cursor.execute(query, parameters).fetchnumpy()
+        if process:
+            # the return value may refer to the arrays, and is only sent to the parent after the cursor is closed
+            return process({name: np.ma.array(values, copy=True) for name, values in result.items()})
+
+        shared: List[SharedMemory] = []
+        try:
+            columns = {}
+            for name, values in result.items():
+                mask = np.ma.getmaskarray(values)
+                columns[name] = _share(np.ma.getdata(values), shared), _share(mask, shared) if mask.any() else None
+            return columns
+        except BaseException:
+            for memory in shared:
+                memory.close()
+                memory.unlink()
+            raise
+        finally:
+            for memory in shared:
+                memory.close()
+    finally:
+        cursor.close()
+
+
+def _run_partition_arguments(arguments: Tuple[str, Sequence[Any], Any]):
+    return _run_partition(*arguments)
+
+
+def partitioned_query(
+        database: Union[str, Path, Connection],
+        query: str,
+        partitions: Sequence[Sequence[Any]],
+        processes: Optional[int] = None,
+        process: Optional[Callable[[Mapping[str, np.ndarray]], Any]] = None,
+        directory: Optional[Union[str, Path]] = None
+) -> List[Any]:
+    """
+    Run a query for every partition in a pool of worker processes, each with its own copy of the database.
+
+    Args:
+        database: The directory of a database that isn't opened by this process, or an open connection to a
+                  database directory, of which a hot snapshot is taken.
+        query: The query, with qmark style placeholders for the parameters of a partition, like
+               "SELECT ... WHERE k >= ? AND k < ?"
+        partitions: The parameters of every partition, see key_ranges() and modulo_buckets()
+        processes: The number of worker processes, defaults to the number of cores
+        process: An optional function that is called in the worker process with the result of a partition, as
+                 returned by Cursor.fetchnumpy(). Its return value is sent back to the parent instead of the result.
+        directory: Where to store the copies of the database, defaults to a new temporary directory
+
+    Returns:
+        For every partition, the result as a mapping of column names to (masked) arrays, which are passed back
+        through shared memory, or the return value of process.
+    """
+    with TemporaryDirectory(dir=directory) as tmp:
+        if isinstance(database, Connection):
+            if database._database is None:
+                raise ProgrammingError("Can't copy an in-memory database to worker processes")
+            source = str(Path(tmp) / 'snapshot.tar')
+            database.execute(f"CALL sys.hot_snapshot({monet_escape(source)})")
+        else:
+            source = str(Path(database).resolve())
+
+        workers = Path(tmp) / 'workers'
+        workers.mkdir()
+        # forked workers would inherit the state of the embedded database of this process
+        context = multiprocessing.get_context('spawn')
+        with context.Pool(processes, initializer=_init_worker, initargs=(source, str(workers))) as pool:
+            results: List[Any] = []
+            error: Optional[Exception] = None
+            iterator = pool.imap(_run_partition_arguments, [(query, parameters, process) for parameters in partitions])
+            try:
+                # every partition is collected, so the shared memory of the others can be freed if one fails
+                for _ in partitions:
+                    try:
+                        results.append(next(iterator))
+                    except Exception as e:
+                        error = error or e
+            except BaseException:
+                if not process:
+                    _discard_results(results)
+                raise
+            pool.close()
+            pool.join()
+
+    if process:
+        if error:
+            raise error
+        return results
+
+    arrays = []
+    try:
+        if error:
+            raise error
+        for columns in results:
+            partition: Dict[str, np.ndarray] = {}
+            for name in list(columns):
+                # the arrays are removed from the result once they are no longer shared
+                data, mask = columns.pop(name)
+                try:
+                    values = _unshare(data)
+                except BaseException:
+                    _discard(mask)
+                    raise
+                partition[name] = np.ma.masked_array(values, mask=_unshare(mask) if mask is not None else np.ma.nomask)
+            arrays.append(partition)
+    except BaseException:
+        _discard_results(results)
+        raise
+    return arrays
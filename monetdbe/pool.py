@@ -0,0 +1,119 @@
+"""
+This module contains a pool of connections, which are concurrent sessions on the same embedded database.
+"""
+from contextlib import contextmanager
+from pathlib import Path
+from threading import Condition
+from typing import Optional, Union, List, Iterator, Any
+
+from monetdbe.connection import Connection
+from monetdbe.exceptions import OperationalError, ProgrammingError
+
+
+class ConnectionPool:
+    """
+    A pool of connections to the same database, to be shared by threads.
+
+    Every connection is a separate session with its own transaction, so readers and writers using different
+    connections run in parallel, isolated by MonetDB's optimistic concurrency control. A connection serializes the
+    queries of the threads using it, see the Connection class.
+    """
+
+    def __init__(self, database: Optional[Union[str, Path]] = None, size: int = 4, timeout: Optional[float] = None,
+                 **kwargs: Any):
+        """
+        Args:
+            database: The path to the database, or empty or `:memory:` for the in-memory database. MonetDB/e supports
+                      only one database per process, all connections of the process use the same database.
+            size: The maximum number of connections, which are opened when they are needed
+            timeout: How long to wait for a free connection in seconds, waits forever if None
+            kwargs: Other arguments for the connections, like autocommit
+        """
+        if size < 1:
+            raise ValueError("A connection pool needs at least one connection")
+        self.database = database
+        self.size = size
+        self.timeout = timeout
+        self._kwargs = kwargs
+        self._idle: List[Connection] = []
+        self._opened = 0
+        self._closed = False
+        self._condition = Condition()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self) -> int:
+        """
+        The number of open connections.
+        """
+        return self._opened
+
+    def acquire(self) -> Connection:
+        """
+        Take a connection out of the pool, opening a new one if all connections are in use and the pool isn't full.
+
+        Raises:
+            OperationalError: if no connection became available within the timeout
+        """
+        with self._condition:
+            if not self._condition.wait_for(self._available, self.timeout):
+                raise OperationalError(f"No connection available within {self.timeout} seconds")
+            if self._closed:
+                raise ProgrammingError("The connection pool has been closed")
+            if self._idle:
+                return self._idle.pop()
+            self._opened += 1
+        try:
+            return Connection(self.database, **self._kwargs)
+        except Exception:
+            with self._condition:
+                self._opened -= 1
+                self._condition.notify()
+            raise
+
+    def release(self, connection: Connection) -> None:
+        """
+        Return a connection to the pool. A transaction that is still running is rolled back.
+        """
+        try:
+            if not self._closed and connection._internal and connection.in_transaction:
+                connection.rollback()
+        except Exception:
+            # the connection can't be reused, the next acquire opens a new one
+            connection.close()
+        with self._condition:
+            if self._closed or not connection._internal:
+                connection.close()
+                self._opened -= 1
+            else:
+                self._idle.append(connection)
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Connection]:
+        """
+        Use a connection of the pool in a with block, it is returned to the pool afterwards.
+        """
+        connection = self.acquire()
+        try:
+            yield connection
+        finally:
+            self.release(connection)
+
+    def close(self) -> None:
+        """
+        Close the idle connections, connections in use are closed when they are released.
+        """
+        with self._condition:
+            self._closed = True
+            while self._idle:
+                self._idle.pop().close()
+                self._opened -= 1
+            self._condition.notify_all()
+
+    def _available(self) -> bool:
+        return self._closed or bool(self._idle) or self._opened < self.size
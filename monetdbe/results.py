@@ -0,0 +1,124 @@
+"""
+This module contains the cache of query results of a connection.
+"""
+from collections import OrderedDict, namedtuple, defaultdict
+from typing import Any, Dict, Hashable, Iterable, Optional, Set, Tuple
+
+# the description and rowcount of a result, the python values of every column as fetchall() returns them, the (masked)
+# arrays as fetchnumpy() returns them, the names of the tables the query reads and the estimated size in bytes
+CachedResult = namedtuple('CachedResult', ('description', 'rowcount', 'columns', 'arrays', 'tables', 'nbytes'))
+
+
+class ResultCache:
+    """
+    A least recently used cache of query results, with a budget in bytes.
+
+    A result is removed when a statement of the connection changes the data of a table it reads, and all results are
+    removed by statements that may change anything, like DDL, CALL and ROLLBACK. Changes made by other connections
+    are not seen.
+    """
+
+    def __init__(self, max_bytes: int = 0):
+        """
+        Args:
+            max_bytes: the maximum estimated size of the cached results, 0 disables the cache
+        """
+        self._max_bytes = max_bytes
+        self._results: 'OrderedDict[Hashable, CachedResult]' = OrderedDict()
+        self._by_table: Dict[str, Set[Hashable]] = defaultdict(set)
+        self._version = 0
+        # whether a (schema, table) reference is a regular table, as looked up in the catalog
+        self.base_tables: Dict[Tuple[Optional[str], str], bool] = {}
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._results)
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, value: int) -> None:
+        if value < 0:
+            raise ValueError("The result cache size can't be negative")
+        self._max_bytes = value
+        self._evict()
+
+    @property
+    def version(self) -> int:
+        """
+        The number of invalidations, a result of a query that started before an invalidation may be outdated.
+        """
+        return self._version
+
+    def get(self, key: Hashable) -> Optional[CachedResult]:
+        """
+        Returns the cached result for a key, or None if it isn't cached.
+        """
+        cached = self._results.get(key)
+        if cached is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._results.move_to_end(key)
+        return cached
+
+    def put(self, key: Hashable, cached: CachedResult, version: int) -> bool:
+        """
+        Cache a result, evicting the least recently used results that don't fit in the budget.
+
+        Args:
+            key: the normalized query and its parameters
+            cached: the result
+            version: the version of the cache when the query started
+
+        Returns:
+            True if the result is cached, False if it is outdated or too large
+        """
+        if version != self._version or cached.nbytes > self._max_bytes:
+            return False
+        self._remove(key)
+        self._results[key] = cached
+        self.nbytes += cached.nbytes
+        for table in cached.tables:
+            self._by_table[table].add(key)
+        self._evict()
+        return True
+
+    def invalidate(self, tables: Iterable[str]) -> None:
+        """
+        Remove the results that read any of the tables.
+        """
+        self._version += 1
+        for table in tables:
+            for key in self._by_table.pop(table, ()):
+                self._remove(key)
+
+    def clear(self) -> None:
+        """
+        Remove all results, and forget which tables are regular tables.
+        """
+        self._version += 1
+        self._results.clear()
+        self._by_table.clear()
+        self.base_tables.clear()
+        self.nbytes = 0
+
+    def _remove(self, key: Any) -> None:
+        cached = self._results.pop(key, None)
+        if cached is None:
+            return
+        self.nbytes -= cached.nbytes
+        for table in cached.tables:
+            keys = self._by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_table[table]
+
+    def _evict(self) -> None:
+        while self.nbytes > self._max_bytes and self._results:
+            self._remove(next(iter(self._results)))
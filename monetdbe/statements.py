@@ -0,0 +1,231 @@
+"""
+This module contains prepared statements and the cache of prepared statements of a connection.
+"""
+from collections import OrderedDict, namedtuple
+from typing import Callable, Any, List, Optional, Iterator, Iterable, Sequence, TYPE_CHECKING
+
+from monetdbe.exceptions import ProgrammingError
+
+if TYPE_CHECKING:
+    from monetdbe.connection import Connection, Description
+    from monetdbe.cursors import Cursor  # type: ignore[attr-defined]
+
+CachedStatement = namedtuple('CachedStatement', ('generation', 'statement'))
+
+
+class Statement:
+    """
+    A prepared statement, which can be executed many times with only the cost of binding the parameters.
+
+    The statement is not invalidated when the schema changes, recreate it after altering the tables it uses.
+    """
+
+    def __init__(self, connection: 'Connection', operation: str):
+        self.connection = connection
+        self.operation = operation
+        self._statement, self._type_info, self._columns = connection._prepare(operation)
+        self._binder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+    def _check(self):
+        if self._statement is None:
+            raise ProgrammingError("Cannot operate on a closed statement")
+        self.connection._check()
+
+    @property
+    def param_types(self) -> List[Any]:
+        """
+        The type of every parameter, as a (impl_type, sql_type, scale) tuple.
+        """
+        return list(self._type_info)
+
+    @property
+    def columns(self) -> List['Description']:
+        """
+        The description of the result columns, like Cursor.description.
+        """
+        from monetdbe.connection import Description
+        return [Description(name, sql_type, None, None, digits, scale, None)
+                for name, sql_type, digits, scale in self._columns]
+
+    def _get_binder(self):
+        if self._binder is None:
+            self._binder = self.connection.binder(self._statement, self._type_info)
+        return self._binder
+
+    def _bind(self, parameters: Sequence[Any]) -> None:
+        self._get_binder().bind(parameters)
+
+    def _fits(self, parameters: Sequence[Any]) -> bool:
+        """
+        Returns True if the values can be bound to the parameters without a conversion by MonetDB.
+        """
+        self._check()
+        return self._get_binder().fits(parameters)
+
+    def _execute(self, parameters: Optional[Sequence[Any]] = None, make_result: bool = False):
+        """
+        Bind the parameters and execute the statement.
+
+        returns:
+            result, affected_rows
+        """
+        from monetdbe._cffi.internal import execute
+
+        self._check()
+        # the bound parameters belong to the statement, so binding and executing can't be interleaved by other threads
+        with self.connection.lock:
+            if parameters:
+                self._bind(parameters)
+            with self.connection.measure('execute', self.operation):
+                if self.connection._trace_callback is None:
+                    result, affected_rows = execute(self._statement, make_result=make_result)
+                else:
+                    result, affected_rows = self.connection._traced(execute, self.operation, self._statement,
+                                                                    make_result)
+            self.connection.invalidate_results(self.operation, affected_rows)
+            return result, affected_rows
+
+    def _executemany(self, seq_of_parameters: Iterator[Sequence[Any]]) -> int:
+        """
+        Execute the statement for every parameter sequence.
+
+        returns:
+            the total number of affected rows
+        """
+        self._check()
+        total_affected_rows = 0
+        for parameters in seq_of_parameters:
+            _, affected_rows = self._execute(parameters)
+            total_affected_rows += affected_rows
+        return total_affected_rows
+
+    def execute(self, parameters: Optional[Sequence[Any]] = None) -> 'Cursor':
+        """
+        Execute the statement.
+
+        Args:
+            parameters: a value for every parameter
+
+        Returns:
+            A new cursor with the result
+        """
+        return self.connection.cursor()._execute_statement(self, parameters)
+
+    def executemany(self, seq_of_parameters: Iterable[Sequence[Any]]) -> 'Cursor':
+        """
+        Execute the statement for every parameter sequence, which are consumed lazily.
+
+        Args:
+            seq_of_parameters: an iterable of parameter sequences
+
+        Returns:
+            A new cursor, with the total number of affected rows as rowcount
+        """
+        return self.connection.cursor()._executemany_statement(self, seq_of_parameters)
+
+    def close(self) -> None:
+        """
+        Clean up the prepared statement.
+        """
+        statement = getattr(self, '_statement', None)
+        if statement is None:
+            return
+        self._statement = None
+        self._binder = None
+        # statements are cleaned up with the database when the connection is closed
+        if self.connection._internal:
+            self.connection.cleanup_statement(statement)
+
+
+class StatementCache:
+    """
+    A least recently used cache of prepared statements, keyed by SQL text.
+
+    A statement is taken out of the cache while it is executed, so it is never cleaned up while in use, even if more
+    statements are prepared on the same connection in the meantime.
+    """
+
+    def __init__(
+            self,
+            prepare: Callable[[str], Any],
+            cleanup: Callable[[Any], None],
+            size: int = 128
+    ):
+        """
+        Args:
+            prepare: prepares a query
+            cleanup: cleans up a statement
+            size: the maximum number of cached statements, 0 disables the cache
+        """
+        self._prepare = prepare
+        self._cleanup = cleanup
+        self._size = size
+        self._statements: 'OrderedDict[str, CachedStatement]' = OrderedDict()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._statements)
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @size.setter
+    def size(self, value: int) -> None:
+        if value < 0:
+            raise ValueError("The statement cache size can't be negative")
+        self._size = value
+        self._evict()
+
+    @property
+    def generation(self) -> int:
+        """
+        The number of times the cache has been cleared, because the schema may have changed.
+        """
+        return self._generation
+
+    def acquire(self, query: str) -> CachedStatement:
+        """
+        Take the prepared statement for a query out of the cache, or prepare it if it isn't cached.
+        """
+        cached = self._statements.pop(query, None)
+        if cached:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        return CachedStatement(self._generation, self._prepare(query))
+
+    def release(self, query: str, cached: CachedStatement) -> None:
+        """
+        Put an acquired statement back in the cache, evicting the least recently used statement if the cache is full.
+        """
+        if cached.generation != self._generation or query in self._statements or not self._size:
+            self._cleanup(cached.statement)
+            return
+        self._statements[query] = cached
+        self._evict()
+
+    def clear(self) -> None:
+        """
+        Clean up all cached statements. Statements that are in use are cleaned up when they are released.
+        """
+        self._generation += 1
+        while self._statements:
+            _, cached = self._statements.popitem()
+            self._cleanup(cached.statement)
+
+    def _evict(self) -> None:
+        while len(self._statements) > self._size:
+            _, cached = self._statements.popitem(last=False)
+            self._cleanup(cached.statement)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Compare Connection.append() with Connection.load_binary() for a table of random data.
+
+usage: bench-load-binary.py [rows] [database directory]
+"""
+import sys
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+import numpy as np
+
+import monetdbe
+
+rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+
+data = {
+    'i': np.arange(rows, dtype=np.int64),
+    'f': np.random.random(rows),
+    's': np.random.choice(np.array(['foo', 'bar', 'baz', 'quux']), rows),
+    't': np.datetime64('2020-01-01') + np.arange(rows).astype('timedelta64[s]'),
+}
+
+
+def bench(con, name, load):
+    con.execute(f"create table {name} (i bigint, f double, s string, t timestamp)")
+    start = perf_counter()
+    load(name)
+    elapsed = perf_counter() - start
+    count = con.execute(f"select count(*) from {name}").fetchone()[0]
+    print(f"{name:<12} {count} rows in {elapsed:.3f}s")
+
+
+with TemporaryDirectory() as tmp:
+    database = sys.argv[2] if len(sys.argv) > 2 else tmp
+    with monetdbe.connect(database, autocommit=True) as con:
+        bench(con, 'append', lambda table: con.append(table, data))
+        bench(con, 'load_binary', lambda table: con.load_binary(table, data))
@@ -0,0 +1,61 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+
+from monetdbe import aio
+from monetdbe.exceptions import ProgrammingError
+
+
+class TestAsyncConnection(IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.con = await aio.connect(autocommit=True)
+        await self.con.execute("create table async_values(i int, s string)")
+        await self.con.executemany("insert into async_values values (?, ?)", ((i, str(i)) for i in range(25)))
+
+    async def asyncTearDown(self):
+        await self.con.close()
+
+    async def test_execute(self):
+        cur = await self.con.execute("select i, s from async_values where i < ? order by i", (3,))
+        self.assertEqual([d.name for d in cur.description], ['i', 's'])
+        self.assertEqual(await cur.fetchall(), [(0, '0'), (1, '1'), (2, '2')])
+
+    async def test_fetchdf(self):
+        cur = await self.con.execute("select count(*) as n from async_values")
+        df = await cur.fetchdf()
+        self.assertEqual(df['n'][0], 25)
+
+    async def test_fetch_batches(self):
+        cur = await self.con.execute("select i from async_values order by i")
+        sizes = [len(batch) async for batch in cur.fetch_batches(10)]
+        self.assertEqual(sizes, [10, 10, 5])
+
+    async def test_event_loop_not_blocked(self):
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        ticker = asyncio.ensure_future(tick())
+        try:
+            cur = await self.con.execute("select count(*) from async_values a, async_values b, async_values c")
+            self.assertEqual(await cur.fetchone(), (25 ** 3,))
+        finally:
+            ticker.cancel()
+        self.assertGreater(ticks, 0)
+
+    async def test_cancel_pending(self):
+        slow = asyncio.ensure_future(self.con.execute("select count(*) from async_values a, async_values b"))
+        pending = asyncio.ensure_future(self.con.execute("insert into async_values values (100, 'x')"))
+        await asyncio.sleep(0)
+        pending.cancel()
+        await slow
+        cur = await self.con.execute("select count(*) from async_values")
+        self.assertEqual(await cur.fetchone(), (25,))
+
+    async def test_closed(self):
+        await self.con.close()
+        with self.assertRaises(ProgrammingError):
+            await self.con.execute("select 1")
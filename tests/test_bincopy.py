@@ -0,0 +1,146 @@
+from datetime import date, datetime
+from decimal import Decimal
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+import numpy.ma as ma
+
+from monetdbe.bincopy import encode_column, write_column
+from monetdbe.exceptions import ProgrammingError
+from tests.util import get_cached_connection, flush_cached_connection
+
+
+class TestEncodeColumn(TestCase):
+    def test_int(self):
+        encoded = encode_column(np.array([1, -2, 3], dtype=np.int64), 'int')
+        self.assertEqual(encoded, np.array([1, -2, 3], dtype='<i4').tobytes())
+
+    def test_int_null(self):
+        values = ma.masked_array([1, 2], mask=[0, 1])
+        encoded = np.frombuffer(encode_column(values, 'smallint'), dtype='<i2')
+        self.assertEqual(encoded.tolist(), [1, np.iinfo(np.int16).min])
+
+    def test_float_null(self):
+        encoded = np.frombuffer(encode_column([1.5, None], 'float'), dtype='<f8')
+        self.assertEqual(encoded[0], 1.5)
+        self.assertTrue(np.isnan(encoded[1]))
+
+    def test_boolean(self):
+        encoded = encode_column(ma.masked_array([True, False, True], mask=[0, 0, 1]), 'boolean')
+        self.assertEqual(encoded, b'\x01\x00\x80')
+
+    def test_string(self):
+        encoded = encode_column(ma.masked_array(['a', 'é', ''], mask=[0, 0, 1]), 'string')
+        self.assertEqual(encoded, b'a\x00\xc3\xa9\x00\x80\x00')
+
+    def test_string_none(self):
+        self.assertEqual(encode_column(['x', None], 'string'), b'x\x00\x80\x00')
+
+    def test_string_refused(self):
+        with self.assertRaises(ProgrammingError):
+            encode_column(['a\x00b'], 'string')
+        with self.assertRaises(ProgrammingError):
+            encode_column([1, 'x'], 'string')
+
+    def test_blob(self):
+        encoded = encode_column([b'ab', None], 'blob')
+        expected = np.array([2], dtype='<u8').tobytes() + b'ab' + b'\xff' * 8
+        self.assertEqual(encoded, expected)
+
+    def test_date(self):
+        values = np.array(['2021-03-04', 'nat'], dtype='datetime64[D]')
+        encoded = encode_column(values, 'date')
+        self.assertEqual(encoded, bytes([4, 3]) + np.array([2021], dtype='<i2').tobytes() + b'\xff' * 4)
+
+    def test_date_objects(self):
+        self.assertEqual(encode_column([date(2021, 3, 4)], 'date'), encode_column(
+            np.array(['2021-03-04'], dtype='datetime64[D]'), 'date'))
+
+    def test_timestamp(self):
+        encoded = encode_column([datetime(1969, 12, 31, 23, 59, 58, 123456), None], 'timestamp')
+        expected = np.array([123456], dtype='<u4').tobytes() + bytes([58, 59, 23, 0]) + \
+            bytes([31, 12]) + np.array([1969], dtype='<i2').tobytes() + b'\xff' * 12
+        self.assertEqual(encoded, expected)
+
+    def test_decimal(self):
+        encoded = np.frombuffer(encode_column(np.array([1.25, -0.5]), 'int', scale=2, digits=10), dtype='<i4')
+        self.assertEqual(encoded.tolist(), [125, -50])
+
+    def test_decimal_objects(self):
+        encoded = encode_column([Decimal('1.25'), 3, None], 'bigint', scale=2, digits=18)
+        self.assertEqual(np.frombuffer(encoded, dtype='<i8').tolist(), [125, 300, np.iinfo(np.int64).min])
+
+    def test_decimal_precision(self):
+        with self.assertRaises(ProgrammingError):
+            encode_column(np.array([1000]), 'smallint', scale=2, digits=4)
+
+    def test_float_to_int(self):
+        with self.assertRaises(ProgrammingError):
+            encode_column(np.array([1.5]), 'int')
+        with self.assertRaises(ProgrammingError):
+            encode_column([1.5], 'int')
+        self.assertEqual(encode_column(np.array([2.0]), 'int'), encode_column([2], 'int'))
+
+    def test_int_out_of_range(self):
+        with self.assertRaises(ProgrammingError):
+            encode_column(np.array([128]), 'tinyint')
+        with self.assertRaises(ProgrammingError):
+            encode_column([-2 ** 31], 'int')
+
+    def test_unsupported(self):
+        with self.assertRaises(ProgrammingError):
+            encode_column([1], 'time')
+
+    def test_write_column(self):
+        with TemporaryDirectory() as tmp:
+            path = write_column(Path(tmp) / 'col', [1, 2], 'bigint')
+            self.assertTrue(path.is_absolute())
+            self.assertEqual(path.read_bytes(), np.array([1, 2], dtype='<i8').tobytes())
+
+
+class TestLoadBinary(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def test_load_binary(self):
+        con = get_cached_connection(autocommit=True)
+        con.execute("create table bincopy(i int, s string, d date)")
+        loaded = con.load_binary('bincopy', {
+            'i': ma.masked_array([1, 2, 3], mask=[0, 1, 0]),
+            's': np.array(['a', 'b', 'c']),
+            'd': np.array(['2021-01-01', 'nat', '2021-01-03'], dtype='datetime64[D]'),
+        })
+        self.assertEqual(loaded, 3)
+        result = con.execute("select * from bincopy").fetchall()
+        self.assertEqual(result, [(1, 'a', date(2021, 1, 1)), (None, 'b', None), (3, 'c', date(2021, 1, 3))])
+
+    def test_load_existing_file(self):
+        con = get_cached_connection(autocommit=True)
+        con.execute("create table bincopy_file(i bigint)")
+        with TemporaryDirectory() as tmp:
+            path = write_column(Path(tmp) / 'i.bin', np.arange(10), 'bigint')
+            con.load_binary('bincopy_file', {'i': path})
+        self.assertEqual(con.execute("select sum(i) from bincopy_file").fetchone(), (45,))
+
+    def test_load_decimal(self):
+        con = get_cached_connection(autocommit=True)
+        con.execute("create table bincopy_decimal(d decimal(10, 2))")
+        con.load_binary('bincopy_decimal', {'d': np.array([1.25, 0.01, -3])})
+        result = con.execute("select d from bincopy_decimal").fetchall()
+        self.assertEqual(result, [(Decimal('1.25'),), (Decimal('0.01'),), (Decimal('-3.00'),)])
+
+    def test_load_float_into_int(self):
+        con = get_cached_connection(autocommit=True)
+        con.execute("create table bincopy_lossy(i int)")
+        with self.assertRaises(ProgrammingError):
+            con.load_binary('bincopy_lossy', {'i': np.array([1.9])})
+        self.assertEqual(con.execute("select count(*) from bincopy_lossy").fetchone(), (0,))
+
+    def test_unknown_column(self):
+        con = get_cached_connection(autocommit=True)
+        con.execute("create table bincopy_unknown(i int)")
+        with self.assertRaises(ProgrammingError):
+            con.load_binary('bincopy_unknown', {'j': np.arange(3)})
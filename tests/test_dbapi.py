@@ -38,8 +38,8 @@ class ModuleTests(unittest.TestCase):
                          "apilevel is %s, should be 2.0" % monetdbe.apilevel)
 
     def test_ThreadSafety(self):
-        self.assertEqual(monetdbe.threadsafety, 1,
-                         "threadsafety is %d, should be 1" % monetdbe.threadsafety)
+        self.assertEqual(monetdbe.threadsafety, 2,
+                         "threadsafety is %d, should be 2" % monetdbe.threadsafety)
 
     def test_ParamStyle(self):
         self.assertEqual(monetdbe.paramstyle, "qmark",
@@ -380,6 +380,8 @@ class CursorTests(unittest.TestCase):
         self.cu.execute("delete from test")
         self.cu.executemany("insert into test(name) values (?)", [(1,), (2,), (3,)])
         self.assertEqual(self.cu.rowcount, 3)
+        self.cu.execute("select name from test order by name")
+        self.assertEqual(self.cu.fetchall(), [('1',), ('2',), ('3',)])
 
     def test_TotalChanges(self):
         self.cu.execute("insert into test(name) values ('foo')")
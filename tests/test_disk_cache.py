@@ -0,0 +1,66 @@
+from tempfile import TemporaryDirectory
+from unittest import TestCase
+
+import numpy as np
+
+import monetdbe
+from monetdbe.disk_cache import DiskCache
+from tests.util import flush_cached_connection
+
+
+class TestDiskCache(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        flush_cached_connection()
+        cls.directory = TemporaryDirectory()
+        cls.con = monetdbe.connect(f"{cls.directory.name}/db", autocommit=True)
+        cls.con.execute("create table history (i int, s string)")
+        cls.con.executemany("insert into history values (?, ?)", [(i, None if i % 2 else str(i)) for i in range(10)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.con.close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.results = TemporaryDirectory()
+        self.cache = DiskCache(self.results.name)
+
+    def tearDown(self):
+        self.results.cleanup()
+
+    def test_hit(self):
+        query = "select i, s from history where i < ? order by i"
+        first = self.cache.fetchnumpy(self.con, query, (5,))
+        second = DiskCache(self.results.name).fetchnumpy(self.con, query, (5,))
+        self.assertEqual((self.cache.misses, self.cache.hits), (1, 0))
+        np.testing.assert_array_equal(second['i'], first['i'])
+        self.assertEqual(second['s'].tolist(), ['0', None, '2', None, '4'])
+        self.assertIsInstance(np.ma.getdata(second['i']), np.memmap)
+
+    def test_parameters(self):
+        query = "select count(*) as n from history where i < ?"
+        self.assertEqual(self.cache.fetchnumpy(self.con, query, (5,))['n'][0], 5)
+        self.assertEqual(self.cache.fetchnumpy(self.con, query, (3,))['n'][0], 3)
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_stamp(self):
+        query = "select count(*) as n from history"
+        self.assertEqual(self.cache.fetchnumpy(self.con, query)['n'][0], 10)
+        self.con.execute("insert into history values (10, '10')")
+        try:
+            self.assertEqual(self.cache.fetchnumpy(self.con, query)['n'][0], 11)
+            self.assertEqual(self.cache.hits, 0)
+        finally:
+            self.con.execute("delete from history where i = 10")
+
+    def test_not_cacheable(self):
+        self.assertEqual(self.cache.fetchnumpy(self.con, "select 1 as one")['one'][0], 1)
+        self.assertEqual((self.cache.misses, self.cache.hits), (0, 0))
+
+    def test_clear(self):
+        query = "select i from history order by i"
+        self.cache.fetchnumpy(self.con, query)
+        self.cache.clear()
+        self.cache.fetchnumpy(self.con, query)
+        self.assertEqual((self.cache.misses, self.cache.hits), (2, 0))
@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+import monetdbe
+from tests.util import flush_cached_connection
+
+
+class TestKeepOpen(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        flush_cached_connection()
+
+    def tearDown(self):
+        monetdbe.close_cached_databases()
+
+    def test_reuse(self):
+        first = monetdbe.connect(keep_open=True)
+        session = first._get_session_id()
+        first.execute("create local temporary table kept(i int) on commit preserve rows")
+        first.execute("create table not_committed(i int)")
+        first.close()
+
+        second = monetdbe.connect(keep_open=True, autocommit=True)
+        self.assertEqual(second._get_session_id(), session)
+        self.assertFalse(second.in_transaction)
+        count = second.execute("select count(*) from sys.tables where name in ('kept', 'not_committed')").fetchone()
+        self.assertEqual(count, (0,))
+        second.close()
+
+    def test_other_options(self):
+        first = monetdbe.connect(keep_open=True)
+        session = first._get_session_id()
+        first.close()
+        with monetdbe.connect(keep_open=True, nr_threads=1) as second:
+            self.assertNotEqual(second._get_session_id(), session)
@@ -0,0 +1,202 @@
+from datetime import date, datetime
+from decimal import Decimal
+from unittest import TestCase
+
+import numpy as np
+
+from monetdbe import cursors
+from monetdbe.cursors import _uses_qmark
+from monetdbe.exceptions import ProgrammingError, IntegrityError
+from monetdbe.formatting import parse_simple_insert, split_values_insert
+from monetdbe.inference import append_column
+from monetdbe.monetize import convert_column
+from tests.util import get_cached_connection, flush_cached_connection
+
+
+class TestUsesQmark(TestCase):
+    def test_qmark(self):
+        self.assertTrue(_uses_qmark("insert into t values (?, ?)", (1, 2)))
+
+    def test_no_placeholders(self):
+        self.assertTrue(_uses_qmark("insert into t values (1)", ()))
+
+    def test_quoted_placeholders(self):
+        self.assertFalse(_uses_qmark("insert into t values (%s, '?')", (1,)))
+        self.assertFalse(_uses_qmark("insert into t values (:1)", (1,)))
+
+    def test_mapping(self):
+        self.assertFalse(_uses_qmark("insert into t values (:a)", {'a': 1}))
+
+
+class TestParseSimpleInsert(TestCase):
+    def test_columns(self):
+        self.assertEqual(parse_simple_insert("INSERT INTO t (a, B) VALUES (?, ?)"), (None, 't', ['a', 'b'], 2))
+
+    def test_quoted_schema(self):
+        self.assertEqual(parse_simple_insert('insert into "My Schema".t values (?);'), ('My Schema', 't', None, 1))
+
+    def test_not_simple(self):
+        self.assertIsNone(parse_simple_insert("insert into t values (?, 1)"))
+        self.assertIsNone(parse_simple_insert("insert into t values (?), (?)"))
+        self.assertIsNone(parse_simple_insert("insert into t select ?"))
+
+
+class TestSplitValuesInsert(TestCase):
+    def test_split(self):
+        self.assertEqual(split_values_insert("INSERT INTO t (a, b) VALUES (%s, ')');"),
+                         ("INSERT INTO t (a, b) VALUES ", "(%s, ')')"))
+
+    def test_not_values(self):
+        self.assertIsNone(split_values_insert("insert into t select %s"))
+        self.assertIsNone(split_values_insert("update t set a = %s"))
+
+    def test_nested_values(self):
+        self.assertIsNone(split_values_insert("INSERT INTO t (a) SELECT * FROM (VALUES (%s)) AS x(a)"))
+        self.assertIsNone(split_values_insert("insert into t values (%s), (%s)"))
+        self.assertIsNone(split_values_insert("insert into t values (%s); drop table t"))
+        self.assertEqual(split_values_insert('insert into s."t" values ((%s), \'(\')'),
+                         ('insert into s."t" values ', "((%s), '(')"))
+
+
+class TestConvertColumn(TestCase):
+    def test_numeric(self):
+        self.assertEqual(convert_column(np.ma.masked_array([1, 2], mask=[0, 1])).tolist(), ['1', 'NULL'])
+        self.assertEqual(convert_column(np.array([1.5, np.nan])).tolist(), ['1.5', 'NULL'])
+        self.assertEqual(convert_column(np.array([True, False])).tolist(), ['true', 'false'])
+
+    def test_strings(self):
+        self.assertEqual(convert_column(np.array(["it's", "a\\b"])).tolist(), ["'it\\'s'", "'a\\\\b'"])
+
+    def test_datetime(self):
+        values = np.array(['2020-01-01T10:00', 'NaT'], dtype='datetime64[s]')
+        self.assertEqual(convert_column(values).tolist(), ["'2020-01-01T10:00:00'", 'NULL'])
+
+    def test_objects(self):
+        values = np.array([Decimal('1.5'), None, 'x', date(2020, 1, 2)], dtype=object)
+        self.assertEqual(convert_column(values).tolist(), ['1.5', 'NULL', "'x'", "'2020-01-02'"])
+
+
+class TestAppendColumn(TestCase):
+    def test_integers(self):
+        self.assertEqual(append_column([1, None, 3], 'int').tolist(), [1, None, 3])
+
+    def test_integer_out_of_range(self):
+        self.assertIsNone(append_column([128], 'tinyint'))
+        # the smallest value is NULL
+        self.assertIsNone(append_column([-128], 'tinyint'))
+
+    def test_no_conversion(self):
+        self.assertIsNone(append_column(['1'], 'int'))
+        self.assertIsNone(append_column([True], 'int'))
+        self.assertIsNone(append_column([1], 'varchar'))
+        self.assertIsNone(append_column([datetime(2020, 1, 1)], 'date'))
+
+    def test_varchar_length(self):
+        self.assertEqual(append_column(['ab', None], 'varchar', 2).tolist(), ['ab', None])
+        self.assertIsNone(append_column(['abc'], 'varchar', 2))
+
+    def test_not_nullable(self):
+        self.assertIsNone(append_column([None], 'double', nullable=False))
+
+    def test_timestamp(self):
+        values = append_column([datetime(2020, 1, 1, 12), None], 'timestamp')
+        self.assertEqual(values[0], np.datetime64('2020-01-01T12:00'))
+        self.assertTrue(np.isnat(values[1]))
+
+    def test_unsupported_type(self):
+        self.assertIsNone(append_column([Decimal(1)], 'decimal'))
+
+
+class TestExecuteMany(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def setUp(self):
+        self.con = get_cached_connection()
+        self.con.execute("create table many(i bigint, d decimal(10, 2), s string, t timestamp, dt date, b boolean)")
+
+    def test_generator(self):
+        rows = ((i, Decimal(i) / 4, str(i), datetime(2020, 1, 1, i % 24), date(2020, 1, 1 + i % 28), i % 2 == 0)
+                for i in range(1000))
+        cur = self.con.executemany("insert into many values (?, ?, ?, ?, ?, ?)", rows)
+        self.assertEqual(cur.rowcount, 1000)
+        result = self.con.execute("select * from many where i = 5").fetchall()
+        self.assertEqual(result, [(5, Decimal('1.25'), '5', datetime(2020, 1, 1, 5), date(2020, 1, 6), False)])
+
+    def test_nulls(self):
+        self.con.executemany("insert into many values (?, ?, ?, ?, ?, ?)", [(None,) * 6, (1, None, 'x', None, None, None)])
+        result = self.con.execute("select * from many order by i").fetchall()
+        self.assertEqual(result, [(None,) * 6, (1, None, 'x', None, None, None)])
+
+    def test_large_integer(self):
+        self.con.executemany("insert into many(i) values (?)", [(2 ** 40,), (-5,)])
+        self.assertEqual(self.con.execute("select i from many order by i").fetchall(), [(-5,), (2 ** 40,)])
+
+    def test_fractional_integer(self):
+        with self.assertRaises(ProgrammingError):
+            self.con.executemany("insert into many(i) values (?)", [(1.9,)])
+        with self.assertRaises(ProgrammingError):
+            self.con.executemany("insert into many(i) values (?)", [(Decimal('2.5'),)])
+        self.con.executemany("insert into many(i) values (?)", [(3.0,), (Decimal(4),)])
+        self.assertEqual(self.con.execute("select i from many order by i").fetchall(), [(3,), (4,)])
+
+    def test_converted_by_monetdb(self):
+        self.con.executemany("insert into many(i, s, t, dt) values (?, ?, ?, ?)",
+                             [(1, 'a', datetime(2020, 1, 1), date(2020, 1, 1)),
+                              (2, 42, '2020-01-02 03:04:05', '2020-01-02'),
+                              (3, 1.5, None, None)])
+        result = self.con.execute("select i, s, t, dt from many order by i").fetchall()
+        self.assertEqual(result, [(1, 'a', datetime(2020, 1, 1), date(2020, 1, 1)),
+                                  (2, '42', datetime(2020, 1, 2, 3, 4, 5), date(2020, 1, 2)),
+                                  (3, '1.5', None, None)])
+
+    def test_wrong_number_of_parameters(self):
+        with self.assertRaises(ProgrammingError):
+            self.con.executemany("insert into many(i) values (?)", [(1, 2)])
+
+    def test_chunks(self):
+        chunk_size = cursors.executemany_append_chunk_size
+        cursors.executemany_append_chunk_size = 3
+        try:
+            # the second chunk contains a string for an integer column, which is inserted row by row
+            rows = [(i, None, None, None, None, None) for i in (1, 2, 3, '4', 5, None, 7)]
+            cur = self.con.executemany("insert into many values (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            cursors.executemany_append_chunk_size = chunk_size
+        self.assertEqual(cur.rowcount, 7)
+        result = self.con.execute("select count(*), sum(i) from many").fetchone()
+        self.assertEqual(result, (7, 22))
+
+    def test_appended_chunks(self):
+        chunk_size = cursors.executemany_append_chunk_size
+        cursors.executemany_append_chunk_size = 2
+        try:
+            rows = [(i, None, None, None, None, None) for i in range(5)] + [(5, None, 'x', None, None, None)]
+            cur = self.con.executemany("insert into many(i, d, s, t, dt, b) values (?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            cursors.executemany_append_chunk_size = chunk_size
+        self.assertEqual(cur.rowcount, 6)
+        self.assertEqual(self.con.execute("select i, s from many order by i").fetchall()[-2:], [(4, None), (5, 'x')])
+
+    def test_primary_key(self):
+        self.con.execute("create table keyed(i int primary key)")
+        with self.assertRaises(IntegrityError):
+            self.con.executemany("insert into keyed values (?)", [(1,), (1,)])
+
+    def test_python_paramstyle(self):
+        batch_rows = cursors.insert_batch_rows
+        cursors.insert_batch_rows = 2
+        try:
+            cur = self.con.cursor()
+            cur.executemany("insert into many(i, s) values (:1, :2)", [(i, str(i)) for i in range(5)])
+        finally:
+            cursors.insert_batch_rows = batch_rows
+        self.assertEqual(cur.rowcount, 5)
+        self.assertEqual(self.con.execute("select count(*), sum(i) from many").fetchone(), (5, 10))
+
+    def test_insert_slow(self):
+        self.con.execute("create table slow(i int, o string)")
+        values = {'i': np.array([1, 2]), 'o': np.array([date(2020, 1, 1), None], dtype=object)}
+        self.con.cursor()._insert_slow('slow', values)
+        self.assertEqual(self.con.execute("select * from slow order by i").fetchall(), [(1, '2020-01-01'), (2, None)])
@@ -1,6 +1,8 @@
 import unittest
 
 import monetdbe as monetdbe
+from monetdbe.formatting import format_query, _compile, _render, strip_split_and_clean, normalize_query, written_tables, \
+    referenced_tables
 
 from tests.util import get_cached_connection, flush_cached_connection
 
@@ -64,3 +66,87 @@ class TransactionTests(unittest.TestCase):
         con2.execute("insert into test(i, s) values (?, ?)", (5, "bla"))
         con1.execute("create table test(i int, s text)")
         con1.execute("insert into test(i, s) values (?, ?)", (5, "bla"))
+
+
+class TemplateTests(unittest.TestCase):
+    def test_compile(self):
+        template = _compile("select {}, {{x}}, {a!r:>5}")
+        self.assertEqual(template.literals, ('select ', ', {x}, ', ''))
+        self.assertEqual(template.fields, (('', None, ''), ('a', 'r', '>5')))
+
+    def test_repeated(self):
+        for i in range(3):
+            self.assertEqual(format_query("select ?, ':x'", (i,)), f"select {i}, ':x'")
+            self.assertEqual(format_query("select :a, :b", {'a': i, 'b': 'x'}), f"select {i}, 'x'")
+            self.assertEqual(format_query("select :2, :1", (i, 'x')), f"select 'x', {i}")
+
+    def test_fallback(self):
+        for template, args, kwargs in (("{0[1]} {a.real}", (['x', 'y'],), {'a': 3}),
+                                       ("{0:{1}}", ('x', '>3'), {}),
+                                       ("{} {0}", ('x',), {})):
+            self.assertFalse(_compile(template).simple)
+            try:
+                expected = template.format(*args, **kwargs)
+            except ValueError:
+                with self.assertRaises(ValueError):
+                    _render(_compile(template), args, kwargs)
+            else:
+                self.assertEqual(_render(_compile(template), args, kwargs), expected)
+
+    def test_missing_name(self):
+        with self.assertRaises(monetdbe.ProgrammingError):
+            format_query("select :a", {'b': 1})
+
+
+class SplitScriptTests(unittest.TestCase):
+    def test_comments(self):
+        script = """
+            -- a comment; with a semicolon
+            create table a(i int); /* a block; comment */
+            insert into a(i) values (5);/**/select 1
+            """
+        self.assertEqual(strip_split_and_clean(script),
+                         ['create table a(i int)', 'insert into a(i) values (5)', 'select 1'])
+
+    def test_quotes(self):
+        script = """insert into t values ('a;b', 'it''s; -- no comment', 'c\\';d'); select "x;y", 1/2 - 3 from t"""
+        self.assertEqual(strip_split_and_clean(script), [
+            """insert into t values ('a;b', 'it''s; -- no comment', 'c\\';d')""",
+            'select "x;y", 1/2 - 3 from t',
+        ])
+
+    def test_block_comments_are_not_greedy(self):
+        self.assertEqual(strip_split_and_clean("select /* a */ 1 /* b */; select 2"), ['select   1', 'select 2'])
+
+    def test_unterminated(self):
+        self.assertEqual(strip_split_and_clean("select 'a; b"), ["select 'a; b"])
+
+
+class ResultCacheParsingTests(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize_query("  select  'a  b',\n  \"x  y\"\tfrom t ; "), "select 'a  b', \"x  y\" from t")
+
+    def test_written_tables(self):
+        self.assertEqual(written_tables("insert into sys.t values (1)"), {'t'})
+        self.assertEqual(written_tables('UPDATE "T" SET a = 1'), {'T'})
+        self.assertEqual(written_tables("delete from t where a = 'x'"), {'t'})
+        self.assertEqual(written_tables("copy 10 records into t from 'file'"), {'t'})
+        self.assertEqual(written_tables("select * from t"), frozenset())
+        self.assertEqual(written_tables("commit"), frozenset())
+        self.assertIsNone(written_tables("create table t (a int)"))
+        self.assertIsNone(written_tables("call sys.p()"))
+        self.assertIsNone(written_tables("rollback"))
+
+    def test_referenced_tables(self):
+        self.assertEqual(referenced_tables('select a, count(*) from sys.t join "U" on t.a = "U".a group by a, b'),
+                         {('sys', 't'), (None, 'U')})
+        self.assertEqual(referenced_tables("select * from t where a in (select b from u) and c = 'from v'"),
+                         {(None, 't'), (None, 'u')})
+
+    def test_not_cacheable(self):
+        self.assertIsNone(referenced_tables("select 1"))
+        self.assertIsNone(referenced_tables("select * from t, u"))
+        self.assertIsNone(referenced_tables("select * from (select 1) as s"))
+        self.assertIsNone(referenced_tables("select * from generate_series(1, 3)"))
+        self.assertIsNone(referenced_tables("select now() from t"))
+        self.assertIsNone(referenced_tables("insert into t select * from u"))
@@ -23,13 +23,8 @@
 
 import unittest
 
-from os import unlink
-from tempfile import NamedTemporaryFile
-
 import monetdbe as monetdbe
 
-TESTFN = NamedTemporaryFile().name
-
 
 @unittest.skip("todo (gijs): for now we dont support hooks")
 class CollationTests(unittest.TestCase):
@@ -220,7 +215,6 @@ class ProgressTests(unittest.TestCase):
         self.assertEqual(action, 0, "progress handler was not cleared")
 
 
-@unittest.skip("todo (gijs): for now we dont support hooks")
 class TraceCallbackTests(unittest.TestCase):
     def test_TraceCallbackUsed(self):
         """
@@ -233,9 +227,10 @@ class TraceCallbackTests(unittest.TestCase):
             traced_statements.append(statement)
 
         con.set_trace_callback(trace)
-        con.execute("create table foo(a, b)")
+        con.execute("create table foo(a int, b int)")
         self.assertTrue(traced_statements)
         self.assertTrue(any("create table foo" in stmt for stmt in traced_statements))
+        con.close()
 
     def test_ClearTraceCallback(self):
         """
@@ -249,8 +244,9 @@ class TraceCallbackTests(unittest.TestCase):
 
         con.set_trace_callback(trace)
         con.set_trace_callback(None)
-        con.execute("create table foo(a, b)")
+        con.execute("create table foo(a int, b int)")
         self.assertFalse(traced_statements, "trace callback was not cleared")
+        con.close()
 
     def test_UnicodeContent(self):
         """
@@ -264,15 +260,13 @@ class TraceCallbackTests(unittest.TestCase):
             traced_statements.append(statement)
 
         con.set_trace_callback(trace)
-        con.execute("create table foo(x)")
-        # Can't execute bound parameters as their values don't appear
-        # in traced statements before monetdbe 3.6.21
-        # (cf. http://www.monetdbe.org/draft/releaselog/3_6_21.html)
-        con.execute('insert into foo(x) values ("%s")' % unicode_value)
-        con.commit()
+        con.execute("create table foo(x string)")
+        con.execute("insert into foo(x) values ('%s')" % unicode_value)
+        con.rollback()
         self.assertTrue(any(unicode_value in stmt for stmt in traced_statements),
                         "Unicode data %s garbled in trace callback: %s"
                         % (ascii(unicode_value), ', '.join(map(ascii, traced_statements))))
+        con.close()
 
     def test_TraceCallbackContent(self):
         # set_trace_callback() shouldn't produce duplicate content (bpo-26187)
@@ -281,17 +275,46 @@ class TraceCallbackTests(unittest.TestCase):
         def trace(statement):
             traced_statements.append(statement)
 
-        queries = ["create table foo(x)",
+        queries = ["create table foo(x int)",
                    "insert into foo(x) values(1)"]
-        self.addCleanup(unlink, TESTFN)
-        con1 = monetdbe.connect(TESTFN, isolation_level=None)
-        con2 = monetdbe.connect(TESTFN)
+        con1 = monetdbe.connect(":memory:")
+        con2 = monetdbe.connect(":memory:")
         con1.set_trace_callback(trace)
         cur = con1.cursor()
         cur.execute(queries[0])
-        con2.execute("create table bar(x)")
+        con2.execute("create table bar(x int)")
         cur.execute(queries[1])
         self.assertEqual(traced_statements, queries)
+        con1.close()
+        con2.close()
+
+    def test_TraceDetails(self):
+        traced = []
+
+        def trace(statement, seconds, rows, affected_rows):
+            traced.append((statement, rows, affected_rows))
+            self.assertGreaterEqual(seconds, 0)
+
+        con = monetdbe.connect(":memory:")
+        con.set_trace_callback(trace, details=True)
+        con.execute("create table foo(x int)")
+        con.execute("insert into foo(x) values (1), (2)")
+        con.cursor().insert('foo', {'x': [3]})
+        con.execute("select x from foo").fetchall()
+        self.assertEqual(traced[1:], [("insert into foo(x) values (1), (2)", 0, 2),
+                                      ("append sys.foo", 0, 1),
+                                      ("select x from foo", 3, 3)])
+        con.close()
+
+    def test_FailingCallback(self):
+        def trace(statement):
+            raise ValueError(statement)
+
+        con = monetdbe.connect(":memory:")
+        con.set_trace_callback(trace)
+        with self.assertLogs('monetdbe.connection'):
+            self.assertEqual(con.execute("select 1").fetchall(), [(1,)])
+        con.close()
 
 
 if __name__ == "__main__":
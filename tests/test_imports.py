@@ -0,0 +1,21 @@
+import subprocess
+import sys
+from unittest import TestCase
+
+
+def imported_after(statement: str):
+    code = f"import sys; {statement}; print(' '.join(sorted(sys.modules)))"
+    output = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    return set(output.split())
+
+
+class TestImports(TestCase):
+    def test_lazy_imports(self):
+        modules = imported_after("import monetdbe")
+        self.assertNotIn('pandas', modules)
+        self.assertNotIn('monetdbe._lowlevel', modules)
+
+    def test_lowlevel_on_connect(self):
+        modules = imported_after("import monetdbe; monetdbe.connect().close()")
+        self.assertIn('monetdbe._lowlevel', modules)
+        self.assertNotIn('pandas', modules)
@@ -0,0 +1,62 @@
+from unittest import TestCase
+
+import numpy as np
+
+from monetdbe.exceptions import ProgrammingError
+from monetdbe.formatting import rewrite_in_parameters
+from tests.util import get_cached_connection, flush_cached_connection
+
+
+def subquery(index, values):
+    return f"SELECT v FROM t{index}"
+
+
+class TestRewriteInParameters(TestCase):
+    def test_in(self):
+        query, parameters = rewrite_in_parameters("select * from t where a in ? and b = ?", [[1, 2], 3], subquery)
+        self.assertEqual(query, "select * from t where a IN (SELECT v FROM t0) and b = ?")
+        self.assertEqual(parameters, [3])
+
+    def test_any(self):
+        query, parameters = rewrite_in_parameters("select * from t where a = ?  and b = ANY( ? )",
+                                                  [1, np.array([2])], subquery)
+        self.assertEqual(query, "select * from t where a = ?  and b = ANY (SELECT v FROM t1)")
+        self.assertEqual(parameters, [1])
+
+    def test_single_value(self):
+        query, parameters = rewrite_in_parameters("select * from t where a in ?", ['x'], subquery)
+        self.assertEqual(query, "select * from t where a IN (?)")
+        self.assertEqual(parameters, ['x'])
+
+    def test_quoted(self):
+        query, parameters = rewrite_in_parameters("select 'in ?', \"in ?\" from t where a in ?", [[1]], subquery)
+        self.assertEqual(query, "select 'in ?', \"in ?\" from t where a IN (SELECT v FROM t0)")
+        self.assertEqual(parameters, [])
+
+
+class TestInList(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def setUp(self):
+        self.con = get_cached_connection()
+        self.con.execute("create table filtered(i int, s string)")
+        self.con.execute("insert into filtered values (1, 'a'), (2, 'b'), (3, 'c'), (4, 'd')")
+
+    def test_in_list(self):
+        query = "select i from filtered where i in ? and s <> ? order by i"
+        self.assertEqual(self.con.execute(query, (np.arange(3), 'a')).fetchall(), [(2,)])
+        # the table of values is reused for the next query
+        self.assertEqual(self.con.execute(query, ([3, 4, 5], 'x')).fetchall(), [(3,), (4,)])
+
+    def test_strings(self):
+        result = self.con.execute("select i from filtered where s = any(?) order by i", ({'b', 'd', 'e'},)).fetchall()
+        self.assertEqual(result, [(2,), (4,)])
+
+    def test_empty(self):
+        self.assertEqual(self.con.execute("select i from filtered where i in ?", ([],)).fetchall(), [])
+
+    def test_unsupported(self):
+        with self.assertRaises(ProgrammingError):
+            self.con.execute("select i from filtered where i in ?", ([[1, 2], [3, 4]],))
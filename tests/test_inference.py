@@ -0,0 +1,137 @@
+from datetime import date, datetime, time, timezone
+from decimal import Decimal
+from unittest import TestCase
+
+import numpy as np
+import numpy.ma as ma
+import pandas as pd
+
+from monetdbe.cursors import _pandas_to_numpy
+from monetdbe.exceptions import ProgrammingError
+from monetdbe.inference import infer_column
+from tests.util import get_cached_connection, flush_cached_connection
+
+
+class TestInferColumn(TestCase):
+    def test_numeric(self):
+        self.assertEqual(infer_column(np.array([1, 2], dtype=np.int8))[0], 'TINYINT')
+        self.assertEqual(infer_column(np.array([1, 2], dtype=np.uint32))[0], 'BIGINT')
+        self.assertEqual(infer_column(np.array([1.0], dtype=np.float32))[0], 'REAL')
+        self.assertEqual(infer_column(np.array([True]))[0], 'BOOLEAN')
+
+    def test_datetime64(self):
+        self.assertEqual(infer_column(np.array(['2020-01-01'], dtype='datetime64[D]'))[0], 'DATE')
+        self.assertEqual(infer_column(np.array(['2020-01-01T10:00'], dtype='datetime64[ns]'))[0], 'TIMESTAMP')
+
+    def test_varchar(self):
+        self.assertEqual(infer_column(np.array(['a', 'abc']))[0], 'VARCHAR(3)')
+
+    def test_object_strings_with_none(self):
+        sql_type, values = infer_column(np.array(['ab', None, 'abcd'], dtype=object))
+        self.assertEqual(sql_type, 'VARCHAR(4)')
+        self.assertEqual(values.dtype.kind, 'U')
+        self.assertEqual(values.mask.tolist(), [False, True, False])
+
+    def test_object_integers_with_none(self):
+        sql_type, values = infer_column(np.array([1, None, 3], dtype=object))
+        self.assertEqual(sql_type, 'BIGINT')
+        self.assertEqual(values.tolist(), [1, None, 3])
+
+    def test_object_large_integers(self):
+        sql_type, values = infer_column(np.array([2 ** 63, None, -1], dtype=object))
+        self.assertEqual(sql_type, 'DECIMAL(19,0)')
+        self.assertEqual(values.tolist(), [Decimal(2 ** 63), None, Decimal(-1)])
+
+    def test_object_integers_too_large(self):
+        with self.assertRaisesRegex(ProgrammingError, 'column big'):
+            infer_column(np.array([10 ** 40], dtype=object), 'big')
+
+    def test_object_booleans(self):
+        self.assertEqual(infer_column(np.array([True, None], dtype=object))[0], 'BOOLEAN')
+
+    def test_decimal(self):
+        sql_type, values = infer_column(np.array([Decimal('1.5'), Decimal('-123.25'), None], dtype=object))
+        self.assertEqual(sql_type, 'DECIMAL(5,2)')
+        self.assertEqual(values.tolist(), [150, -12325, None])
+
+    def test_large_decimal(self):
+        sql_type, values = infer_column(np.array([Decimal('1234567890.1234567890')], dtype=object))
+        self.assertEqual(sql_type, 'DECIMAL(20,10)')
+        self.assertEqual(values.dtype, np.dtype(object))
+
+    def test_datetime_objects(self):
+        aware = datetime(2020, 1, 1, 12, tzinfo=timezone.utc)
+        sql_type, values = infer_column(np.array([aware, None], dtype=object))
+        self.assertEqual(sql_type, 'TIMESTAMP')
+        self.assertEqual(values[0], np.datetime64('2020-01-01T12:00'))
+        self.assertTrue(np.isnat(values[1]))
+
+    def test_date_objects(self):
+        sql_type, values = infer_column(np.array([date(2020, 1, 1)], dtype=object))
+        self.assertEqual(sql_type, 'DATE')
+        self.assertEqual(values.dtype, np.dtype('datetime64[D]'))
+
+    def test_blob(self):
+        self.assertEqual(infer_column(np.array([b'ab', None], dtype=object))[0], 'BLOB')
+
+    def test_masked_input(self):
+        sql_type, values = infer_column(ma.masked_array(np.array(['x', 'y'], dtype=object), mask=[0, 1]))
+        self.assertEqual(sql_type, 'VARCHAR(1)')
+        self.assertEqual(values.mask.tolist(), [False, True])
+
+    def test_unsupported(self):
+        with self.assertRaises(ProgrammingError):
+            infer_column(np.array([1, 2], dtype='timedelta64[s]'))
+
+
+class TestPandasToNumpy(TestCase):
+    def test_nullable_integers(self):
+        values = _pandas_to_numpy(pd.Series([1, None], dtype='Int32'))
+        self.assertEqual(values.dtype, np.dtype(np.int32))
+        self.assertEqual(values.tolist(), [1, None])
+
+    def test_timezone_aware(self):
+        values = _pandas_to_numpy(pd.Series(pd.to_datetime(['2020-01-01 12:00']).tz_localize('Europe/Amsterdam')))
+        self.assertEqual(values[0], np.datetime64('2020-01-01T11:00'))
+
+    def test_strings(self):
+        values = _pandas_to_numpy(pd.Series(['a', None], dtype='string'))
+        self.assertEqual(values.tolist(), ['a', None])
+
+
+class TestCreate(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def test_create_from_dataframe(self):
+        con = get_cached_connection(autocommit=True)
+        df = pd.DataFrame({
+            'i': pd.array([1, None, 3], dtype='Int64'),
+            'b': pd.array([True, None, False], dtype='boolean'),
+            's': ['a', None, 'ccc'],
+            't': pd.to_datetime(['2020-01-01 10:00', None, '2020-01-03 12:00']),
+            'd': [Decimal('1.25'), Decimal('2.5'), None],
+        })
+        con.cursor().create('inferred', df)
+        types = dict(con.execute(
+            "select c.name, c.type from sys.columns c join sys.tables t on c.table_id = t.id "
+            "where t.name = 'inferred'").fetchall())
+        self.assertEqual(types, {'i': 'bigint', 'b': 'boolean', 's': 'varchar', 't': 'timestamp', 'd': 'decimal'})
+        result = con.execute("select i, b, s, d from inferred").fetchall()
+        self.assertEqual(result, [(1, True, 'a', Decimal('1.25')),
+                                  (None, None, None, Decimal('2.50')),
+                                  (3, False, 'ccc', None)])
+
+    def test_create_large_integers(self):
+        con = get_cached_connection(autocommit=True)
+        con.cursor().create('inferred_large', {'i': [2 ** 64, 1]})
+        self.assertEqual(con.execute("select i from inferred_large order by i").fetchall(),
+                         [(Decimal(1),), (Decimal(2 ** 64),)])
+
+    def test_create_quoted_names(self):
+        # TIME columns are inserted as literals, which should quote the names like create() does
+        con = get_cached_connection(autocommit=True)
+        con.cursor().create('Inferred Times', {'Start': [time(10, 30), None], 'select': ['a', 'b']})
+        self.assertEqual(con.execute('select "Start", "select" from "Inferred Times" order by "select"').fetchall(),
+                         [(time(10, 30), 'a'), (None, 'b')])
@@ -0,0 +1,96 @@
+from threading import Timer
+from unittest import TestCase
+import unittest.mock
+
+import monetdbe
+from monetdbe._cffi.internal import Internal
+from monetdbe.exceptions import Error, OperationalError
+
+
+class TestInterrupt(TestCase):
+    def setUp(self):
+        self.con = monetdbe.connect(autocommit=True)
+        self.con.execute("create or replace function slow() returns bigint begin "
+                         "declare i bigint; set i = 0; while i < 10000000000 do set i = i + 1; end while; "
+                         "return i; end")
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_timeout(self):
+        cur = self.con.cursor()
+        with self.assertRaises(OperationalError):
+            cur.execute("select slow()", timeout=0.5)
+        self.assertIsNone(cur.fetchone())
+        self.assertEqual(cur.execute("select 1").fetchall(), [(1,)])
+
+    def test_no_session_lookup_on_connect(self):
+        with monetdbe.connect(autocommit=True) as con:
+            self.assertFalse(con._session_known)
+
+    def test_failed_session_lookup_retried(self):
+        with monetdbe.connect(autocommit=True) as con:
+            with unittest.mock.patch.object(Internal, 'get_session_id', return_value=None):
+                self.assertIsNone(con._get_session_id())
+            self.assertIsNotNone(con._get_session_id())
+            self.assertTrue(con._session_known)
+
+    def test_no_timeout(self):
+        self.assertEqual(self.con.execute("select 1", timeout=10).fetchall(), [(1,)])
+
+    def test_interrupt(self):
+        timer = Timer(0.5, self.con.interrupt)
+        timer.start()
+        try:
+            with self.assertRaises(Error):
+                self.con.execute("select slow()")
+        finally:
+            timer.join()
+        self.assertEqual(self.con.execute("select 2").fetchall(), [(2,)])
+
+
+class TestProgressHandler(TestCase):
+    def setUp(self):
+        self.con = monetdbe.connect(autocommit=True)
+        self.con.execute("create or replace function slow() returns bigint begin "
+                         "declare i bigint; set i = 0; while i < 10000000000 do set i = i + 1; end while; "
+                         "return i; end")
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_cancel(self):
+        calls = []
+
+        def progress(elapsed, queued):
+            calls.append(queued)
+            return elapsed > 0.5
+
+        self.con.set_progress_handler(progress, 50, details=True)
+        with self.assertRaises(OperationalError):
+            self.con.execute("select slow()")
+        self.assertGreater(len(calls), 1)
+        self.assertIn('select slow()', calls[0]['query'])
+        self.assertEqual(self.con.execute("select 1").fetchall(), [(1,)])
+
+    def test_continue(self):
+        calls = []
+
+        def progress():
+            calls.append(None)
+            return 0
+
+        self.con.set_progress_handler(progress, 1)
+        self.assertEqual(self.con.execute("select count(*) from sys.tables t1, sys.tables t2").rowcount, 1)
+        self.con.set_progress_handler(None, 1)
+        self.assertIsNone(self.con._progress_handler)
+
+    def test_exception(self):
+        def progress():
+            raise KeyboardInterrupt
+
+        self.con.set_progress_handler(progress, 50)
+        with self.assertRaises(KeyboardInterrupt):
+            self.con.execute("select slow()")
+        self.con.set_progress_handler(None, 0)
+        self.assertEqual(self.con.execute("select 1").fetchall(), [(1,)])
@@ -0,0 +1,76 @@
+from unittest import TestCase
+
+import monetdbe
+from monetdbe.metrics import Histogram, Metrics, Measurement, counting_allocations
+from tests.util import get_cached_connection
+
+
+class TestHistogram(TestCase):
+    def test_record(self):
+        histogram = Histogram(first=1)
+        for value in (0, 1, 3, 4, 100):
+            histogram.record(value)
+        self.assertEqual((histogram.count, histogram.total, histogram.min, histogram.max), (5, 108, 0, 100))
+        self.assertEqual(histogram.as_dict()['buckets'], {1: 2, 4: 2, 128: 1})
+        self.assertEqual(histogram.quantile(0.5), 4)
+        self.assertEqual(histogram.quantile(1), 100)
+
+    def test_empty(self):
+        self.assertIsNone(Histogram().as_dict()['p50'])
+
+
+class TestMetrics(TestCase):
+    def test_hooks(self):
+        metrics = Metrics()
+        measurements = []
+        metrics.add_hook(measurements.append)
+        with metrics.measure('execute', 'select 1'):
+            pass
+        self.assertEqual(len(measurements), 1)
+        self.assertEqual(measurements[0].phase, 'execute')
+        self.assertEqual(metrics.timings['execute'].count, 1)
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.record(Measurement('fetch', None, 0.5, 2))
+        metrics.record_conversion('int', 10, 40)
+        metrics.reset()
+        stats = metrics.as_dict()
+        self.assertEqual(stats['timings']['fetch']['count'], 0)
+        self.assertEqual(stats['rows'], {})
+
+
+class TestConnectionMetrics(TestCase):
+    def test_stats(self):
+        with monetdbe.connect(':memory:', metrics=True, autocommit=True) as con:
+            measurements = []
+            con.metrics.add_hook(measurements.append)
+            con.execute("create table metrics (i int, s string)")
+            con.execute("insert into metrics values (1, 'a'), (2, 'b')")
+            con.execute("select i, s from metrics").fetchall()
+            stats = con.stats()
+            self.assertGreater(stats['timings']['execute']['count'], 0)
+            self.assertGreater(stats['timings']['fetch']['count'], 0)
+            self.assertGreater(stats['allocations']['total'], 0)
+            self.assertEqual(stats['rows'], {'int': 2, 'string': 2})
+            self.assertIn('select i, s from metrics', [m.operation for m in measurements if m.phase == 'fetch'])
+
+    def test_disabled(self):
+        con = get_cached_connection()
+        self.assertIsNone(con.metrics)
+        with self.assertRaises(monetdbe.ProgrammingError):
+            con.stats()
+
+    def test_counting_stops_on_close(self):
+        from monetdbe._cffi import internal
+
+        original = internal.ffi
+        con = monetdbe.connect(':memory:', metrics=True)
+        self.assertTrue(counting_allocations())
+        self.assertIsNot(internal.ffi, original)
+        con.close()
+        self.assertFalse(counting_allocations())
+        self.assertIs(internal.ffi, original)
+        with monetdbe.connect(':memory:') as other:
+            other.execute("select 1").fetchall()
+            self.assertFalse(counting_allocations())
@@ -0,0 +1,58 @@
+import os
+from tempfile import TemporaryDirectory
+from unittest import TestCase, skipUnless
+
+import numpy as np
+
+import monetdbe
+from monetdbe.parallel import key_ranges, modulo_buckets, partitioned_query
+from tests.util import flush_cached_connection
+
+
+def count_rows(result):
+    return len(result['i'])
+
+
+class TestPartitions(TestCase):
+    def test_key_ranges(self):
+        self.assertEqual(key_ranges(0, 10, 3), [(0, 3), (3, 7), (7, 10)])
+
+    def test_modulo_buckets(self):
+        self.assertEqual(modulo_buckets(2), [(2, 0), (2, 1)])
+
+
+class TestPartitionedQuery(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        flush_cached_connection()
+        cls.directory = TemporaryDirectory()
+        cls.database = f"{cls.directory.name}/db"
+        with monetdbe.connect(cls.database, autocommit=True) as con:
+            con.execute("create table partitioned(i int, s string)")
+            con.executemany("insert into partitioned values (?, ?)",
+                            [(i, None if i % 10 == 0 else str(i)) for i in range(100)])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.directory.cleanup()
+
+    def test_key_ranges(self):
+        results = partitioned_query(self.database, "select i, s from partitioned where i >= ? and i < ? order by i",
+                                    key_ranges(0, 100, 4), processes=2)
+        self.assertEqual([len(result['i']) for result in results], [25, 25, 25, 25])
+        values = np.ma.concatenate([result['i'] for result in results])
+        self.assertEqual(values.tolist(), list(range(100)))
+        self.assertEqual(results[0]['s'][:2].tolist(), [None, '1'])
+
+    def test_process(self):
+        counts = partitioned_query(self.database, "select i from partitioned where mod(i, ?) = ?",
+                                   modulo_buckets(3), processes=2, process=count_rows)
+        self.assertEqual(counts, [34, 33, 33])
+
+    @skipUnless(os.path.isdir('/dev/shm'), "needs /dev/shm to find the shared memory")
+    def test_failing_partition(self):
+        before = set(os.listdir('/dev/shm'))
+        with self.assertRaises(monetdbe.Error):
+            partitioned_query(self.database, "select i, s from partitioned where i >= ? and i < ?",
+                              [(0, 50), ('x', 'y'), (50, 100)], processes=2)
+        self.assertEqual(set(os.listdir('/dev/shm')) - before, set())
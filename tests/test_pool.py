@@ -0,0 +1,60 @@
+from threading import Thread
+from unittest import TestCase
+
+from monetdbe import ConnectionPool
+from monetdbe.exceptions import OperationalError, ProgrammingError
+
+
+class TestConnectionPool(TestCase):
+    def setUp(self):
+        self.pool = ConnectionPool(size=2, timeout=0.1)
+
+    def tearDown(self):
+        self.pool.close()
+
+    def test_sessions(self):
+        with self.pool.connection() as writer, self.pool.connection() as reader:
+            self.assertIsNot(writer, reader)
+            writer.execute("create table pooled(i int)")
+            writer.execute("insert into pooled values (1)")
+            writer.commit()
+            writer.execute("insert into pooled values (2)")
+            # the second insert isn't committed yet
+            self.assertEqual(reader.execute("select i from pooled").fetchall(), [(1,)])
+            writer.commit()
+            reader.commit()
+            self.assertEqual(reader.execute("select count(*) from pooled").fetchone(), (2,))
+            reader.execute("drop table pooled")
+            reader.commit()
+
+    def test_reuse(self):
+        with self.pool.connection() as first:
+            pass
+        with self.pool.connection() as second:
+            self.assertIs(first, second)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_rollback_on_release(self):
+        with self.pool.connection() as connection:
+            connection.execute("create table rolled_back(i int)")
+        with self.pool.connection() as connection:
+            count = connection.execute("select count(*) from sys.tables where name = 'rolled_back'").fetchone()
+            self.assertEqual(count, (0,))
+
+    def test_timeout(self):
+        with self.pool.connection(), self.pool.connection():
+            with self.assertRaises(OperationalError):
+                self.pool.acquire()
+
+    def test_wait(self):
+        connections = [self.pool.acquire(), self.pool.acquire()]
+        self.pool.timeout = None
+        Thread(target=self.pool.release, args=(connections[0],)).start()
+        self.assertIs(self.pool.acquire(), connections[0])
+        for connection in connections:
+            self.pool.release(connection)
+
+    def test_closed(self):
+        self.pool.close()
+        with self.assertRaises(ProgrammingError):
+            self.pool.acquire()
@@ -0,0 +1,128 @@
+from unittest import TestCase
+
+import numpy as np
+
+import monetdbe
+from monetdbe.results import ResultCache, CachedResult
+
+
+def make_result(tables, nbytes):
+    return CachedResult(None, 0, [], {}, frozenset(tables), nbytes)
+
+
+class TestResultCache(TestCase):
+    def setUp(self):
+        self.cache = ResultCache(max_bytes=100)
+
+    def test_hit(self):
+        cached = make_result(['t'], 10)
+        self.assertTrue(self.cache.put('a', cached, self.cache.version))
+        self.assertIs(self.cache.get('a'), cached)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_evict_least_recently_used(self):
+        self.cache.put('a', make_result(['t'], 40), 0)
+        self.cache.put('b', make_result(['t'], 40), 0)
+        self.cache.get('a')
+        self.cache.put('c', make_result(['t'], 40), 0)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.nbytes, 80)
+
+    def test_too_large(self):
+        self.assertFalse(self.cache.put('a', make_result(['t'], 101), 0))
+        self.assertEqual(len(self.cache), 0)
+
+    def test_invalidate(self):
+        self.cache.put('a', make_result(['t', 'u'], 10), 0)
+        self.cache.put('b', make_result(['v'], 10), 0)
+        self.cache.invalidate(['u'])
+        self.assertIsNone(self.cache.get('a'))
+        self.assertIsNotNone(self.cache.get('b'))
+        self.assertEqual(self.cache.nbytes, 10)
+
+    def test_outdated(self):
+        version = self.cache.version
+        self.cache.invalidate(['t'])
+        self.assertFalse(self.cache.put('a', make_result(['t'], 10), version))
+
+    def test_disabled(self):
+        self.cache.max_bytes = 0
+        self.assertFalse(self.cache.put('a', make_result(['t'], 1), 0))
+
+
+class TestCachedResults(TestCase):
+    def setUp(self):
+        self.con = monetdbe.connect(':memory:', autocommit=True, cached_results=1 << 20)
+        self.con.execute("create table t (a int, b string)")
+        self.con.execute("insert into t values (1, 'x'), (2, null)")
+        self.cache = self.con.result_cache
+
+    def tearDown(self):
+        self.con.execute("drop table if exists t")
+        self.con.close()
+
+    def test_hit(self):
+        query = "select a, b from t where a > ? order by a"
+        first = self.con.execute(query, (0,)).fetchall()
+        cursor = self.con.execute("select a, b   from t where a > ? order by a;", (0,))
+        self.assertEqual(cursor.fetchall(), first)
+        self.assertEqual(first, [(1, 'x'), (2, None)])
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(cursor.description[0].name, 'a')
+
+    def test_parameters(self):
+        self.assertEqual(self.con.execute("select b from t where a = ?", (1,)).fetchall(), [('x',)])
+        self.assertEqual(self.con.execute("select b from t where a = ?", (2,)).fetchall(), [(None,)])
+        self.assertEqual(self.cache.hits, 0)
+
+    def test_numpy(self):
+        self.con.execute("select a from t order by a").fetchall()
+        result = self.con.execute("select a from t order by a").fetchnumpy()
+        np.testing.assert_array_equal(result['a'], [1, 2])
+        with self.assertRaises(ValueError):
+            result['a'][0] = 3
+
+    def test_invalidate_insert(self):
+        query = "select count(*) from t"
+        self.assertEqual(self.con.execute(query).fetchone(), (2,))
+        self.con.execute("insert into t values (3, 'z')")
+        self.assertEqual(self.con.execute(query).fetchone(), (3,))
+
+    def test_invalidate_append(self):
+        query = "select count(*) from t"
+        self.con.execute(query).fetchall()
+        self.con.cursor().insert('t', {'a': np.array([3, 4]), 'b': np.array(['y', 'z'])})
+        self.assertEqual(self.con.execute(query).fetchone(), (4,))
+
+    def test_unchanged_table(self):
+        self.con.execute("create table u (a int)")
+        try:
+            self.con.execute("select count(*) from t").fetchall()
+            self.con.execute("insert into u values (1)")
+            self.con.execute("delete from t where a > 10")
+            self.con.execute("select count(*) from t").fetchall()
+            self.assertEqual(self.cache.hits, 1)
+        finally:
+            self.con.execute("drop table u")
+
+    def test_invalidate_ddl(self):
+        self.con.execute("select count(*) from t").fetchall()
+        self.con.execute("create table u (a int)")
+        self.con.execute("drop table u")
+        self.assertEqual(len(self.cache), 0)
+
+    def test_view_not_cached(self):
+        self.con.execute("create view v as select * from t")
+        try:
+            self.assertEqual(self.con.execute("select count(*) from v").fetchone(), (2,))
+            self.con.execute("insert into t values (3, 'z')")
+            self.assertEqual(self.con.execute("select count(*) from v").fetchone(), (3,))
+        finally:
+            self.con.execute("drop view v")
+
+    def test_disabled_by_default(self):
+        with monetdbe.connect(':memory:') as con:
+            con.execute("select count(*) from sys.tables").fetchall()
+            self.assertEqual(len(con.result_cache), 0)
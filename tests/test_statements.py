@@ -0,0 +1,167 @@
+from unittest import TestCase
+
+from monetdbe.exceptions import ProgrammingError
+from monetdbe.formatting import changes_schema
+from monetdbe.statements import StatementCache
+from tests.util import get_cached_connection, flush_cached_connection
+
+
+class TestStatementCache(TestCase):
+    def setUp(self):
+        self.prepared = []
+        self.cleaned = []
+        self.cache = StatementCache(self.prepare, self.cleaned.append, size=2)
+
+    def prepare(self, query):
+        self.prepared.append(query)
+        return f"statement {query} {len(self.prepared)}"
+
+    def execute(self, query):
+        cached = self.cache.acquire(query)
+        self.cache.release(query, cached)
+        return cached.statement
+
+    def test_hit(self):
+        self.assertEqual(self.execute('a'), self.execute('a'))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_evict_least_recently_used(self):
+        self.execute('a')
+        self.execute('b')
+        self.execute('a')
+        self.execute('c')
+        self.assertEqual(self.cleaned, ['statement b 2'])
+        self.assertEqual(len(self.cache), 2)
+
+    def test_in_use(self):
+        outer = self.cache.acquire('a')
+        inner = self.cache.acquire('a')
+        self.assertNotEqual(outer.statement, inner.statement)
+        self.cache.release('a', inner)
+        self.cache.release('a', outer)
+        self.assertEqual(self.cleaned, [outer.statement])
+
+    def test_clear(self):
+        self.execute('a')
+        in_use = self.cache.acquire('b')
+        self.cache.clear()
+        self.assertEqual(self.cleaned, ['statement a 1'])
+        self.cache.release('b', in_use)
+        self.assertEqual(self.cleaned, ['statement a 1', 'statement b 2'])
+        self.assertEqual(len(self.cache), 0)
+
+    def test_disabled(self):
+        self.cache.size = 0
+        self.execute('a')
+        self.execute('a')
+        self.assertEqual(len(self.prepared), 2)
+
+    def test_shrink(self):
+        self.execute('a')
+        self.execute('b')
+        self.cache.size = 1
+        self.assertEqual(self.cleaned, ['statement a 1'])
+
+    def test_changes_schema(self):
+        self.assertTrue(changes_schema("CREATE TABLE t (i int)"))
+        self.assertTrue(changes_schema(" rollback"))
+        self.assertTrue(changes_schema("set schema s"))
+        self.assertFalse(changes_schema("select * from created"))
+        self.assertFalse(changes_schema("insert into t values (?)"))
+
+
+class TestConnectionStatementCache(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def setUp(self):
+        self.con = get_cached_connection()
+        self.con.statement_cache.clear()
+
+    def test_reuse(self):
+        self.con.execute("create table cached(i int)")
+        misses = self.con.statement_cache.misses
+        for i in range(10):
+            self.con.execute("insert into cached values (?)", (i,))
+        self.assertEqual(self.con.statement_cache.misses, misses + 1)
+        self.assertEqual(self.con.execute("select count(*) from cached").fetchone(), (10,))
+
+    def test_invalidate_on_ddl(self):
+        self.con.execute("create table altered(i int)")
+        self.con.execute("insert into altered values (?)", (1,))
+        self.con.execute("drop table altered")
+        self.con.execute("create table altered(i string)")
+        self.con.execute("insert into altered values (?)", ('a',))
+        self.assertEqual(self.con.execute("select * from altered").fetchall(), [('a',)])
+
+
+class TestStatement(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def setUp(self):
+        self.con = get_cached_connection()
+        self.con.execute("create table prepared(i int, s varchar(10))")
+
+    def test_execute(self):
+        with self.con.prepare("insert into prepared values (?, ?)") as insert:
+            self.assertEqual([t.sql_type for t in insert.param_types], ['int', 'varchar'])
+            self.assertEqual(insert.execute((1, 'one')).rowcount, 1)
+            self.assertEqual(insert.executemany((i, str(i)) for i in range(2, 5)).rowcount, 3)
+
+        with self.con.prepare("select s from prepared where i = ?") as select:
+            self.assertEqual([(c.name, c.type_code) for c in select.columns], [('s', 'varchar')])
+            self.assertEqual(select.execute((1,)).fetchall(), [('one',)])
+            self.assertEqual(select.execute((3,)).fetchall(), [('3',)])
+
+    def test_closed(self):
+        statement = self.con.prepare("select * from prepared")
+        statement.close()
+        with self.assertRaises(ProgrammingError):
+            statement.execute()
+
+    def test_many_parameters(self):
+        placeholders = ', '.join(['?'] * 300)
+        with self.con.prepare(f"select i from prepared where i in ({placeholders})") as select:
+            self.assertEqual(len(select.param_types), 300)
+            self.assertEqual([c.name for c in select.columns], ['i'])
+            self.con.execute("insert into prepared values (7, 'seven')")
+            self.assertEqual(select.execute(range(300)).fetchall(), [(7,)])
+
+
+class TestExecuteBatch(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def setUp(self):
+        self.con = get_cached_connection()
+        self.con.execute("create table looked_up(id int, s string)")
+        self.con.execute("insert into looked_up values (1, 'one'), (2, 'two'), (2, 'TWO')")
+
+    def test_execute_batch(self):
+        df = self.con.execute_batch("select s from looked_up where id = ? order by s", [(2,), (3,), (1,)])
+        self.assertEqual(list(df.columns), ['batch', 's'])
+        self.assertEqual(df.values.tolist(), [[0, 'TWO'], [0, 'two'], [2, 'one']])
+
+    def test_values(self):
+        self.con.executemany("insert into looked_up values (?, ?)", [(i, f"value {i}") for i in range(10, 20)])
+        df = self.con.execute_batch("select id, s from looked_up where id >= ? and id < ? order by id",
+                                    [(10, 15), (15, 20), (18, 20)])
+        # allocate and free other results, which would reuse the memory of the batches if they weren't copied
+        for _ in range(3):
+            self.con.execute("select id * 1000, s || 'x' from looked_up").fetchall()
+        self.assertEqual(df['batch'].tolist(), [0] * 5 + [1] * 5 + [2] * 2)
+        self.assertEqual(df['id'].tolist(), list(range(10, 20)) + [18, 19])
+        self.assertEqual(df['s'].tolist(), [f"value {i}" for i in list(range(10, 20)) + [18, 19]])
+
+    def test_empty(self):
+        df = self.con.execute_batch("select id, s from looked_up where id = ?", [])
+        self.assertEqual(list(df.columns), ['batch', 'id', 's'])
+        self.assertEqual(len(df), 0)
+
+    def test_batch_column_name(self):
+        with self.assertRaises(ProgrammingError):
+            self.con.execute_batch("select id as batch from looked_up where id = ?", [(1,)])
@@ -0,0 +1,36 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import TestCase
+
+import monetdbe
+
+
+class TestSharedConnection(TestCase):
+    def setUp(self):
+        self.con = monetdbe.connect(check_same_thread=False, autocommit=True)
+        self.con.execute("create table shared(i int)")
+        self.con.executemany("insert into shared values (?)", [(i,) for i in range(100)])
+
+    def tearDown(self):
+        self.con.close()
+
+    def test_cursors_keep_their_result(self):
+        first = self.con.execute("select i from shared where i < 2 order by i")
+        second = self.con.execute("select count(*) from shared")
+        self.assertEqual(second.fetchall(), [(100,)])
+        self.assertEqual(first.fetchall(), [(0,), (1,)])
+
+    def test_threads(self):
+        def run(n):
+            cur = self.con.cursor()
+            results = []
+            for i in range(20):
+                cur.execute("select count(*) from shared where i < ?", (n,))
+                results.append(cur.fetchone()[0])
+                self.con.execute("insert into shared values (?)", (1000 + n,))
+            return results
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(run, range(8)))
+
+        self.assertEqual(results, [[n] * 20 for n in range(8)])
+        self.assertEqual(self.con.execute("select count(*) from shared").fetchone(), (100 + 8 * 20,))
@@ -0,0 +1,60 @@
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from monetdbe.exceptions import ProgrammingError, Error
+from tests.util import get_cached_connection, flush_cached_connection
+
+
+class TestUpsert(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        flush_cached_connection()
+
+    def setUp(self):
+        self.con = get_cached_connection(autocommit=True)
+        self.con.execute("drop table if exists upserted")
+        self.con.execute("create table upserted(k int, v string, n double)")
+        self.con.execute("insert into upserted values (1, 'one', 1.0), (2, 'two', 2.0)")
+
+    def test_upsert(self):
+        cur = self.con.upsert('upserted', {
+            'k': np.array([2, 3], dtype=np.int32),
+            'v': np.array(['TWO', 'three']),
+            'n': np.array([20.0, 30.0]),
+        }, key_columns='k')
+        self.assertEqual(cur.rowcount, 2)
+        result = self.con.execute("select * from upserted order by k").fetchall()
+        self.assertEqual(result, [(1, 'one', 1.0), (2, 'TWO', 20.0), (3, 'three', 30.0)])
+
+    def test_upsert_dataframe_subset(self):
+        self.con.upsert('upserted', pd.DataFrame({'k': [1, 4], 'v': ['ONE', 'four']}), key_columns=['k'])
+        result = self.con.execute("select * from upserted order by k").fetchall()
+        self.assertEqual(result, [(1, 'ONE', 1.0), (2, 'two', 2.0), (4, 'four', None)])
+
+    def test_upsert_only_keys(self):
+        self.con.upsert('upserted', {'k': np.array([1, 5])}, key_columns='k')
+        result = self.con.execute("select k from upserted order by k").fetchall()
+        self.assertEqual(result, [(1,), (2,), (5,)])
+
+    def test_missing_key(self):
+        with self.assertRaises(ProgrammingError):
+            self.con.upsert('upserted', {'v': np.array(['x'])}, key_columns='k')
+
+    def test_no_staging_tables_left(self):
+        self.con.upsert('upserted', {'k': np.array([1]), 'v': np.array(['x'])}, key_columns='k')
+        count = self.con.execute("select count(*) from sys.tables where name like 'monetdbe_upsert_%'").fetchone()
+        self.assertEqual(count, (0,))
+
+    def test_failed_merge_in_transaction(self):
+        cur = self.con.cursor()
+        cur.transaction()
+        # both rows match the same row of the table, which makes the MERGE fail
+        with self.assertRaises(Error):
+            cur.upsert('upserted', {'k': np.array([1, 1]), 'v': np.array(['a', 'b'])}, key_columns='k')
+        self.con.rollback()
+        count = self.con.execute("select count(*) from sys.tables where name like 'monetdbe_upsert_%'").fetchone()
+        self.assertEqual(count, (0,))
+        result = self.con.execute("select k, v from upserted order by k").fetchall()
+        self.assertEqual(result, [(1, 'one'), (2, 'two')])